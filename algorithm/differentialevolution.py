@@ -0,0 +1,274 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+"""Module implementing differential evolution, as an alternative to the
+genetic algorithm for problems with many integer parameters.
+
+Each gene is held as a vector of real values, rounded to the nearest
+integer to be scored. On each iteration, every gene is paired with a trial
+gene made by adding the scaled difference of two other random genes to a
+base gene, and then taking each value from either the result or the 
+original gene. The trial replaces the original if it scores at least as
+well. The step sizes shrink as the population closes in on an optimum, 
+which suits smooth problems such as choosing capacities far better than
+random-reset mutation does.
+
+DifferentialEvolutionEngine takes the same configuration as 
+geneticalgorithm.Engine, so it can be selected in the algorithm section of
+any master that uses Engine, with the options described in
+get_config_spec. Genes must be of fixed length, with min_len == max_len.
+mort, nuke_power, base_mute, local_mute, gene_mute and array_pop are not 
+used, and need not be set. Trial genes are scored a whole iteration at a time, so the fitness
+cache, gene_test_batch_callback and the worker pool all apply.
+"""
+
+from tools import mureilexception
+from algorithm import geneticalgorithm
+
+import logging
+import numpy
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DifferentialEvolutionEngine(geneticalgorithm.Engine):
+    """An engine running differential evolution on a DEPop population.
+    """
+
+    def get_config_spec(self):
+        """Return a list of tuples of format (name, conversion function, default),
+        e.g. ('capex', float, 2.0). Put None if no conversion required, or if no
+        default value, e.g. ('name', None, None)
+
+        Configuration:
+            as for geneticalgorithm.Engine, except that the breeding and mutation
+            settings mort, nuke_power, base_mute and gene_mute are not used, and
+            are optional. Plus:
+            
+            de_strategy: how the base gene of each trial is chosen - 'currenttobest1'
+                (the default), the original gene moved towards the best gene, 'rand1',
+                a random gene, or 'best1', the best gene. best1 converges fastest but
+                is the most likely to settle on a local optimum.
+            de_weight: the scale applied to the difference of the two random genes.
+            de_weight_dither: if > 0, the scale for each trial is drawn at random
+                from de_weight to de_weight + de_weight_dither, which helps avoid
+                stalling. Defaults to 0.5.
+            de_crossover: the probability of each value of the trial being taken
+                from the mutated gene rather than the original.
+        """
+        spec = geneticalgorithm.set_spec_defaults(
+            geneticalgorithm.Engine.get_config_spec(self), 
+            {'mort': 0, 'nuke_power': 0, 'base_mute': 0, 'gene_mute': 0})
+        return spec + [
+            ('de_strategy', None, 'currenttobest1'),
+            ('de_weight', float, 0.5),
+            ('de_weight_dither', float, 0.5),
+            ('de_crossover', float, 0.9)
+            ]
+
+
+    def make_population(self):
+        """Check the differential evolution settings, and return a DEPop.
+        """
+        if not (self.config['min_len'] == self.config['max_len']):
+            msg = ('differentialevolution requires min_len == max_len, ' +
+                'found min_len = {:d}, max_len = {:d}'.format(
+                self.config['min_len'], self.config['max_len']))
+            raise mureilexception.ConfigException(msg, {})
+        if self.config['de_strategy'] not in ['rand1', 'best1', 'currenttobest1']:
+            msg = ('differentialevolution de_strategy must be one of rand1, best1 ' +
+                'or currenttobest1, found ' + self.config['de_strategy'])
+            raise mureilexception.ConfigException(msg, {})
+        if self.config['pop_size'] < 4:
+            msg = ('differentialevolution requires pop_size of at least 4, found ' +
+                str(self.config['pop_size']))
+            raise mureilexception.ConfigException(msg, {})
+        return DEPop(self.config)
+
+
+    def do_iteration(self):
+        """Make and score a trial for every gene, and keep the better of each
+        pair.
+        """
+        if (not self.is_configured):
+            msg = 'do_iteration requested, but differentialevolution is not configured'
+            logger.critical(msg)
+            raise mureilexception.ConfigException(msg, {})
+
+        self.iteration_count += 1
+        timer = self.timer
+        start = time.time()
+        # Score any immigrants first, so every gene can be compared
+        self.pop_score()
+        start = timer.add('immigrants', start)
+        trials = self.population.make_trials()
+        start = timer.add('trials', start)
+        scores = self.evaluate(list(trials))
+        start = timer.add('score', start)
+        replaced = self.population.select(scores)
+        start = timer.add('select', start)
+
+        best_values, b_score = self.population.get_best()
+        logger.debug('b_score = %f, %d trials kept', b_score, replaced)
+        self.record_best(best_values, b_score)
+        start = timer.add('record', start)
+        logger.debug('iteration: %d', self.iteration_count)
+        self.checkpoint_if_due()
+        timer.add('checkpoint', start)
+
+        return None
+
+
+class DEPop(geneticalgorithm.ArrayPop):
+    """Population of real-valued genes for differential evolution, held as
+    a (pop_size, gene_len) float array with a matching vector of scores. 
+    Genes are presented to Engine rounded to the nearest integer, through
+    the same interface as geneticalgorithm.ArrayPop. Uses its own numpy
+    RandomState, seeded from config['seed'].
+    """
+    def __init__(self, config):
+        """input: dict as for ArrayPop
+        output: None
+        sets up the population array and its random stream
+        """
+        self.config = config
+        self.rand = numpy.random.RandomState(self.config['seed'])
+
+        pop_size = self.config['pop_size']
+        gene_len = self.config['min_len']
+        self.lower = numpy.ones(gene_len) * self.config['min_param_val']
+        self.upper = numpy.ones(gene_len) * self.config['max_param_val']
+
+        min_starts = self.config['start_values_min']
+        max_starts = self.config['start_values_max']
+        if len(min_starts) == 0:
+            min_starts = self.lower
+            max_starts = self.upper
+        min_starts = numpy.array(min_starts, dtype=float)
+        max_starts = numpy.array(max_starts, dtype=float)
+
+        self.vectors = min_starts + (self.rand.random_sample((pop_size, gene_len)) *
+            (max_starts - min_starts))
+        self.values = self.round_vectors(self.vectors)
+        self.scores = numpy.zeros(pop_size) * numpy.nan
+        self.dirty = numpy.ones(pop_size, dtype=bool)
+        self.trials = None
+        return None
+
+    def round_vectors(self, vectors):
+        """input: float array
+        output: int array
+        returns the vectors rounded to the nearest integers within 
+        min_param_val to max_param_val
+        """
+        return numpy.clip(numpy.rint(vectors), self.lower, self.upper).astype(numpy.int64)
+
+    def get_state(self):
+        """input: None
+        output: dict
+        returns copies of the population arrays and the random stream
+        state, for checkpoints
+        """
+        state = geneticalgorithm.ArrayPop.get_state(self)
+        state['vectors'] = self.vectors.copy()
+        return state
+
+    def set_state(self, state):
+        """input: dict, as from get_state
+        output: None
+        restores the population arrays and the random stream
+        """
+        geneticalgorithm.ArrayPop.set_state(self, state)
+        self.vectors = state['vectors'].copy()
+        return None
+
+    def replace_worst(self, values_list):
+        """input: list of lists
+        output: None
+        replaces the worst-scoring genes, counting unscored genes as
+        worst, with new genes holding values_list
+        """
+        if len(values_list) == 0:
+            return None
+        keys = numpy.where(self.dirty, -numpy.inf, self.scores)
+        worst = numpy.argsort(keys, kind='mergesort')[:len(values_list)]
+        self.vectors[worst] = numpy.array(values_list, dtype=float)
+        self.values[worst] = self.round_vectors(self.vectors[worst])
+        self.scores[worst] = numpy.nan
+        self.dirty[worst] = True
+        return None
+
+    def make_trials(self):
+        """input: None
+        output: int array
+        makes a trial gene for each gene in the population, and returns
+        them rounded, one per row, to be scored and passed to select
+        """
+        count, gene_len = self.vectors.shape
+        vectors = self.vectors
+
+        # Three different random genes for each, none the gene itself
+        keys = self.rand.random_sample((count, count))
+        keys[numpy.arange(count), numpy.arange(count)] = numpy.inf
+        others = numpy.argsort(keys, axis=1)[:, :3]
+        weight = self.config['de_weight'] + (self.config['de_weight_dither'] *
+            self.rand.random_sample((count, 1)))
+
+        strategy = self.config['de_strategy']
+        best = vectors[numpy.argmax(self.scores)]
+        if strategy == 'best1':
+            mutants = best + weight * (vectors[others[:, 0]] - vectors[others[:, 1]])
+        elif strategy == 'currenttobest1':
+            mutants = vectors + weight * (best - vectors + 
+                vectors[others[:, 0]] - vectors[others[:, 1]])
+        else:
+            mutants = vectors[others[:, 0]] + weight * (
+                vectors[others[:, 1]] - vectors[others[:, 2]])
+
+        # Binomial crossover, taking at least one value from the mutant
+        from_mutant = self.rand.random_sample((count, gene_len)) < self.config['de_crossover']
+        from_mutant[numpy.arange(count), self.rand.randint(0, gene_len, count)] = True
+        trials = numpy.where(from_mutant, mutants, vectors)
+
+        # Values out of range are put halfway between the original and the limit
+        trials = numpy.where(trials < self.lower, (vectors + self.lower) / 2, trials)
+        trials = numpy.where(trials > self.upper, (vectors + self.upper) / 2, trials)
+
+        self.trials = trials
+        return self.round_vectors(trials)
+
+    def select(self, scores):
+        """input: list of floats, the scores of the genes from make_trials
+        output: int
+        replaces each gene with its trial if the trial scores at least as 
+        well, and returns the number replaced
+        """
+        scores = numpy.array(scores, dtype=float)
+        keep = scores >= self.scores
+        self.vectors[keep] = self.trials[keep]
+        self.values[keep] = self.round_vectors(self.trials[keep])
+        self.scores[keep] = scores[keep]
+        self.trials = None
+        return int(numpy.count_nonzero(keep))
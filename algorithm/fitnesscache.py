@@ -0,0 +1,119 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+"""Module implementing a bounded fitness cache for the genetic algorithm.
+
+The cache maps the integer values of a gene to the score returned by the
+gene test callback. Masters such as TxMultiMasterSimple compute the score
+as a deterministic function of the gene, so a cached score is exact.
+"""
+
+import collections
+import hashlib
+import numpy
+
+
+def make_key(values):
+    """Return the key for a gene, an md5 digest of its values as 64-bit
+    integers.
+
+    Inputs:
+        values: list or numpy array of integers
+
+    Outputs:
+        key: a 16-byte string
+    """
+    return hashlib.md5(numpy.asarray(values, dtype=numpy.int64).tostring()).digest()
+
+
+class FitnessCache(object):
+    """Bounded least-recently-used map from gene values to score.
+
+    Genes are keyed on an md5 digest of their values as 64-bit integers,
+    so a key costs 16 bytes regardless of gene length. The cache lives in
+    the process that dispatches genes for scoring, so when
+    multiprocessing is used it is consulted before genes are sent to the
+    workers, and is shared by all of them.
+    """
+
+    def __init__(self, max_entries):
+        """Inputs:
+            max_entries: the maximum number of scores to keep. When full,
+                the least recently used score is dropped.
+        """
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def make_key(self, values):
+        """Return the cache key for a gene.
+
+        Inputs:
+            values: list or numpy array of integers
+
+        Outputs:
+            key: a 16-byte string
+        """
+        return make_key(values)
+
+
+    def lookup(self, key):
+        """Return the score stored under key, or None if it is not
+        in the cache. Counts the hit or miss, and marks a hit as
+        most recently used.
+        """
+        try:
+            score = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.entries[key] = score
+        self.hits += 1
+        return score
+
+
+    def store(self, key, score):
+        """Store score under key, dropping the least recently used
+        entry if the cache is full.
+        """
+        if key in self.entries:
+            del self.entries[key]
+        elif len(self.entries) >= self.max_entries:
+            self.entries.popitem(last=False)
+        self.entries[key] = score
+
+
+    def get_stats_string(self):
+        """Return a string describing the hit and miss counts, for logging.
+        """
+        total = self.hits + self.misses
+        if total > 0:
+            rate = 100.0 * self.hits / total
+        else:
+            rate = 0.0
+        return 'fitness cache: {:d} hits, {:d} misses ({:.1f}% hit rate), {:d} of {:d} entries used'.format(
+            self.hits, self.misses, rate, len(self.entries), self.max_entries)
@@ -0,0 +1,328 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+"""Module holding the history of the best gene found on each iteration of
+a genetic algorithm, in compact form.
+
+The values of the stored genes are held in one preallocated integer array,
+and the scores and iteration numbers in two more, each grown by doubling
+as entries are added. Every entry can be stored, or only those that 
+improve on the best score so far, or only every Nth. With delta_encode
+set, only the values that changed since the previous stored gene are 
+kept, along with a full copy of every keyframe_interval-th gene so that 
+any entry can be decoded without replaying the whole history.
+
+The best entry appended is always kept, whether or not it is stored.
+
+The engines return the history itself from get_final, and the masters
+pickle it as it is, so output files stay compact. to_list expands a
+history, or passes through the list saved by older versions.
+"""
+
+from tools import mureilexception
+
+import numpy
+
+
+def to_list(best_gene_data):
+    """Return best_gene_data, as returned by get_final or loaded from an
+    output pickle, as a list of [values, score, iteration] lists. Outputs
+    from older versions hold that list already, and it is returned as it is.
+    """
+    if isinstance(best_gene_data, BestGeneHistory):
+        return best_gene_data.to_list()
+    return best_gene_data
+
+
+def grow(array, length):
+    """Return a copy of array with its first dimension extended to length,
+    padded with zeros.
+    """
+    new_array = numpy.zeros((length,) + array.shape[1:], dtype=array.dtype)
+    new_array[:len(array)] = array
+    return new_array
+
+
+class BestGeneHistory(object):
+    """The best gene, score and iteration number from each iteration.
+    Entries read back as [values, score, iteration] lists, as the 
+    genetic algorithm engines have always reported them.
+    """
+
+    def __init__(self, gene_len, store_mode='all', store_every=1, 
+        delta_encode=False, keyframe_interval=64, dtype=numpy.int32,
+        capacity=64):
+        """Inputs:
+            gene_len: the maximum length of a gene.
+            store_mode: 'all' to store every entry, 'improvements' to store
+                only entries that score higher than any before, or 'every'
+                to store only entries with an iteration number that is a 
+                multiple of store_every.
+            store_every: as for store_mode.
+            delta_encode: if True, store only the values that differ from
+                the previous stored gene.
+            keyframe_interval: with delta_encode, the number of entries 
+                between full copies of a gene.
+            dtype: the numpy integer type to hold gene values in. This is 
+                widened to int64 if a value does not fit.
+            capacity: the number of entries to allocate space for at first.
+        """
+        if store_mode not in ['all', 'improvements', 'every']:
+            msg = ('BestGeneHistory store_mode must be one of all, improvements ' +
+                'or every, found ' + str(store_mode))
+            raise mureilexception.ConfigException(msg, {})
+        if store_every < 1:
+            msg = 'BestGeneHistory store_every must be at least 1, found ' + str(store_every)
+            raise mureilexception.ConfigException(msg, {})
+
+        self.gene_len = gene_len
+        self.store_mode = store_mode
+        self.store_every = store_every
+        self.delta_encode = delta_encode
+        self.keyframe_interval = max(keyframe_interval, 1)
+        self.dtype = dtype
+
+        capacity = max(capacity, 1)
+        self.count = 0
+        self.scores = numpy.zeros(capacity, dtype=numpy.float64)
+        self.iterations = numpy.zeros(capacity, dtype=numpy.int32)
+        self.lengths = numpy.zeros(capacity, dtype=numpy.int32)
+        if delta_encode:
+            self.values = numpy.zeros((0, gene_len), dtype=dtype)
+            self.keyframes = numpy.zeros(
+                ((capacity - 1) // self.keyframe_interval + 1, gene_len), dtype=dtype)
+            self.delta_offsets = numpy.zeros(capacity + 1, dtype=numpy.int64)
+            self.delta_index = numpy.zeros(capacity, dtype=numpy.int32)
+            self.delta_values = numpy.zeros(capacity, dtype=dtype)
+            self.last_values = numpy.zeros(gene_len, dtype=dtype)
+        else:
+            self.values = numpy.zeros((capacity, gene_len), dtype=dtype)
+
+        self.best = None
+
+
+    def __len__(self):
+        return self.count
+
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if (index < 0) or (index >= self.count):
+            raise IndexError('BestGeneHistory index out of range')
+        return [self.get_values(index), float(self.scores[index]),
+            int(self.iterations[index])]
+
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+
+    def __eq__(self, other):
+        # Histories compare equal to each other, or to a list, by their entries
+        return self.to_list() == to_list(other)
+
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+    def __getstate__(self):
+        # Drop the unused capacity, so a pickled history is no larger 
+        # than it needs to be.
+        state = self.__dict__.copy()
+        count = self.count
+        for key in ['scores', 'iterations', 'lengths']:
+            state[key] = self.__dict__[key][:count].copy()
+        if self.delta_encode:
+            keyframes = (count - 1) // self.keyframe_interval + 1 if count else 0
+            deltas = self.delta_offsets[count]
+            state['keyframes'] = self.keyframes[:keyframes].copy()
+            state['delta_offsets'] = self.delta_offsets[:count + 1].copy()
+            state['delta_index'] = self.delta_index[:deltas].copy()
+            state['delta_values'] = self.delta_values[:deltas].copy()
+        else:
+            state['values'] = self.values[:count].copy()
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+
+    def append(self, values, score, iteration):
+        """Add the best gene of an iteration, if store_mode calls for it
+        to be stored.
+        
+        Inputs:
+            values: the gene values, as a list or array.
+            score: the gene score.
+            iteration: the iteration number.
+        """
+        is_best = (self.best is None) or (score > self.best[1])
+        if is_best:
+            self.best = [numpy.asarray(values).tolist(), score, iteration]
+
+        if self.store_mode == 'improvements':
+            store = is_best
+        elif self.store_mode == 'every':
+            store = (iteration % self.store_every) == 0
+        else:
+            store = True
+
+        if store:
+            self.store(values, score, iteration)
+
+
+    def store(self, values, score, iteration):
+        """Store an entry, growing the arrays if they are full.
+        """
+        values = numpy.asarray(values, dtype=numpy.int64)
+        length = len(values)
+        if length > self.gene_len:
+            msg = ('BestGeneHistory holds genes of up to {:d} values, but was given ' +
+                '{:d}').format(self.gene_len, length)
+            raise mureilexception.AlgorithmException(msg, {})
+
+        if length > 0:
+            info = numpy.iinfo(self.dtype)
+            if (values.min() < info.min) or (values.max() > info.max):
+                self.set_dtype(numpy.int64)
+
+        index = self.count
+        if index == len(self.scores):
+            capacity = max(2 * len(self.scores), 1)
+            self.scores = grow(self.scores, capacity)
+            self.iterations = grow(self.iterations, capacity)
+            self.lengths = grow(self.lengths, capacity)
+            if self.delta_encode:
+                self.delta_offsets = grow(self.delta_offsets, capacity + 1)
+            else:
+                self.values = grow(self.values, capacity)
+
+        self.scores[index] = score
+        self.iterations[index] = iteration
+        self.lengths[index] = length
+
+        if self.delta_encode:
+            padded = numpy.zeros(self.gene_len, dtype=self.dtype)
+            padded[:length] = values
+            offset = self.delta_offsets[index]
+            if (index % self.keyframe_interval) == 0:
+                keyframe = index // self.keyframe_interval
+                if keyframe == len(self.keyframes):
+                    self.keyframes = grow(self.keyframes, max(2 * len(self.keyframes), 1))
+                self.keyframes[keyframe] = padded
+                self.delta_offsets[index + 1] = offset
+            else:
+                changed = numpy.flatnonzero(padded != self.last_values)
+                end = offset + len(changed)
+                if end > len(self.delta_index):
+                    capacity = max(2 * len(self.delta_index), end)
+                    self.delta_index = grow(self.delta_index, capacity)
+                    self.delta_values = grow(self.delta_values, capacity)
+                self.delta_index[offset:end] = changed
+                self.delta_values[offset:end] = padded[changed]
+                self.delta_offsets[index + 1] = end
+            self.last_values = padded
+        else:
+            self.values[index, :length] = values
+            self.values[index, length:] = 0
+
+        self.count += 1
+
+
+    def set_dtype(self, dtype):
+        """Convert the arrays holding gene values to dtype.
+        """
+        self.dtype = dtype
+        self.values = self.values.astype(dtype)
+        if self.delta_encode:
+            self.keyframes = self.keyframes.astype(dtype)
+            self.delta_values = self.delta_values.astype(dtype)
+            self.last_values = self.last_values.astype(dtype)
+
+
+    def apply_delta(self, padded, index):
+        """Apply the changes stored for entry index to the padded values
+        of the entry before it.
+        """
+        start = self.delta_offsets[index]
+        end = self.delta_offsets[index + 1]
+        padded[self.delta_index[start:end]] = self.delta_values[start:end]
+
+
+    def get_values(self, index):
+        """Return the values of the gene stored at index, as a list.
+        """
+        if self.delta_encode:
+            keyframe = index // self.keyframe_interval
+            padded = self.keyframes[keyframe].copy()
+            for i in range(keyframe * self.keyframe_interval + 1, index + 1):
+                self.apply_delta(padded, i)
+        else:
+            padded = self.values[index]
+        return padded[:self.lengths[index]].tolist()
+
+
+    def get_best(self):
+        """Return the best entry appended, as [values, score, iteration],
+        or None if there have been none. The first appended wins a tie.
+        """
+        if self.best is None:
+            return None
+        return [self.best[0][:], self.best[1], self.best[2]]
+
+
+    def to_list(self):
+        """Return the stored entries as a list of [values, score, iteration]
+        lists.
+        """
+        scores = self.scores[:self.count].tolist()
+        iterations = self.iterations[:self.count].tolist()
+        lengths = self.lengths[:self.count].tolist()
+        result = []
+        if self.delta_encode:
+            padded = None
+            for i in range(self.count):
+                if (i % self.keyframe_interval) == 0:
+                    padded = self.keyframes[i // self.keyframe_interval].copy()
+                else:
+                    self.apply_delta(padded, i)
+                result.append([padded[:lengths[i]].tolist(), scores[i], iterations[i]])
+        else:
+            values = self.values[:self.count].tolist()
+            for i in range(self.count):
+                result.append([values[i][:lengths[i]], scores[i], iterations[i]])
+        return result
+
+
+    def get_nbytes(self):
+        """Return the number of bytes allocated to the history arrays.
+        """
+        arrays = [self.scores, self.iterations, self.lengths, self.values]
+        if self.delta_encode:
+            arrays += [self.keyframes, self.delta_offsets, self.delta_index,
+                self.delta_values]
+        return sum([array.nbytes for array in arrays])
@@ -32,13 +32,19 @@ Based on GA.py by steven, Jan 7, 2011
 @author: steven
 """
 
-from tools import configurablebase, mureilexception
+from tools import configurablebase, mureilexception, mureilbuilder
+from algorithm import adaptivemutation, fitnesscache, genehistory, phasetimer, surrogate, workerpool
 
 import random
 import logging
 import sys
+import os
+import time
+import pickle
 import copy
 import math
+import numpy
+import collections
 
 logger = logging.getLogger(__name__)
 
@@ -60,19 +66,93 @@ class Engine(configurablebase.ConfigurableBase):
 
     def complete_configuration(self):
         self.gene_test = self.config['gene_test_callback']
+        if self.config['gene_test_batch_callback']:
+            self.gene_test_batch = self.config['gene_test_batch_callback']
+        else:
+            self.gene_test_batch = None
         
+        if self.config['timeout_policy'] not in ['retry', 'penalise', 'abort']:
+            msg = ('geneticalgorithm timeout_policy must be one of retry, penalise ' +
+                'or abort, found ' + self.config['timeout_policy'])
+            raise mureilexception.ConfigException(msg, {})
+
+        if self.config['history_mode'] not in ['all', 'improvements', 'every']:
+            msg = ('geneticalgorithm history_mode must be one of all, improvements ' +
+                'or every, found ' + self.config['history_mode'])
+            raise mureilexception.ConfigException(msg, {})
+
+        if self.config['seed_evaluations']:
+            self.evaluation_seed = self.config['seed']
+        else:
+            self.evaluation_seed = None
+
         random.seed(self.config['seed'])
-        self.population = Pop(self.config)
+        self.population = self.make_population()
+
+        if self.config['cache_size'] > 0:
+            self.cache = fitnesscache.FitnessCache(self.config['cache_size'])
+        else:
+            self.cache = None
+
+        fraction = self.config['surrogate_fraction']
+        if fraction > 0:
+            if fraction >= 1:
+                msg = ('geneticalgorithm surrogate_fraction must be less than 1, found ' +
+                    str(fraction))
+                raise mureilexception.ConfigException(msg, {})
+            if not (self.config['min_len'] == self.config['max_len']):
+                msg = ('geneticalgorithm surrogate_fraction requires min_len == max_len, ' +
+                    'found min_len = {:d}, max_len = {:d}'.format(
+                    self.config['min_len'], self.config['max_len']))
+                raise mureilexception.ConfigException(msg, {})
+            self.surrogate = surrogate.RidgeSurrogate(self.config['min_len'],
+                history_size=self.config['surrogate_history'],
+                alpha=self.config['surrogate_alpha'])
+        else:
+            self.surrogate = None
+        self.surrogate_stats = {'screened': 0, 'scored': 0, 'estimated': 0, 
+            'saved': 0, 'hits': 0, 'hit_trials': 0}
+        self.surrogate_pending = set()
+
+        if self.config['adaptive_mutation']:
+            self.mutation_control = adaptivemutation.AdaptiveMutation(
+                get_rates(self.config), self.config['adaptive_diversity'],
+                min_scale=self.config['adaptive_min_scale'],
+                max_scale=self.config['adaptive_max_scale'],
+                step=self.config['adaptive_step'],
+                trajectory_size=self.config['adaptive_trajectory'])
+        else:
+            self.mutation_control = None
 
         self.clones_data = []
-        self.best_gene_data = []
+        self.best_gene_data = self.new_history()
+        self.last_best = None
         self.iteration_count = -1
+        self.last_checkpoint_time = None
+        self.best_so_far = collections.deque(maxlen=self.config['stop_window'] + 1)
+        self.timer = phasetimer.PhaseTimer()
         
         self.is_configured = True
         
         return None
 
 
+    def make_population(self):
+        """input: None
+        output: Pop or ArrayPop
+        returns the initial population, as selected by array_pop
+        """
+        if self.config['array_pop']:
+            if not (self.config['min_len'] == self.config['max_len']):
+                msg = ('geneticalgorithm array_pop requires min_len == max_len, ' +
+                    'found min_len = {:d}, max_len = {:d}'.format(
+                    self.config['min_len'], self.config['max_len']))
+                raise mureilexception.ConfigException(msg, {})
+            return ArrayPop(self.config)
+        else:
+            return Pop(self.config)
+
+
     def get_config_spec(self):
         """Return a list of tuples of format (name, conversion function, default),
         e.g. ('capex', float, 2.0). Put None if no conversion required, or if no
@@ -97,9 +177,121 @@ class Engine(configurablebase.ConfigurableBase):
                 of the current value.
             gene_test_callback: function handle to calculate cost of gene. This function
                 must be thread-safe as it will be called in multiprocessing.
+            gene_test_batch_callback: optional function handle to calculate the scores of
+                a (n, gene_len) array of genes, returning n scores. If set, it is used in
+                preference to gene_test_callback whenever a set of equal-length genes
+                is scored. It must return the same scores as gene_test_callback would.
+                Leave as '' (the default) to score each gene through gene_test_callback.
             start_values_min: list of minimum initialisation values for genes.
                 Should be empty, or the same length as min_len.
             start_values_max: as for start_values_min, but maximum.
+            array_pop: if True, hold the population as a single (pop_size, gene_len)
+                integer array, with mutation, breeding, culling and clone detection
+                done as array operations. Requires min_len == max_len, and
+                gene_mute is ignored. The random stream differs from the default
+                population, so results are reproducible from the seed but not
+                identical to array_pop = False.
+            rescore_unchanged: if True, re-run gene_test_callback on every gene on
+                every iteration. If False (the default), only genes that are new or
+                have changed since they were last scored are sent to gene_test_callback,
+                which is exact when the callback is a deterministic function of the gene.
+            cache_size: if > 0, keep the scores of up to this many distinct genes, and
+                look genes up here before sending them to gene_test_callback. The least
+                recently used scores are dropped first. As for rescore_unchanged, this
+                requires the callback to be a deterministic function of the gene. Scores
+                that are not finite, including penalised timeouts, are not cached.
+            worker_timeout: the time in seconds a worker process may take to score one
+                chunk of genes before timeout_policy is applied. 0 (the default) means
+                no limit. A worker process that dies is always restarted and its chunk
+                re-sent, up to max_retries times.
+            timeout_policy: what to do when a worker times out - 'retry' (the default)
+                restarts the worker and re-sends the chunk up to max_retries times,
+                'penalise' restarts the worker and scores a gene that times out on its
+                own as -inf, and 'abort' raises AlgorithmException.
+            max_retries: the number of times a chunk is re-sent to a new worker.
+            chunk_target_secs: the target time in seconds for a worker to score one
+                chunk of genes. Chunks are sized from the measured scoring time.
+            checkpoint_file: if not '', the file to save the engine state to, so that
+                the run can be continued with load_checkpoint. The file is written to
+                a temporary file and then renamed, so a crash while writing leaves the
+                previous checkpoint intact.
+            checkpoint_frequency: the number of iterations between checkpoints. 0 
+                (the default) means no checkpoints are written.
+            checkpoint_min_secs: the minimum time in seconds between checkpoints, to
+                bound the time spent writing them when iterations are fast. A 
+                checkpoint that is due sooner than this is skipped.
+            stop_window: if > 0, is_finished returns True once the best score found
+                has improved by no more than stop_tolerance over the last stop_window
+                iterations.
+            stop_tolerance: the improvement in the best score over stop_window
+                iterations, relative to its magnitude, at or below which the run is
+                taken to have converged. Defaults to 0, meaning no improvement at all.
+            stop_diversity: if > 0, is_finished returns True once the population
+                diversity, as from get_diversity, falls below this.
+            max_run_secs: if > 0, is_finished returns True once this many seconds 
+                have passed since prepare_run.
+            history_mode: which of the best genes from each iteration are kept in
+                the best gene data returned by get_final - 'all' (the default), 
+                'improvements' to keep only those that score higher than any 
+                before, or 'every' to keep only every history_every-th iteration.
+                The best gene overall is found from every iteration regardless.
+            history_every: as for history_mode.
+            history_delta: if True, hold the best gene history as the changes from
+                one stored gene to the next, which is smaller when the best gene
+                changes little between iterations, at the cost of decoding time
+                in get_final.
+            surrogate_fraction: if > 0, once surrogate_min_samples genes have been
+                scored, pop_score predicts the scores of new genes with a ridge
+                regression fitted to the genes scored so far, and sends only this
+                proportion of them, the most promising, to gene_test_callback,
+                along with any predicted to beat the best score known. The rest
+                keep the predicted score, and are screened again on the next
+                iteration if they survive. Requires min_len == max_len.
+            surrogate_min_samples: the number of genes to score before the
+                surrogate is used. 0 (the default) means twice pop_size.
+            surrogate_history: the number of most recently scored genes the 
+                surrogate is fitted to.
+            surrogate_refresh: every surrogate_refresh iterations, every gene is 
+                sent to gene_test_callback, so the population does not drift on
+                predicted scores. 0 means never.
+            surrogate_alpha: the ridge regression penalty.
+            seed_evaluations: if True, the random and numpy.random modules are seeded
+                from seed and the gene values before each gene is scored, so a
+                gene_test_callback that draws random numbers gives the same score
+                for a gene whatever the number of processes. Each gene is then
+                sent to gene_test_callback on its own, not to 
+                gene_test_batch_callback. Whether or not this is set, each worker
+                process seeds the random modules from seed and its own number, so
+                workers do not share a random stream.
+            timing_summary: if True, get_final logs the wall time and number of
+                calls for each phase of do_iteration, and the time spent in the
+                gene test callback, and with multiprocessing the time the master
+                spends sending genes, waiting for and collecting scores, and 
+                the time each worker is busy and idle. The masters call get_final
+                every output_frequency iterations and at the end of the run. 
+                The times are always collected, at the cost of a call to 
+                time.time() per phase.
+            adaptive_mutation: if True, base_mute, local_mute and gene_mute are the
+                starting rates, and are adjusted after every iteration as 
+                described in adaptivemutation.AdaptiveMutation - they rise by
+                adaptive_step when the best score improves, or while the median 
+                diversity of the gene positions is below adaptive_diversity, and 
+                fall by adaptive_step otherwise. A population collapsed to clones
+                has its rates raised to the upper bound and is mutated once, in
+                place of the nuke_power mutations. The rates are logged at debug
+                level after each iteration, and summarised by get_final.
+            adaptive_diversity: the median position diversity to keep above, 
+                where the diversity of a position is the standard deviation of
+                its values as a proportion of max_param_val - min_param_val.
+            adaptive_min_scale: the lower bound on each rate, as a multiple of 
+                its configured value.
+            adaptive_max_scale: the upper bound on each rate, as for 
+                adaptive_min_scale. No rate goes above 1.
+            adaptive_step: the factor by which the rates are raised or lowered on 
+                each iteration.
+            adaptive_trajectory: the number of the latest iterations for which the
+                rates are kept, in the trajectory saved with each checkpoint. The
+                summary by get_final covers every iteration.
         """
         return [
             ('min_param_val', int, None), 
@@ -116,8 +308,39 @@ class Engine(configurablebase.ConfigurableBase):
             ('min_len', int, None), 
             ('max_len', int, None),
             ('gene_test_callback', None, self.gene_test_undef),
+            ('gene_test_batch_callback', None, ''),
             ('start_values_min', None, []),
-            ('start_values_max', None, [])
+            ('start_values_max', None, []),
+            ('array_pop', mureilbuilder.string_to_bool, False),
+            ('rescore_unchanged', mureilbuilder.string_to_bool, False),
+            ('cache_size', int, 0),
+            ('worker_timeout', float, 0),
+            ('timeout_policy', None, 'retry'),
+            ('max_retries', int, 2),
+            ('chunk_target_secs', float, 0.1),
+            ('checkpoint_file', None, ''),
+            ('checkpoint_frequency', int, 0),
+            ('checkpoint_min_secs', float, 0),
+            ('stop_window', int, 0),
+            ('stop_tolerance', float, 0),
+            ('stop_diversity', float, 0),
+            ('max_run_secs', float, 0),
+            ('history_mode', None, 'all'),
+            ('history_every', int, 1),
+            ('history_delta', mureilbuilder.string_to_bool, False),
+            ('surrogate_fraction', float, 0),
+            ('surrogate_min_samples', int, 0),
+            ('surrogate_history', int, 2000),
+            ('surrogate_refresh', int, 10),
+            ('surrogate_alpha', float, 1.0),
+            ('seed_evaluations', mureilbuilder.string_to_bool, False),
+            ('timing_summary', mureilbuilder.string_to_bool, False),
+            ('adaptive_mutation', mureilbuilder.string_to_bool, False),
+            ('adaptive_diversity', float, 0.03),
+            ('adaptive_min_scale', float, 0.3),
+            ('adaptive_max_scale', float, 3.0),
+            ('adaptive_step', float, 1.2),
+            ('adaptive_trajectory', int, 1000)
             ]
 
 
@@ -142,22 +365,21 @@ class Engine(configurablebase.ConfigurableBase):
             
         if (self.config['processes'] > 0):
             # Set up the multiprocessing
-            from multiprocessing import Process, Queue
-            self.poolin = Queue()
-            self.poolout = Queue()
-            for n in range(self.config['processes']):
-                p = Process(target=self.multiprocess, args=())
-                p.start()
+            self.pool = workerpool.WorkerPool(self.gene_test, self.config['processes'],
+                timeout=self.config['worker_timeout'],
+                timeout_policy=self.config['timeout_policy'],
+                max_retries=self.config['max_retries'],
+                chunk_target_secs=self.config['chunk_target_secs'],
+                gene_test_batch=self.gene_test_batch,
+                seed=self.config['seed'],
+                seed_evaluations=self.config['seed_evaluations'])
             self.mp_active = True
             logger.debug('Multiprocessing started')
 
+        self.start_time = time.time()
         self.pop_score()
-        num = 0
-        sum = 0
-        for gene in self.population.genes:
-            num += 1
-            sum += gene.score
-        logger.debug('average score before: %f', float(sum)/num)
+        scores = self.population.get_scores()
+        logger.debug('average score before: %f', float(sum(scores))/len(scores))
 
 
     def finalise(self):
@@ -168,24 +390,8 @@ class Engine(configurablebase.ConfigurableBase):
 
     def end_multiprocessing(self):
         if self.mp_active:
-            for n in range(self.config['processes']):
-                self.poolin.put('die')
-
-
-    def multiprocess(self):
-        """input: None
-        output: None
-        takes genes out of poolin and puts their position and score in poolout
-        """
-        while True:
-            vals = self.poolin.get()
-            if vals == 'die':
-                break
-            pos = vals[0]
-            gene = vals[1]
-            score = self.gene_test(gene)
-            self.poolout.put((pos, score))
-        return None
+            self.pool.close()
+            self.mp_active = False
 
 
     def get_population(self):
@@ -193,18 +399,18 @@ class Engine(configurablebase.ConfigurableBase):
 
         
     def get_final(self, log_results=True):
+        """input: bool
+        output: list, genehistory.BestGeneHistory
+        returns the best gene found, and the best gene history. The history
+        is returned as it is, not expanded to lists, so the masters' output
+        pickles stay compact - use genehistory.to_list to expand it.
+        """
         self.pop_score()
-        
-        num = 0
-        sum = 0
-        for gene in self.population.genes:
-            num += 1
-            sum += gene.score
-        optim = [[],-1e1000,-1]
-
-        for data in self.best_gene_data:
-            if data[1] > optim[1]:
-                optim = data
+        scores = self.population.get_scores()
+
+        optim = self.best_gene_data.get_best()
+        if optim is None:
+            optim = [[],-1e1000,-1]
 
         if log_results:
             logger.info('best gene was: %s', str(optim[0]))
@@ -216,7 +422,14 @@ class Engine(configurablebase.ConfigurableBase):
         
         if log_results:
             logger.debug('%i nuke/s dropped', len(self.clones_data))
-            logger.debug('average score after: %f', float(sum)/num)   
+            logger.debug('average score after: %f', float(sum(scores))/len(scores))
+            if self.surrogate is not None:
+                logger.info('surrogate: %s', self.get_surrogate_string())
+            if self.mutation_control is not None:
+                logger.info('adaptive mutation: %s', 
+                    self.mutation_control.get_summary_string())
+            if self.config['timing_summary']:
+                logger.info('timing: %s', self.get_timing_string())
         
         return optim[0], self.best_gene_data
 
@@ -228,83 +441,479 @@ class Engine(configurablebase.ConfigurableBase):
             raise mureilexception.ConfigException(msg, {})
 
         self.iteration_count += 1
+        timer = self.timer
+        start = time.time()
         self.population.mutate()
+        start = timer.add('mutate', start)
         self.pop_score()
-        if self.iteration_count % 1 == 0:
-            try:
-                gene = iter(self.population.genes).next()
-                b_score = gene.score
-                bestgene = gene 
-            except StopIteration:
-                b_score = Inf
-                bestgene = None
-
-            for gene in self.population.genes:
-                if gene.score > b_score:
-                    bestgene = gene 
-                    b_score = gene.score
-            logger.debug('b_score = %f', b_score)
-
-        self.best_gene_data.append([bestgene.values[:], bestgene.score, self.iteration_count])
+        start = timer.add('score', start)
+        best_values, b_score = self.population.get_best()
+        logger.debug('b_score = %f', b_score)
+
+        self.record_best(best_values, b_score)
+        self.adapt_mutation()
+        start = timer.add('record', start)
         self.population.lemming()
+        start = timer.add('lemming', start)
         self.population.breed()
+        start = timer.add('breed', start)
         self.decloner()
+        start = timer.add('decloner', start)
         logger.debug('iteration: %d', self.iteration_count)
+        self.checkpoint_if_due()
+        timer.add('checkpoint', start)
+
+        return None
+
+
+    def is_finished(self):
+        """input: None
+        output: bool
+        returns True if any of the configured stopping criteria - convergence
+        of the best score, loss of diversity, or the run time - has been met,
+        and logs which one
+        """
+        reason = None
+
+        window = self.config['stop_window']
+        if (window > 0):
+            history = self.get_best_so_far()
+            if len(history) > window:
+                old_best = history[-1 - window]
+                gain = history[-1] - old_best
+                if gain <= self.config['stop_tolerance'] * abs(old_best):
+                    reason = ('best score {:f} improved by {:g} in the last {:d} ' +
+                        'iterations').format(history[-1], gain, window)
+
+        if (reason is None) and (self.config['stop_diversity'] > 0):
+            diversity = self.get_diversity()
+            if diversity < self.config['stop_diversity']:
+                reason = 'population diversity {:g} is below stop_diversity {:g}'.format(
+                    diversity, self.config['stop_diversity'])
+
+        if (reason is None) and (self.config['max_run_secs'] > 0):
+            run_secs = time.time() - self.start_time
+            if run_secs > self.config['max_run_secs']:
+                reason = 'run time {:.1f} seconds is over max_run_secs {:.1f}'.format(
+                    run_secs, self.config['max_run_secs'])
+
+        if reason is None:
+            return False
+
+        logger.info('geneticalgorithm stopping after iteration %d: %s', 
+            self.iteration_count, reason)
+        return True
+
+
+    def new_history(self):
+        """input: None
+        output: genehistory.BestGeneHistory
+        returns an empty best gene history, as configured
+        """
+        max_val = max(abs(self.config['min_param_val']), abs(self.config['max_param_val']))
+        if max_val < 2**15:
+            dtype = numpy.int16
+        elif max_val < 2**31:
+            dtype = numpy.int32
+        else:
+            dtype = numpy.int64
+        return genehistory.BestGeneHistory(self.config['max_len'],
+            store_mode=self.config['history_mode'],
+            store_every=self.config['history_every'],
+            delta_encode=self.config['history_delta'], dtype=dtype)
+
+
+    def record_best(self, values, score):
+        """input: list, float
+        output: None
+        records the best gene of the current iteration in the best gene 
+        data, and the best score so far for the stop_window test
+        """
+        self.last_best = [values, score, self.iteration_count]
+        self.best_gene_data.append(values, score, self.iteration_count)
+        if (len(self.best_so_far) == 0) or (score > self.best_so_far[-1]):
+            self.best_so_far.append(score)
+        else:
+            self.best_so_far.append(self.best_so_far[-1])
+        return None
+
+
+    def adapt_mutation(self):
+        """input: None
+        output: None
+        if adaptive_mutation is set, updates the population mutation rates 
+        from the position diversity and the best score so far
+        """
+        if self.mutation_control is None:
+            return None
+        rates = self.mutation_control.update(self.iteration_count,
+            self.population.get_position_diversity(), self.best_so_far[-1])
+        self.population.set_rates(rates)
+        return None
+
+
+    def get_best_so_far(self):
+        """input: None
+        output: list
+        returns the best score found up to each of the last stop_window + 1
+        iterations
+        """
+        return list(self.best_so_far)
+
+
+    def get_diversity(self):
+        """input: None
+        output: float
+        returns the population diversity, as from the population's get_diversity
+        """
+        return self.population.get_diversity()
+
+
+    def checkpoint_if_due(self):
+        """input: None
+        output: None
+        saves a checkpoint if checkpoint_frequency iterations have been
+        completed since the last one, and at least checkpoint_min_secs 
+        seconds have passed
+        """
+        frequency = self.config['checkpoint_frequency']
+        if (frequency <= 0) or (len(self.config['checkpoint_file']) == 0):
+            return None
+        if ((self.iteration_count + 1) % frequency) != 0:
+            return None
+        if (self.last_checkpoint_time is not None) and (
+            time.time() - self.last_checkpoint_time < self.config['checkpoint_min_secs']):
+            return None
+
+        self.save_checkpoint()
+        return None
+
+
+    def get_checkpoint_state(self):
+        """input: None
+        output: dict
+        returns everything needed to continue the run from here
+        """
+        return {
+            'iteration_count': self.iteration_count,
+            'clones_data': self.clones_data,
+            'best_gene_data': self.best_gene_data,
+            'best_so_far': list(self.best_so_far),
+            'random_state': random.getstate(),
+            'array_pop': self.config['array_pop'],
+            'surrogate': self.surrogate,
+            'surrogate_stats': self.surrogate_stats,
+            'surrogate_pending': self.surrogate_pending,
+            'mutation_control': self.mutation_control,
+            'population': self.population.get_state()}
+
+
+    def set_checkpoint_state(self, state):
+        """input: dict, as from get_checkpoint_state
+        output: None
+        restores the engine to the saved state
+        """
+        if not (state['array_pop'] == self.config['array_pop']):
+            msg = ('geneticalgorithm checkpoint was saved with array_pop = ' + 
+                str(state['array_pop']) + ' but array_pop is now ' + 
+                str(self.config['array_pop']))
+            raise mureilexception.ConfigException(msg, {})
 
+        self.population.set_state(state['population'])
+        self.iteration_count = state['iteration_count']
+        self.clones_data = state['clones_data']
+        self.best_gene_data = state['best_gene_data']
+        self.best_so_far = collections.deque(state['best_so_far'],
+            maxlen=self.config['stop_window'] + 1)
+        self.surrogate = state['surrogate']
+        self.surrogate_stats = state['surrogate_stats']
+        self.surrogate_pending = state['surrogate_pending']
+        self.mutation_control = state['mutation_control']
+        if self.mutation_control is not None:
+            self.population.set_rates(self.mutation_control.get_rates())
+        random.setstate(state['random_state'])
         return None
 
 
+    def save_checkpoint(self):
+        """input: None
+        output: None
+        writes the engine state to checkpoint_file, through a temporary
+        file so that an existing checkpoint is only replaced once the
+        new one is complete
+        """
+        filename = self.config['checkpoint_file']
+        temp_filename = filename + '.tmp'
+        start_time = time.time()
+
+        temp_file = open(temp_filename, 'wb')
+        try:
+            pickle.dump(self.get_checkpoint_state(), temp_file, pickle.HIGHEST_PROTOCOL)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        finally:
+            temp_file.close()
+
+        # os.rename does not replace an existing file on Windows
+        if (sys.platform == 'win32') and os.path.exists(filename):
+            os.remove(filename)
+        os.rename(temp_filename, filename)
+
+        self.last_checkpoint_time = time.time()
+        logger.debug('checkpoint at iteration %d written in %.3f seconds',
+            self.iteration_count, self.last_checkpoint_time - start_time)
+        return None
+
+
+    def load_checkpoint(self):
+        """input: None
+        output: int
+        restores the engine state from checkpoint_file, and returns the
+        number of iterations already completed. Call after prepare_run.
+        """
+        filename = self.config['checkpoint_file']
+        if (len(filename) == 0) or not os.path.exists(filename):
+            msg = ('geneticalgorithm resume requested, but checkpoint_file \'' + 
+                filename + '\' does not exist')
+            logger.critical(msg)
+            raise mureilexception.ConfigException(msg, {})
+
+        checkpoint = open(filename, 'rb')
+        try:
+            state = pickle.load(checkpoint)
+        finally:
+            checkpoint.close()
+
+        self.set_checkpoint_state(state)
+        logger.info('resumed from checkpoint %s after iteration %d', filename,
+            self.iteration_count)
+        return self.iteration_count + 1
+
+
     def pop_score(self):
         """input: pop class
         output: None
-        sends every gene to poolin, then updates all genes scores from poolout data
+        scores every new or changed gene, then updates those genes scores.
+        Genes unchanged since they were last scored keep their score, unless
+        rescore_unchanged is set. With surrogate_fraction set, some genes 
+        may be given a predicted score instead, as described in screen.
+        """
+        all_values = self.population.get_values()
+        if self.config['rescore_unchanged']:
+            indices = range(len(all_values))
+        else:
+            indices = self.population.get_dirty_indices()
+
+        if self.is_screening(indices):
+            indices = self.screen(all_values, indices)
+        else:
+            values_list = [all_values[i] for i in indices]
+            scores = self.evaluate(values_list)
+            self.population.set_scores(scores, indices)
+            if self.surrogate is not None:
+                self.surrogate.add(values_list, scores)
+                self.count_saved(values_list, values_list, [])
+
+        logger.debug('pop_score: %d of %d genes evaluated', len(indices), len(all_values))
+        if self.cache is not None:
+            logger.debug(self.cache.get_stats_string())
+
+        return None
+
+
+    def is_screening(self, indices):
+        """input: list of positions to be scored
+        output: bool
+        returns True if the genes to be scored on this iteration should be
+        screened with the surrogate
+        """
+        if (self.surrogate is None) or (len(indices) == 0):
+            return False
+        min_samples = self.config['surrogate_min_samples']
+        if min_samples <= 0:
+            min_samples = 2 * self.config['pop_size']
+        if self.surrogate.get_count() < min_samples:
+            return False
+        refresh = self.config['surrogate_refresh']
+        if (refresh > 0) and ((self.iteration_count + 1) % refresh == 0):
+            return False
+        return True
+
+
+    def screen(self, all_values, indices):
+        """input: list or array of gene values, list of positions
+        output: list of positions
+        predicts the scores of the genes at indices with the surrogate, 
+        then scores the most promising surrogate_fraction of them, and any
+        others predicted to beat the best score known, so the best gene
+        always has a true score. The rest are given their predicted score
+        but left marked as needing a score. Returns the positions scored.
+        """
+        values_list = [all_values[i] for i in indices]
+        predicted = self.surrogate.predict(values_list)
+        order = numpy.argsort(-predicted, kind='mergesort').tolist()
+        count = int(math.ceil(self.config['surrogate_fraction'] * len(order)))
+        chosen = order[:count]
+        scores = self.evaluate([values_list[k] for k in chosen])
+
+        screened = set(indices)
+        all_scores = self.population.get_scores()
+        known = [all_scores[i] for i in range(len(all_scores)) if i not in screened]
+        best = max(known + scores)
+        extra = [k for k in order[count:] if predicted[k] >= best]
+        if len(extra) > 0:
+            scores += self.evaluate([values_list[k] for k in extra])
+        rest = [k for k in order[count:] if predicted[k] < best]
+
+        scored = [indices[k] for k in chosen + extra]
+        self.population.set_scores(scores, scored)
+        self.population.set_estimates(predicted[rest], [indices[k] for k in rest])
+        self.surrogate.add([values_list[k] for k in chosen + extra], scores)
+        self.count_saved(values_list, [values_list[k] for k in chosen + extra],
+            [values_list[k] for k in rest])
+
+        # A hit is a chosen gene that scores above the median of the
+        # genes already in the population
+        stats = self.surrogate_stats
+        if len(known) > 0:
+            median = numpy.median(known)
+            stats['hits'] += len([score for score in scores[:count] if score > median])
+            stats['hit_trials'] += count
+        stats['screened'] += len(order)
+        stats['scored'] += len(scored)
+        stats['estimated'] += len(rest)
+        logger.debug('surrogate: %d of %d genes scored, %d estimated', len(scored),
+            len(order), len(rest))
+        return scored
+
+
+    def count_saved(self, waiting_values, scored_values, estimated_values):
+        """input: lists of gene values
+        output: None
+        keeps count of the evaluations saved by the surrogate - the genes 
+        given a predicted score and not sent to gene_test since. Of the genes
+        waiting for a score, scored_values were sent to gene_test and 
+        estimated_values were given a predicted score. A gene estimated
+        earlier and no longer waiting has been culled or changed, so is 
+        never scored, and is no longer tracked.
+        """
+        stats = self.surrogate_stats
+        self.surrogate_pending.intersection_update(
+            [fitnesscache.make_key(values) for values in waiting_values])
+        for values in scored_values:
+            key = fitnesscache.make_key(values)
+            if key in self.surrogate_pending:
+                self.surrogate_pending.remove(key)
+                stats['saved'] -= 1
+        for values in estimated_values:
+            key = fitnesscache.make_key(values)
+            if key not in self.surrogate_pending:
+                self.surrogate_pending.add(key)
+                stats['saved'] += 1
+        return None
+
+
+    def get_surrogate_string(self):
+        """input: None
+        output: string
+        returns a summary of the surrogate screening so far
         """
+        stats = self.surrogate_stats
+        hit_rate = float(stats['hits']) / max(stats['hit_trials'], 1)
+        return ('{:d} genes screened, {:d} scored, {:d} estimated, ' + 
+            '{:d} evaluations saved, hit rate {:.2f}').format(stats['screened'], 
+            stats['scored'], stats['estimated'], stats['saved'], hit_rate)
+
+
+    def evaluate(self, values_list):
+        """input: list of gene values
+        output: list of scores
+        looks each gene up in the fitness cache, if configured, and sends
+        the rest to be scored. Identical genes are only scored once. Scores
+        that are not finite, such as the -inf given to a gene that timed out
+        under the penalise timeout_policy, are not cached, so the gene is
+        scored again if it is seen again.
+        """
+        if self.cache is None:
+            return self.dispatch(values_list)
+
+        scores = [None] * len(values_list)
+        to_score = collections.OrderedDict()
+        for n in range(len(values_list)):
+            key = self.cache.make_key(values_list[n])
+            if key in to_score:
+                to_score[key].append(n)
+                continue
+            score = self.cache.lookup(key)
+            if score is None:
+                to_score[key] = [n]
+            else:
+                scores[n] = score
+
+        keys = to_score.keys()
+        new_scores = self.dispatch([values_list[to_score[key][0]] for key in keys])
+        for key, score in zip(keys, new_scores):
+            if numpy.isfinite(score):
+                self.cache.store(key, score)
+            for n in to_score[key]:
+                scores[n] = score
+
+        return scores
+
+
+    def dispatch(self, values_list):
+        """input: list of gene values
+        output: list of scores
+        sends the genes in chunks to the worker pool, or scores them 
+        directly if multiprocessing is not active
+        """
+        start = time.time()
         if self.mp_active:
-            for n in range(len(self.population.genes)):
-                vals = self.population.genes[n].values
-                self.poolin.put((n, vals))
-            for n in range(len(self.population.genes)):
-                # Implements a blocking get - will wait up
-                # to 60 seconds for a result to be available, then
-                # raise the Empty exception.
-                s = self.poolout.get(True, 60)
-                self.population.genes[s[0]].score = s[1]
+            scores = self.pool.score(values_list)
         else:
-            for n in range(len(self.population.genes)):
-                vals = self.population.genes[n].values
-                self.population.genes[n].score = self.gene_test(vals)
+            scores = workerpool.score_genes(self.gene_test, self.gene_test_batch,
+                values_list, self.evaluation_seed)
+        self.timer.add('gene_test', start)
+        return scores
 
 
+    def get_timing_string(self):
+        """input: None
+        output: string
+        returns a summary of the time spent in each phase of the run so far,
+        and in the worker pool if multiprocessing is active. gene_test is
+        the time spent waiting for scores, and is part of the score and
+        decloner phases.
+        """
+        timing = self.timer.get_string()
+        if self.mp_active:
+            timing += '; pool ' + self.pool.get_timing_string()
+        return timing
+
+
+    def get_emigrants(self, count):
+        """input: int
+        output: list of lists
+        returns copies of the values of up to count of the best scored genes,
+        for migration to another population
+        """
+        return self.population.get_top(count)
+
+
+    def add_immigrants(self, values_list):
+        """input: list of lists
+        output: None
+        replaces the worst genes with genes migrated from another population.
+        They are scored on the next iteration.
+        """
+        self.population.replace_worst(values_list)
         return None
 
 
     def clone_test(self):
-        field = []
-        for base in self.population.genes[0].values:
-            field.append([])
-        for gene in self.population.genes:
-            i = 0
-            for base in gene.values:
-                if len(field[i]) == 0:
-                    field[i].append([base,1])
-                else:
-                    add = True
-                    for tup in field[i]:
-                        if tup[0] == base:
-                            tup[1] += 1
-                            add = False
-                    if add == True:
-                        field[i].append([base,1])
-                i += 1
-        matches = 0
-        final = []
-        for val_list in field:
-            for total in val_list:
-                if total[1] >= self.config['pop_size']*0.9:
-                    matches += 1
-                    final.append(total[0])
-        if matches == len(field):
-            score = self.gene_test(final)
+        found, final = self.population.find_clone(self.config['pop_size']*0.9)
+        if found:
+            score = self.evaluate([final])[0]
             return True, [final, score]
         else:
             return False, [[],0]
@@ -315,11 +924,79 @@ class Engine(configurablebase.ConfigurableBase):
         if c_bool:
             clone_stats.append(self.iteration_count)
             self.clones_data.append(clone_stats)
-            for n in range(self.config['nuke_power']):
+            if self.mutation_control is not None:
+                self.population.set_rates(self.mutation_control.boost())
                 self.population.mutate()
+            else:
+                for n in range(self.config['nuke_power']):
+                    self.population.mutate()
         return None
 
 
+def find_clone_columns(values, threshold, present=None):
+    """input: (pop_size, gene_len) int array, float, optional bool array
+    output: bool, list
+    checks if in every column of values at least threshold entries share the
+    same value, counting only the entries flagged in present if given, and 
+    if so returns True and the list of those values.
+
+    threshold must be more than half of pop_size. Then a value that 
+    reaches it fills more than half of its sorted column, so it must be 
+    the median of that column, and only the median needs counting.
+    """
+    count = values.shape[0]
+    median = numpy.partition(values, count // 2, axis=0)[count // 2]
+    matches = (values == median)
+    if present is not None:
+        matches &= present
+    if numpy.all(matches.sum(axis=0) >= threshold):
+        return True, median.tolist()
+    else:
+        return False, []
+
+
+def get_position_diversity(values, config):
+    """input: (pop_size, gene_len) array, config dict
+    output: float array
+    returns the standard deviation of each column of values, as a proportion
+    of the range max_param_val - min_param_val
+    """
+    param_range = max(config['max_param_val'] - config['min_param_val'], 1)
+    return numpy.std(values, axis=0) / param_range
+
+
+def get_diversity(values, config):
+    """input: (pop_size, gene_len) array, config dict
+    output: float
+    returns the mean over the columns of values of their standard deviation,
+    as a proportion of the range max_param_val - min_param_val
+    """
+    if values.shape[1] == 0:
+        return 0.0
+    return float(numpy.mean(get_position_diversity(values, config)))
+
+
+def set_spec_defaults(config_spec, defaults):
+    """input: list of (name, conversion, default) tuples, dict of name: default
+    output: list
+    returns config_spec with the defaults of the entries named in defaults
+    replaced, so that engines built on Engine that do not read those entries
+    need not have them configured
+    """
+    return [(name, conversion, defaults.get(name, default)) 
+        for name, conversion, default in config_spec]
+
+
+def get_rates(config):
+    """input: config dict
+    output: dict
+    returns the configured base_mute, local_mute and gene_mute, as the
+    starting mutation rates of a population
+    """
+    return {'base_mute': config['base_mute'], 'local_mute': config['local_mute'],
+        'gene_mute': config['gene_mute']}
+
+
 class Value:
     def __init__(self, min_size, max_size):
         self.value = random.randint(min_size, max_size)
@@ -338,6 +1015,7 @@ class Gene(list):
         """
         self.length = random.randint(self.config['min_len'], self.config['max_len'])
         self.score = None
+        self.dirty = True
         self.values = []
         
         min_param_val = self.config['min_param_val']
@@ -367,11 +1045,162 @@ class Pop(list):
         """
         self.genes = []
         self.config = config
+        self.rates = get_rates(config)
 
         for i in range(self.config['pop_size']):
             self.gene = Gene(self.config)
             self.genes.append(self.gene)
         return None
+
+    def get_values(self):
+        """input: None
+        output: list of lists
+        returns the values of every gene, in population order
+        """
+        return [gene.values for gene in self.genes]
+
+    def get_scores(self):
+        """input: None
+        output: list
+        returns the score of every gene, in population order
+        """
+        return [gene.score for gene in self.genes]
+
+    def get_dirty_indices(self):
+        """input: None
+        output: list
+        returns the positions of genes that are new or have changed
+        since they were last scored
+        """
+        return [i for i in range(len(self.genes)) if self.genes[i].dirty]
+
+    def set_scores(self, scores, indices):
+        """input: list, list of positions (same length)
+        output: None
+        sets the score of the gene at each position, and marks it as scored
+        """
+        for i, score in zip(indices, scores):
+            self.genes[i].score = score
+            self.genes[i].dirty = False
+        return None
+
+    def set_estimates(self, scores, indices):
+        """input: list, list of positions (same length)
+        output: None
+        sets the score of the gene at each position to an estimate, leaving
+        it marked as needing a score
+        """
+        for i, score in zip(indices, scores):
+            self.genes[i].score = score
+        return None
+
+    def get_best(self):
+        """input: None
+        output: list, float/int
+        returns a copy of the values of the best-scoring gene, and its
+        score. The first gene found wins a tie.
+        """
+        bestgene = self.genes[0]
+        for gene in self.genes:
+            if gene.score > bestgene.score:
+                bestgene = gene
+        return bestgene.values[:], bestgene.score
+
+    def get_state(self):
+        """input: None
+        output: list
+        returns a (values, score, dirty) tuple for each gene, for checkpoints
+        """
+        return [(gene.values[:], gene.score, gene.dirty) for gene in self.genes]
+
+    def set_state(self, state):
+        """input: list, as from get_state
+        output: None
+        replaces the population with genes holding the saved state
+        """
+        self.genes = []
+        for values, score, dirty in state:
+            gene = Gene(self.config)
+            gene.values = list(values)
+            gene.length = len(gene.values)
+            gene.score = score
+            gene.dirty = dirty
+            self.genes.append(gene)
+        return None
+
+    def get_top(self, count):
+        """input: int
+        output: list of lists
+        returns copies of the values of up to count of the best-scoring
+        genes, best first, skipping genes not scored since they changed
+        """
+        scored = [gene for gene in self.genes if not gene.dirty]
+        scored.sort(key=lambda gene: gene.score, reverse=True)
+        return [gene.values[:] for gene in scored[:count]]
+
+    def replace_worst(self, values_list):
+        """input: list of lists
+        output: None
+        replaces the worst-scoring genes, counting unscored genes as
+        worst, with new genes holding values_list
+        """
+        order = sorted(range(len(self.genes)), key=lambda i: 
+            (not self.genes[i].dirty, self.genes[i].score))
+        for i, values in zip(order, values_list):
+            gene = self.genes[i]
+            gene.values = list(values)
+            gene.length = len(gene.values)
+            gene.score = None
+            gene.dirty = True
+        return None
+
+    def find_clone(self, threshold):
+        """input: float, more than half the population size
+        output: bool, list
+        checks if at every position of the first gene at least threshold 
+        genes share the same value, and if so returns True and the list of 
+        those values. Genes shorter than the first count only at the 
+        positions they have.
+        """
+        length = len(self.genes[0].values)
+        values = numpy.zeros((len(self.genes), length), dtype=numpy.int64)
+        present = numpy.ones(values.shape, dtype=bool)
+        for i in range(len(self.genes)):
+            gene_values = self.genes[i].values[:length]
+            values[i,:len(gene_values)] = gene_values
+            present[i,len(gene_values):] = False
+        return find_clone_columns(values, threshold, present)
+
+    def get_diversity(self):
+        """input: None
+        output: float
+        returns the standard deviation of the gene values at each position,
+        averaged over the positions held by every gene, as a proportion of
+        the range max_param_val - min_param_val
+        """
+        length = min([len(gene.values) for gene in self.genes])
+        values = numpy.array([gene.values[:length] for gene in self.genes], dtype=float)
+        return get_diversity(values, self.config)
+
+    def get_position_diversity(self):
+        """input: None
+        output: float array
+        returns the standard deviation of the gene values at each position
+        held by every gene, as a proportion of the range max_param_val - 
+        min_param_val
+        """
+        length = min([len(gene.values) for gene in self.genes])
+        values = numpy.array([gene.values[:length] for gene in self.genes], dtype=float)
+        return get_position_diversity(values, self.config)
+
+    def set_rates(self, rates):
+        """input: dict
+        output: None
+        sets the base_mute, local_mute and gene_mute rates used by mutate,
+        in place of the configured rates
+        """
+        self.rates = dict(rates)
+        return None
         
     def lemming(self):
         """input: None
@@ -435,9 +1264,9 @@ class Pop(list):
         """
         min_len = self.config['min_len']
         max_len = self.config['max_len']
-        gene_mute = self.config['gene_mute']
-        base_mute = self.config['base_mute']
-        local_mute = self.config['local_mute']
+        gene_mute = self.rates['gene_mute']
+        base_mute = self.rates['base_mute']
+        local_mute = self.rates['local_mute']
         local_mute_size = self.config['local_mute_size']
         min_param_val = self.config['min_param_val']
         max_param_val = self.config['max_param_val']
@@ -465,12 +1294,14 @@ class Pop(list):
             self.base = Value(min_val, 
                 max_val)
             self.genes[i].values[j] = self.base.value
+            self.genes[i].dirty = True
         for co_ord in positions:
             i = co_ord[0]
             j = co_ord[1]
             self.base = Value(min_param_val, 
                 max_param_val)
             self.genes[i].values[j] = self.base.value
+            self.genes[i].dirty = True
         for gene_no in freaks:
             freak = self.genes[gene_no].values
             new_len = random.randint(min_len, max_len)
@@ -482,9 +1313,67 @@ class Pop(list):
                         max_param_val)
                     freak.append(self.base.value)
             self.genes[gene_no].values = freak
+            self.genes[gene_no].dirty = True
         return None
     
     
+    def make_child(self):
+        """input: None
+        output: list
+        returns the values of a new gene, recombined from two random genes
+        as for breed, then mutated as for mutate
+        """
+        mum = random.choice(self.genes)
+        dad = random.choice(self.genes)
+        if len(mum.values) < len(dad.values):
+            values = self.pair_list(dad.values, mum.values)
+        else:
+            values = self.pair_list(mum.values, dad.values)
+        return self.mutate_values(values)
+
+    def mutate_values(self, values):
+        """input: list
+        output: list
+        randomly changes some of the values, and possibly the length, of 
+        one gene, at the rates used by mutate
+        """
+        min_len = self.config['min_len']
+        max_len = self.config['max_len']
+        local_mute = self.rates['local_mute']
+        local_mute_size = self.config['local_mute_size']
+        min_param_val = self.config['min_param_val']
+        max_param_val = self.config['max_param_val']
+
+        for j in range(len(values)):
+            if (local_mute > 0) and (random.random() < local_mute):
+                curr = values[j]
+                radius = int(math.ceil(abs(float(curr)) * local_mute_size))
+                values[j] = random.randint(max(min_param_val, curr - radius),
+                    min(max_param_val, curr + radius))
+            if random.random() < self.rates['base_mute']:
+                values[j] = random.randint(min_param_val, max_param_val)
+        if random.random() < self.rates['gene_mute']:
+            new_len = random.randint(min_len, max_len)
+            values = values[:new_len]
+            while len(values) < new_len:
+                values.append(random.randint(min_param_val, max_param_val))
+        return values
+
+    def insert_child(self, values, score):
+        """input: list, float
+        output: bool
+        puts a scored gene in place of the worst-scoring gene, if it scores
+        higher, and returns True if it did
+        """
+        worst = min(self.genes, key=lambda gene: gene.score)
+        if not (score > worst.score):
+            return False
+        worst.values = list(values)
+        worst.length = len(worst.values)
+        worst.score = score
+        worst.dirty = False
+        return True
+
     def pair_list(self, tall, short):
         """input: list, list (len <= first list)
         output: list
@@ -505,3 +1394,294 @@ class Pop(list):
                     result.append(short[i])
         return result
 
+
+class ArrayPop(object):
+    """Population of fixed-length genes held as a single (pop_size, gene_len)
+    integer array, with a matching vector of scores. Provides the same
+    interface to Engine as Pop, with mutation, breeding, culling and clone
+    detection done as array operations. Uses its own numpy RandomState,
+    seeded from config['seed'], so runs are reproducible from the seed.
+    """
+    def __init__(self, config):
+        """input: dict as for Pop, with min_len == max_len
+        output: None
+        sets up the population array and its random stream
+        """
+        self.config = config
+        self.rates = get_rates(config)
+        self.rand = numpy.random.RandomState(self.config['seed'])
+
+        pop_size = self.config['pop_size']
+        gene_len = self.config['min_len']
+        min_starts = self.config['start_values_min']
+        max_starts = self.config['start_values_max']
+
+        if len(min_starts) == 0:
+            min_starts = numpy.ones(gene_len) * self.config['min_param_val']
+            max_starts = numpy.ones(gene_len) * self.config['max_param_val']
+
+        min_starts = numpy.array(min_starts, dtype=numpy.int64)
+        max_starts = numpy.array(max_starts, dtype=numpy.int64)
+
+        self.values = self.randint_between(
+            numpy.tile(min_starts, (pop_size, 1)),
+            numpy.tile(max_starts, (pop_size, 1)))
+        self.scores = numpy.zeros(pop_size) * numpy.nan
+        self.dirty = numpy.ones(pop_size, dtype=bool)
+        return None
+
+    def randint_between(self, min_vals, max_vals):
+        """input: int arrays, of the same shape
+        output: int array
+        returns random integers, uniform on [min_vals, max_vals] inclusive,
+        elementwise
+        """
+        spread = (max_vals - min_vals + 1).astype(float)
+        offset = numpy.floor(self.rand.random_sample(min_vals.shape) * spread)
+        return min_vals + offset.astype(numpy.int64)
+
+    def get_values(self):
+        """input: None
+        output: int array
+        returns the population array, one gene per row
+        """
+        return self.values
+
+    def get_scores(self):
+        """input: None
+        output: float array
+        returns the score vector
+        """
+        return self.scores
+
+    def get_dirty_indices(self):
+        """input: None
+        output: int array
+        returns the positions of genes that are new or have changed
+        since they were last scored
+        """
+        return numpy.flatnonzero(self.dirty)
+
+    def set_scores(self, scores, indices):
+        """input: list or array, positions (same length)
+        output: None
+        sets the score of the gene at each position, and marks it as scored
+        """
+        self.scores[indices] = scores
+        self.dirty[indices] = False
+        return None
+
+    def set_estimates(self, scores, indices):
+        """input: list or array, positions (same length)
+        output: None
+        sets the score of the gene at each position to an estimate, leaving
+        it marked as needing a score
+        """
+        self.scores[indices] = scores
+        return None
+
+    def get_best(self):
+        """input: None
+        output: list, float
+        returns a copy of the values of the best-scoring gene, and its
+        score. The first gene found wins a tie.
+        """
+        best = numpy.argmax(self.scores)
+        return self.values[best].tolist(), float(self.scores[best])
+
+    def get_state(self):
+        """input: None
+        output: dict
+        returns copies of the population arrays and the random stream
+        state, for checkpoints
+        """
+        return {'values': self.values.copy(), 'scores': self.scores.copy(),
+            'dirty': self.dirty.copy(), 'random_state': self.rand.get_state()}
+
+    def set_state(self, state):
+        """input: dict, as from get_state
+        output: None
+        restores the population arrays and the random stream
+        """
+        self.values = state['values'].copy()
+        self.scores = state['scores'].copy()
+        self.dirty = state['dirty'].copy()
+        self.rand.set_state(state['random_state'])
+        return None
+
+    def get_top(self, count):
+        """input: int
+        output: list of lists
+        returns copies of the values of up to count of the best-scoring
+        genes, best first, skipping genes not scored since they changed
+        """
+        scored = numpy.flatnonzero(~self.dirty)
+        order = scored[numpy.argsort(-self.scores[scored], kind='mergesort')]
+        return self.values[order[:count]].tolist()
+
+    def replace_worst(self, values_list):
+        """input: list of lists
+        output: None
+        replaces the worst-scoring genes, counting unscored genes as
+        worst, with new genes holding values_list
+        """
+        if len(values_list) == 0:
+            return None
+        keys = numpy.where(self.dirty, -numpy.inf, self.scores)
+        worst = numpy.argsort(keys, kind='mergesort')[:len(values_list)]
+        self.values[worst] = numpy.array(values_list, dtype=numpy.int64)
+        self.scores[worst] = numpy.nan
+        self.dirty[worst] = True
+        return None
+
+    def find_clone(self, threshold):
+        """input: float, more than half the population size
+        output: bool, list
+        checks if at every position at least threshold genes share the
+        same value, and if so returns True and the list of those values
+        """
+        return find_clone_columns(self.values, threshold)
+
+    def get_diversity(self):
+        """input: None
+        output: float
+        returns the standard deviation of the gene values at each position,
+        averaged over the positions, as a proportion of the range
+        max_param_val - min_param_val
+        """
+        return get_diversity(self.values, self.config)
+
+    def get_position_diversity(self):
+        """input: None
+        output: float array
+        returns the standard deviation of the gene values at each position,
+        as a proportion of the range max_param_val - min_param_val
+        """
+        return get_position_diversity(self.values, self.config)
+
+    def set_rates(self, rates):
+        """input: dict
+        output: None
+        sets the base_mute and local_mute rates used by mutate, in place of
+        the configured rates
+        """
+        self.rates = dict(rates)
+        return None
+
+    def lemming(self):
+        """input: None
+        output: None
+        culls some genes from pop based on mortality rate and genes score
+        """
+        count = self.values.shape[0]
+        if count == 0:
+            msg = 'geneticalgorithm found len(genes) == 0 in lemming'
+            logger.critical(msg)
+            raise(mureilexception.AlgorithmException(msg, {}))
+
+        # Stable sort on descending score, then apply the same rank-based
+        # death probability as Pop.lemming.
+        order = numpy.argsort(-self.scores, kind='mergesort')
+        r = self.config['mort']
+        n = self.config['pop_size']
+        prob = (r/10.5)*((float(19*n-1)/(n-1)**2)*numpy.arange(count) + 1)
+        survivors = order[self.rand.random_sample(count) >= prob]
+        survivors = self.rand.permutation(survivors)
+
+        self.values = self.values[survivors]
+        self.scores = self.scores[survivors]
+        self.dirty = self.dirty[survivors]
+        return None
+
+    def breed(self):
+        """input: None
+        output: None
+        fills the population back up to pop_size by uniform crossover of
+        random pairs of surviving genes
+        """
+        count = self.values.shape[0]
+        if count == 0:
+            msg = 'geneticalgorithm found len(genes) == 0 in breed'
+            logger.critical(msg)
+            raise(mureilexception.AlgorithmException(msg, {}))
+
+        child_count = self.config['pop_size'] - count
+        if child_count > 0:
+            mums = self.rand.randint(0, count, child_count)
+            dads = self.rand.randint(0, count, child_count)
+            from_dad = self.rand.random_sample(
+                (child_count, self.values.shape[1])) < 0.5
+            children = numpy.where(from_dad, self.values[dads], self.values[mums])
+            self.values = numpy.vstack((self.values, children))
+            self.scores = numpy.concatenate(
+                (self.scores, numpy.zeros(child_count) * numpy.nan))
+            self.dirty = numpy.concatenate(
+                (self.dirty, numpy.ones(child_count, dtype=bool)))
+        return None
+
+    def mutate(self):
+        """input: None
+        output: None
+        randomly changes some values, as for Pop.mutate. Gene length is
+        fixed so gene_mute does not apply.
+        """
+        self.dirty |= self.mutate_values(self.values)
+        return None
+
+    def mutate_values(self, values):
+        """input: int array, one gene per row
+        output: bool array
+        randomly changes some of the values in place, at the rates used by
+        mutate, and returns a flag for each row that was changed
+        """
+        base_mute = self.rates['base_mute']
+        local_mute = self.rates['local_mute']
+        local_mute_size = self.config['local_mute_size']
+        min_param_val = self.config['min_param_val']
+        max_param_val = self.config['max_param_val']
+        changed = numpy.zeros(values.shape[0], dtype=bool)
+
+        if local_mute > 0:
+            mask = self.rand.random_sample(values.shape) < local_mute
+            curr = values[mask]
+            radius = numpy.ceil(numpy.abs(curr) * local_mute_size).astype(numpy.int64)
+            min_vals = numpy.maximum(min_param_val, curr - radius)
+            max_vals = numpy.minimum(max_param_val, curr + radius)
+            values[mask] = self.randint_between(min_vals, max_vals)
+            changed |= mask.any(axis=1)
+
+        mask = self.rand.random_sample(values.shape) < base_mute
+        values[mask] = self.rand.randint(min_param_val, max_param_val + 1,
+            numpy.count_nonzero(mask))
+        changed |= mask.any(axis=1)
+        return changed
+
+    def make_child(self):
+        """input: None
+        output: list
+        returns the values of a new gene, from uniform crossover of two
+        random genes as for breed, then mutated as for mutate
+        """
+        count = self.values.shape[0]
+        mum, dad = self.rand.randint(0, count, 2)
+        from_dad = self.rand.random_sample(self.values.shape[1]) < 0.5
+        child = numpy.where(from_dad, self.values[dad], self.values[mum])
+        child = child.reshape(1, -1)
+        self.mutate_values(child)
+        return child[0].tolist()
+
+    def insert_child(self, values, score):
+        """input: list, float
+        output: bool
+        puts a scored gene in place of the worst-scoring gene, counting
+        unscored genes as worst, if it scores higher, and returns True if
+        it did
+        """
+        keys = numpy.where(self.dirty, -numpy.inf, self.scores)
+        worst = numpy.argmin(keys)
+        if not (score > keys[worst]):
+            return False
+        self.values[worst] = values
+        self.scores[worst] = score
+        self.dirty[worst] = False
+        return True
@@ -33,14 +33,14 @@ Based on GA.py by steven, Jan 7, 2011
 """
 
 from tools import configurablebase, mureilexception
+from algorithm import workerpool
 
 import random
 import logging
+import math
 import sys
 import copy
 
-from scipy import optimize
-
 logger = logging.getLogger(__name__)
 
 class Engine(configurablebase.ConfigurableBase):
@@ -61,6 +61,10 @@ class Engine(configurablebase.ConfigurableBase):
 
     def complete_configuration(self):
         self.gene_test = self.config['gene_test_callback']
+        if self.config['gene_test_batch_callback']:
+            self.gene_test_batch = self.config['gene_test_batch_callback']
+        else:
+            self.gene_test_batch = None
         
         random.seed(self.config['seed'])
         self.population = Pop(self.config)
@@ -100,9 +104,22 @@ class Engine(configurablebase.ConfigurableBase):
             gene_mute: ?
             gene_test_callback: function handle to calculate cost of gene. This function
                 must be thread-safe as it will be called in multiprocessing.
+            gene_test_batch_callback: optional function handle to calculate the scores of
+                a (n, gene_len) array of genes. If set, it is used to score each set 
+                of equal-length genes, in the worker processes if multiprocessing.
             start_values_min: list of minimum initialisation values for genes.
                 Should be empty, or the same length as min_len.
             start_values_max: as for start_values_min, but maximum.
+            descend_mute: the rate (proportion) of genes that are improved by local
+                descent on each iteration.
+            descend_iterations: the number of rounds of descent for each gene. In
+                each round, one value of every descending gene is moved up and down
+                by descend_step, and the best of the moves is kept if it scores
+                higher. The probes of all of the genes are scored together.
+            descend_step: the size of each descent move, as a proportion of the
+                current value, and at least 1.
+            descend_budget: the maximum number of gene evaluations spent on descent
+                in one iteration. 0 (the default) means descend_iterations * pop_size.
         """
         return [
             ('min_param_val', int, None), 
@@ -117,10 +134,13 @@ class Engine(configurablebase.ConfigurableBase):
             ('min_len', int, None), 
             ('max_len', int, None),
             ('gene_test_callback', None, self.gene_test_undef),
+            ('gene_test_batch_callback', None, ''),
             ('start_values_min', None, []),
             ('start_values_max', None, []),
             ('descend_mute', float, 0.0),
-            ('descend_iterations', int, 10)
+            ('descend_iterations', int, 10),
+            ('descend_step', float, 0.1),
+            ('descend_budget', int, 0)
             ]
 
 
@@ -142,12 +162,8 @@ class Engine(configurablebase.ConfigurableBase):
             
         if (self.config['processes'] > 0):
             # Set up the multiprocessing
-            from multiprocessing import Process, Queue
-            self.poolin = Queue()
-            self.poolout = Queue()
-            for n in range(self.config['processes']):
-                p = Process(target=self.multiprocess, args=())
-                p.start()
+            self.pool = workerpool.WorkerPool(self.gene_test, self.config['processes'],
+                gene_test_batch=self.gene_test_batch, seed=self.config['seed'])
             self.mp_active = True
             logger.debug('Multiprocessing started')
 
@@ -158,26 +174,23 @@ class Engine(configurablebase.ConfigurableBase):
         return None
 
 
-    def end_multiprocessing(self):
-        if self.mp_active:
-            for n in range(self.config['processes']):
-                self.poolin.put('die')
+    def is_finished(self):
+        """This engine has no stopping criteria, so always runs
+        the full number of iterations.
+        """
+        return False
 
 
-    def multiprocess(self):
-        """input: None
-        output: None
-        takes genes out of poolin and puts their position and score in poolout
-        """
-        while True:
-            vals = self.poolin.get()
-            if vals == 'die':
-                break
-            pos = vals[0]
-            gene = vals[1]
-            score = self.gene_test(gene)
-            self.poolout.put((pos, score))
-        return None
+    def load_checkpoint(self):
+        msg = 'geneticalgorithm_descend does not save checkpoints, so cannot resume'
+        logger.critical(msg)
+        raise mureilexception.ConfigException(msg, {})
+
+
+    def end_multiprocessing(self):
+        if self.mp_active:
+            self.pool.close()
+            self.mp_active = False
 
 
     def get_population(self):
@@ -221,7 +234,8 @@ class Engine(configurablebase.ConfigurableBase):
 
         self.iteration_count += 1
         self.population.mutate()
-        self.population.descend()
+        evaluations = self.population.descend(self.evaluate)
+        logger.debug('descend: %d evaluations', evaluations)
         self.pop_score()
         if self.iteration_count % 1 == 0:
             try:
@@ -250,27 +264,28 @@ class Engine(configurablebase.ConfigurableBase):
     def pop_score(self):
         """input: pop class
         output: None
-        sends every gene to poolin, then updates all genes scores from poolout data
+        scores every gene, then updates all genes scores
         """
-        if self.mp_active:
-            for n in range(len(self.population.genes)):
-                vals = self.population.genes[n].values
-                self.poolin.put((n, vals))
-            for n in range(len(self.population.genes)):
-                # Implements a blocking get - will wait up
-                # to 60 seconds for a result to be available, then
-                # raise the Empty exception.
-                s = self.poolout.get(True, 60)
-                self.population.genes[s[0]].score = s[1]
-        else:
-            for n in range(len(self.population.genes)):
-                vals = self.population.genes[n].values
-                self.population.genes[n].score = self.gene_test(vals)
-
+        scores = self.evaluate([gene.values for gene in self.population.genes])
+        for n in range(len(self.population.genes)):
+            self.population.genes[n].score = scores[n]
 
         return None
 
 
+    def evaluate(self, values_list):
+        """input: list of gene values
+        output: list of scores
+        scores the genes through the worker pool, or directly if 
+        multiprocessing is not active
+        """
+        if self.mp_active:
+            return self.pool.score(values_list)
+        else:
+            return workerpool.score_genes(self.gene_test, self.gene_test_batch,
+                values_list)
+
+
     def clone_test(self):
         field = []
         for base in self.population.genes[0].values:
@@ -360,7 +375,6 @@ class Pop(list):
         """
         self.genes = []
         self.config = config
-        self.gene_test_callback = self.config['gene_test_callback']
 
         for i in range(self.config['pop_size']):
             self.gene = Gene(self.config)
@@ -454,16 +468,66 @@ class Pop(list):
             self.genes[gene_no].values = freak
         return None
 
-    def descend(self):
-        """Randomly choose genes to apply a few iterations of a gradient-descent
-        algorithm to, to hasten convergence to a solution when one is nearby.
+    def descend(self, evaluate):
+        """Randomly choose genes to apply a few rounds of coordinate descent
+        to, to hasten convergence to a solution when one is nearby. In each
+        round, one random value of every chosen gene is moved up and down, 
+        and all of the probes are scored in one call to evaluate, a function
+        taking a list of gene values and returning their scores. Stops when
+        the next round would go over descend_budget evaluations, and returns
+        the number of evaluations used.
         """
-        for i in range(len(self.genes)):
-            if random.random() < self.config['descend_mute']:
-                new_values = map(int, optimize.fmin(
-                    self.gene_test_callback, self.genes[i].values,
-                    maxiter=self.config['descend_iterations']))
-                self.genes[i].values = new_values
+        chosen = [gene for gene in self.genes 
+            if random.random() < self.config['descend_mute']]
+        if len(chosen) == 0:
+            return 0
+
+        budget = self.config['descend_budget']
+        if budget <= 0:
+            budget = self.config['descend_iterations'] * self.config['pop_size']
+        if len(chosen) > budget:
+            return 0
+
+        min_param_val = self.config['min_param_val']
+        max_param_val = self.config['max_param_val']
+        step = self.config['descend_step']
+
+        current = [gene.values[:] for gene in chosen]
+        scores = evaluate(current)
+        used = len(chosen)
+
+        for descend_round in range(self.config['descend_iterations']):
+            if used + 2 * len(chosen) > budget:
+                break
+            probes = []
+            owners = []
+            for k in range(len(current)):
+                values = current[k]
+                if len(values) == 0:
+                    continue
+                j = random.randrange(len(values))
+                radius = max(1, int(math.ceil(abs(float(values[j])) * step)))
+                for new_value in [values[j] - radius, values[j] + radius]:
+                    new_value = min(max(new_value, min_param_val), max_param_val)
+                    if not (new_value == values[j]):
+                        probe = values[:]
+                        probe[j] = new_value
+                        probes.append(probe)
+                        owners.append(k)
+            if len(probes) == 0:
+                break
+
+            probe_scores = evaluate(probes)
+            used += len(probes)
+            for probe, k, score in zip(probes, owners, probe_scores):
+                if score > scores[k]:
+                    current[k] = probe
+                    scores[k] = score
+
+        for gene, values, score in zip(chosen, current, scores):
+            gene.values = values
+            gene.score = score
+        return used
     
     def pair_list(self, tall, short):
         """input: list, list (len <= first list)
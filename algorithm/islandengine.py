@@ -0,0 +1,413 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+"""Module implementing an island-model genetic algorithm.
+
+A number of geneticalgorithm.Engine populations, the islands, are evolved
+side by side, each in its own process and with its own seed. Every 
+migration_interval iterations, each island sends copies of its best 
+migration_size genes to the next island in a ring, where they replace the
+worst genes.
+
+IslandEngine takes the same configuration as geneticalgorithm.Engine, so it
+can be selected in the algorithm section of any master that uses Engine.
+"""
+
+from tools import mureilexception
+from algorithm import geneticalgorithm, phasetimer
+
+import collections
+import copy
+import logging
+import multiprocessing
+import numpy
+import random
+import sys
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+def handle_command(engine, command, args):
+    """Carry out a command on an island's engine, and return the result.
+    """
+    if command == 'prepare':
+        engine.prepare_run()
+        return None
+    elif command == 'iterate':
+        engine.do_iteration()
+        return engine.last_best
+    elif command == 'emigrate':
+        return engine.get_emigrants(args)
+    elif command == 'immigrate':
+        engine.add_immigrants(args)
+        return None
+    elif command == 'diversity':
+        return engine.get_diversity()
+    elif command == 'get_state':
+        return engine.get_checkpoint_state()
+    elif command == 'set_state':
+        engine.set_checkpoint_state(args)
+        return None
+    elif command == 'timing':
+        return engine.timer.get_totals()
+    elif command == 'final':
+        engine.get_final(log_results=False)
+        return engine.clones_data
+    elif command == 'finalise':
+        engine.finalise()
+        return None
+
+
+def island_main(conn, engine, random_state):
+    """Main loop of an island process. Takes (command, args) off conn, and
+    replies with ('ok', result), or ('error', traceback) if the command raised
+    an exception, until the command is 'finalise'.
+    """
+    random.setstate(random_state)
+    while True:
+        command, args = conn.recv()
+        try:
+            result = handle_command(engine, command, args)
+        except Exception:
+            conn.send(('error', traceback.format_exc()))
+            continue
+        conn.send(('ok', result))
+        if command == 'finalise':
+            break
+
+
+class ProcessIsland(object):
+    """An island run in its own process, driven through a Pipe.
+    """
+    def __init__(self, engine, random_state):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=island_main,
+            args=(child_conn, engine, random_state))
+        self.process.daemon = True
+        self.process.start()
+
+    def send(self, command, args=None):
+        self.conn.send((command, args))
+
+    def receive(self):
+        status, result = self.conn.recv()
+        if status == 'error':
+            msg = 'Exception in island process:\n' + result
+            logger.critical(msg)
+            raise mureilexception.AlgorithmException(msg, {})
+        return result
+
+    def close(self):
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class LocalIsland(object):
+    """An island run in this process, for platforms without fork. It keeps
+    its own state of the random module, so the results are the same as for
+    ProcessIsland.
+    """
+    def __init__(self, engine, random_state):
+        self.engine = engine
+        self.random_state = random_state
+        self.result = None
+
+    def send(self, command, args=None):
+        saved_state = random.getstate()
+        random.setstate(self.random_state)
+        try:
+            self.result = handle_command(self.engine, command, args)
+        finally:
+            self.random_state = random.getstate()
+            random.setstate(saved_state)
+
+    def receive(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class IslandEngine(geneticalgorithm.Engine):
+    """Genetic algorithm engine running several Engine populations in
+    parallel, with periodic migration of the best genes between them.
+    Provides the same interface to the masters as Engine.
+    """
+
+    def __init__(self):
+        geneticalgorithm.Engine.__init__(self)
+        self.islands = []
+
+
+    def get_config_spec(self):
+        """Return a list of tuples of format (name, conversion function, default),
+        e.g. ('capex', float, 2.0). Put None if no conversion required, or if no
+        default value, e.g. ('name', None, None)
+
+        Configuration:
+            as for geneticalgorithm.Engine, with each island configured from it
+            with its own seed. pop_size is the size of each island. The islands
+            run in parallel, each scoring its own genes, so processes is not 
+            used - island processes cannot start worker pools of their own. 
+            Checkpoints hold the state of every island. Plus:
+            
+            islands: the number of island populations.
+            migration_interval: the number of iterations between migrations.
+                0 means no migration.
+            migration_size: the number of genes copied from each island to the
+                next at each migration.
+        """
+        return geneticalgorithm.Engine.get_config_spec(self) + [
+            ('islands', int, 4),
+            ('migration_interval', int, 10),
+            ('migration_size', int, 2)
+            ]
+
+
+    def complete_configuration(self):
+        """Configure an Engine for each island, with seeds drawn from
+        a stream seeded by the configured seed.
+        """
+        if self.config['islands'] < 1:
+            msg = 'islandengine requires islands >= 1, found {:d}'.format(
+                self.config['islands'])
+            raise mureilexception.ConfigException(msg, {})
+
+        if self.config['migration_size'] >= self.config['pop_size']:
+            msg = ('islandengine requires migration_size < pop_size, found ' +
+                'migration_size = {:d}, pop_size = {:d}'.format(
+                self.config['migration_size'], self.config['pop_size']))
+            raise mureilexception.ConfigException(msg, {})
+
+        seed_rand = numpy.random.RandomState(self.config['seed'])
+        self.seeds = []
+        while len(self.seeds) < self.config['islands']:
+            seed = int(seed_rand.randint(0, 2**31 - 1))
+            if seed not in self.seeds:
+                self.seeds.append(seed)
+
+        island_config = copy.copy(self.config)
+        for key in ['islands', 'migration_interval', 'migration_size']:
+            del island_config[key]
+        island_config['checkpoint_file'] = ''
+        # Island processes are daemons, which may not start the worker
+        # processes of a pool, so each island scores its genes directly.
+        if island_config['processes'] > 0:
+            logger.warning('islandengine runs each island in its own process, ' +
+                'so processes = {:d} is not used'.format(island_config['processes']))
+        island_config['processes'] = 0
+        # Only this engine's merged history is reported, so the islands
+        # need keep no more than their improvements.
+        island_config['history_mode'] = 'improvements'
+
+        self.island_engines = []
+        self.random_states = []
+        for seed in self.seeds:
+            island_config['seed'] = seed
+            engine = geneticalgorithm.Engine()
+            engine.set_config(island_config)
+            self.island_engines.append(engine)
+            # Engine seeds the random module, and its population takes
+            # values from it, so keep each island's state from here.
+            self.random_states.append(random.getstate())
+
+        self.clones_data = []
+        self.best_gene_data = self.new_history()
+        self.last_best = None
+        self.iteration_count = -1
+        self.last_checkpoint_time = None
+        self.best_so_far = collections.deque(maxlen=self.config['stop_window'] + 1)
+        self.timer = phasetimer.PhaseTimer()
+        
+        self.is_configured = True
+        
+        return None
+
+
+    def prepare_run(self):
+        """Start a process for each island, or run them all in this process
+        on Windows, where multiprocessing as implemented here does not work.
+        Then score the initial populations.
+        """
+        if (sys.platform == 'win32'):
+            island_class = LocalIsland
+        else:
+            island_class = ProcessIsland
+            
+        for i in range(len(self.island_engines)):
+            self.islands.append(island_class(self.island_engines[i], 
+                self.random_states[i]))
+        self.mp_active = True
+        logger.debug('Started %d islands with seeds %s', len(self.islands),
+            str(self.seeds))
+
+        self.start_time = time.time()
+
+        self.command_all('prepare')
+
+
+    def command_all(self, command, args_list=None):
+        """Send the command to every island, with args_list[i] to island i,
+        and return the list of results once all have finished.
+        """
+        for i in range(len(self.islands)):
+            if args_list is None:
+                self.islands[i].send(command)
+            else:
+                self.islands[i].send(command, args_list[i])
+        return [island.receive() for island in self.islands]
+
+
+    def end_multiprocessing(self):
+        if self.mp_active:
+            self.mp_active = False
+            try:
+                self.command_all('finalise')
+            finally:
+                for island in self.islands:
+                    island.close()
+                self.islands = []
+
+
+    def do_iteration(self):
+        """Run one iteration on every island, record the best gene across
+        them all, and migrate genes around the ring if it is time to.
+        """
+        if (not self.is_configured):
+            msg = 'do_iteration requested, but islandengine is not configured'
+            logger.critical(msg)
+            raise mureilexception.ConfigException(msg, {})
+
+        self.iteration_count += 1
+        timer = self.timer
+        start = time.time()
+        island_best = self.command_all('iterate')
+        start = timer.add('iterate', start)
+        
+        best = island_best[0]
+        for data in island_best[1:]:
+            if data[1] > best[1]:
+                best = data
+        logger.debug('b_score = %f', best[1])
+        self.record_best(best[0], best[1])
+        start = timer.add('record', start)
+
+        interval = self.config['migration_interval']
+        if (interval > 0) and (len(self.islands) > 1) and (
+            ((self.iteration_count + 1) % interval) == 0):
+            self.migrate()
+            start = timer.add('migrate', start)
+        logger.debug('iteration: %d', self.iteration_count)
+        self.checkpoint_if_due()
+        timer.add('checkpoint', start)
+
+        return None
+
+
+    def get_diversity(self):
+        """Return the population diversity, averaged over the islands.
+        """
+        diversity = self.command_all('diversity')
+        return sum(diversity) / len(diversity)
+
+
+    def get_timing_string(self):
+        """Return a summary of the time spent in each phase of the run so
+        far by this engine, where iterate is the time waiting for the 
+        islands, and by the islands, merged. The shares for the islands
+        are of their combined run time.
+        """
+        island_timer = phasetimer.PhaseTimer()
+        for totals in self.command_all('timing'):
+            island_timer.merge(totals)
+        return self.timer.get_string() + '; islands ' + island_timer.get_string()
+
+
+    def get_checkpoint_state(self):
+        """Return the state of this engine and of every island.
+        """
+        return {
+            'iteration_count': self.iteration_count,
+            'best_gene_data': self.best_gene_data,
+            'best_so_far': list(self.best_so_far),
+            'islands': self.command_all('get_state')}
+
+
+    def set_checkpoint_state(self, state):
+        """Restore this engine and every island to the saved state.
+        """
+        if not (len(state['islands']) == len(self.islands)):
+            msg = ('islandengine checkpoint has {:d} islands, but islands is now {:d}'.format(
+                len(state['islands']), len(self.islands)))
+            raise mureilexception.ConfigException(msg, {})
+
+        self.command_all('set_state', state['islands'])
+        self.iteration_count = state['iteration_count']
+        self.best_gene_data = state['best_gene_data']
+        self.best_so_far = collections.deque(state['best_so_far'],
+            maxlen=self.config['stop_window'] + 1)
+
+
+    def migrate(self):
+        """Copy the best migration_size genes of each island to the next
+        island in the ring, replacing its worst genes.
+        """
+        emigrants = self.command_all('emigrate', 
+            [self.config['migration_size']] * len(self.islands))
+        immigrants = emigrants[-1:] + emigrants[:-1]
+        self.command_all('immigrate', immigrants)
+        logger.debug('migration: %d genes moved between each of %d islands',
+            self.config['migration_size'], len(self.islands))
+
+
+    def get_final(self, log_results=True):
+        """Return the best gene found on any island, and the best gene
+        history merged across the islands, one entry per iteration as kept
+        by history_mode, as a genehistory.BestGeneHistory.
+        """
+        self.clones_data = []
+        for clones_data in self.command_all('final'):
+            self.clones_data += clones_data
+        
+        optim = self.best_gene_data.get_best()
+        if optim is None:
+            optim = [[],-1e1000,-1]
+
+        if log_results:
+            logger.info('best gene was: %s', str(optim[0]))
+            logger.info('on loop %i, with score %f', optim[2], optim[1])
+
+        for data in self.clones_data:
+            if data[1] > optim[1]:
+                optim = data
+        
+        if log_results:
+            logger.debug('%i nuke/s dropped', len(self.clones_data))
+            if self.config['timing_summary']:
+                logger.info('timing: %s', self.get_timing_string())
+        
+        return optim[0], self.best_gene_data
@@ -0,0 +1,120 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+"""Module implementing wall-clock timing of the phases of an algorithm run.
+
+Each phase is timed with one call to time.time() at its end, the end of
+one phase being the start of the next, so the timer is cheap enough to
+leave on for every run.
+"""
+
+import collections
+import time
+
+
+class PhaseTimer(object):
+    """Accumulates the wall time spent in, and the number of calls to, each
+    named phase. Phases are reported in the order they were first timed.
+
+    To use, take start = time.time() before the first phase, then after
+    each phase call start = timer.add(phase, start).
+    """
+
+    def __init__(self):
+        self.secs = collections.OrderedDict()
+        self.calls = {}
+        self.start_time = time.time()
+        self.merged_elapsed = 0.0
+
+
+    def add(self, phase, start):
+        """Add the time since start to phase, count a call, and return the
+        current time, ready to time the next phase.
+        """
+        now = time.time()
+        if phase in self.secs:
+            self.secs[phase] += now - start
+            self.calls[phase] += 1
+        else:
+            self.secs[phase] = now - start
+            self.calls[phase] = 1
+        return now
+
+
+    def get_secs(self, phase):
+        """Return the total seconds spent in phase, or 0 if it has not
+        been timed.
+        """
+        return self.secs.get(phase, 0.0)
+
+
+    def get_calls(self, phase):
+        """Return the number of times phase has been timed.
+        """
+        return self.calls.get(phase, 0)
+
+
+    def get_elapsed(self):
+        """Return the seconds since the timer was made, plus the elapsed
+        seconds of any timers merged into it.
+        """
+        return time.time() - self.start_time + self.merged_elapsed
+
+
+    def get_totals(self):
+        """Return the seconds and calls for each phase, in order, and the
+        elapsed seconds, as a picklable tuple for merge.
+        """
+        return ([(phase, secs, self.calls[phase]) 
+            for phase, secs in self.secs.iteritems()], self.get_elapsed())
+
+
+    def merge(self, totals):
+        """Add the totals of another timer, as from get_totals, to this one.
+        The elapsed seconds are added too, so the shares reported by 
+        get_string are of the combined time of the timers.
+        """
+        phases, elapsed = totals
+        for phase, secs, calls in phases:
+            if phase in self.secs:
+                self.secs[phase] += secs
+                self.calls[phase] += calls
+            else:
+                self.secs[phase] = secs
+                self.calls[phase] = calls
+        self.merged_elapsed += elapsed
+
+
+    def get_string(self):
+        """Return a one-line summary of the time in each phase, with the
+        calls, the average time per call, and the share of the time since
+        the timer was made.
+        """
+        elapsed = max(self.get_elapsed(), 1e-9)
+        parts = []
+        for phase, secs in self.secs.iteritems():
+            calls = self.calls[phase]
+            parts.append('{:s} {:.3f}s/{:d} calls ({:.2f}ms/call, {:.1f}%)'.format(
+                phase, secs, calls, 1e3 * secs / calls, 100 * secs / elapsed))
+        return '{:.3f}s elapsed: '.format(elapsed) + ', '.join(parts)
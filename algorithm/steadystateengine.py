@@ -0,0 +1,254 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+"""Module implementing a steady-state genetic algorithm.
+
+Rather than scoring a whole generation before culling and breeding, 
+SteadyStateEngine breeds one child at a time from two random genes, mutates
+it, and as soon as its score is known, puts it in place of the worst gene
+in the population if it scores higher. With multiprocessing, children are
+sent to the worker pool whenever a worker is free, so no worker sits idle
+waiting for the slowest gene of a generation.
+
+SteadyStateEngine takes the same configuration as geneticalgorithm.Engine,
+so it can be selected in the algorithm section of any master that uses 
+Engine. One iteration is pop_size children, so iteration counts are 
+comparable, and mort is not used, so need not be set. The evaluation rate is logged on each
+iteration, and reported by get_final.
+
+With multiprocessing, the order in which scores come back depends on how
+long each takes, so runs are not exactly reproducible from the seed.
+"""
+
+from tools import mureilexception
+from algorithm import geneticalgorithm
+
+import logging
+import numpy
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SteadyStateEngine(geneticalgorithm.Engine):
+    """A genetic algorithm engine that replaces genes one child at a time,
+    keeping the worker pool busy with children as it goes.
+    """
+
+    def get_config_spec(self):
+        """Return a list of tuples of format (name, conversion function, default),
+        e.g. ('capex', float, 2.0). Put None if no conversion required, or if no
+        default value, e.g. ('name', None, None)
+
+        Configuration:
+            as for geneticalgorithm.Engine, except that mort is not used, and 
+            is optional.
+        """
+        return geneticalgorithm.set_spec_defaults(
+            geneticalgorithm.Engine.get_config_spec(self), {'mort': 0})
+
+
+    def complete_configuration(self):
+        geneticalgorithm.Engine.complete_configuration(self)
+        self.in_flight = {}
+        self.next_child_id = 0
+        self.children_done = 0
+        self.children_inserted = 0
+        self.evaluations = 0
+        return None
+
+
+    def do_iteration(self):
+        """Breed, score and insert pop_size children, then record the best
+        gene and check for clones.
+        """
+        if (not self.is_configured):
+            msg = 'do_iteration requested, but steadystateengine is not configured'
+            logger.critical(msg)
+            raise mureilexception.ConfigException(msg, {})
+
+        self.iteration_count += 1
+        target = self.children_done + self.config['pop_size']
+        timer = self.timer
+        start = time.time()
+        while self.children_done < target:
+            if self.mp_active:
+                self.send_children()
+                start = timer.add('breed', start)
+                self.collect_children()
+                start = timer.add('collect', start)
+            else:
+                values = self.population.make_child()
+                start = timer.add('breed', start)
+                self.add_child(values, self.evaluate([values])[0])
+                start = timer.add('score', start)
+
+        best_values, b_score = self.population.get_best()
+        logger.debug('b_score = %f', b_score)
+        self.record_best(best_values, b_score)
+        self.adapt_mutation()
+        start = timer.add('record', start)
+        self.decloner()
+        start = timer.add('decloner', start)
+        logger.debug('iteration: %d, %s', self.iteration_count, 
+            self.get_throughput_string())
+        self.checkpoint_if_due()
+        timer.add('checkpoint', start)
+
+        return None
+
+
+    def send_children(self):
+        """Breed enough children to give a chunk to every idle worker, and
+        submit them to the pool. Children already in the fitness cache are
+        inserted straight away.
+        """
+        idle = self.pool.get_idle_count()
+        if idle == 0:
+            return None
+
+        chunk_size = self.pool.get_chunk_size(self.config['pop_size'])
+        keys = []
+        values_list = []
+        for i in range(idle * chunk_size):
+            values = self.population.make_child()
+            if self.cache is not None:
+                score = self.cache.lookup(self.cache.make_key(values))
+                if score is not None:
+                    self.add_child(values, score)
+                    continue
+            keys.append(self.next_child_id)
+            values_list.append(values)
+            self.in_flight[self.next_child_id] = values
+            self.next_child_id += 1
+
+        self.evaluations += len(values_list)
+        self.pool.submit(keys, values_list, chunk_size)
+        return None
+
+
+    def collect_children(self):
+        """Wait briefly for scores from the pool, and insert each scored child.
+        As in Engine.evaluate, scores that are not finite are not cached.
+        """
+        for child_id, score in self.pool.poll():
+            values = self.in_flight.pop(child_id)
+            if (self.cache is not None) and numpy.isfinite(score):
+                self.cache.store(self.cache.make_key(values), score)
+            self.add_child(values, score)
+        return None
+
+
+    def add_child(self, values, score):
+        """Put a scored child in the population, if it beats the worst gene.
+        """
+        if self.population.insert_child(values, score):
+            self.children_inserted += 1
+        self.children_done += 1
+        return None
+
+
+    def drain(self):
+        """Wait for every child sent to the pool to be scored and inserted,
+        so the population can be scored or saved as a whole.
+        """
+        while len(self.in_flight) > 0:
+            self.collect_children()
+        return None
+
+
+    def dispatch(self, values_list):
+        """As for Engine.dispatch, counting the evaluations.
+        """
+        self.evaluations += len(values_list)
+        return geneticalgorithm.Engine.dispatch(self, values_list)
+
+
+    def decloner(self):
+        """As for Engine.decloner, finishing the children in flight first if
+        there is a clone, and then scoring the mutated population.
+        """
+        found, final = self.population.find_clone(self.config['pop_size']*0.9)
+        if found:
+            self.drain()
+            geneticalgorithm.Engine.decloner(self)
+            self.pop_score()
+        return None
+
+
+    def add_immigrants(self, values_list):
+        """As for Engine.add_immigrants, but scores the immigrants straight
+        away, as every gene in the population must have a score.
+        """
+        self.drain()
+        geneticalgorithm.Engine.add_immigrants(self, values_list)
+        self.pop_score()
+        return None
+
+
+    def get_throughput(self):
+        """Return the number of evaluations per second since prepare_run.
+        """
+        run_secs = time.time() - self.start_time
+        if run_secs <= 0:
+            return 0.0
+        return self.evaluations / run_secs
+
+
+    def get_throughput_string(self):
+        """Return a description of the evaluations done and their rate.
+        """
+        return '{:d} evaluations, {:.1f} evaluations/second, {:d} of {:d} children inserted'.format(
+            self.evaluations, self.get_throughput(), self.children_inserted,
+            self.children_done)
+
+
+    def get_checkpoint_state(self):
+        """As for Engine.get_checkpoint_state, once the children in flight
+        are finished, with the child counts.
+        """
+        self.drain()
+        state = geneticalgorithm.Engine.get_checkpoint_state(self)
+        state['children_done'] = self.children_done
+        state['children_inserted'] = self.children_inserted
+        return state
+
+
+    def set_checkpoint_state(self, state):
+        """As for Engine.set_checkpoint_state, with the child counts.
+        """
+        geneticalgorithm.Engine.set_checkpoint_state(self, state)
+        self.children_done = state['children_done']
+        self.children_inserted = state['children_inserted']
+        return None
+
+
+    def get_final(self, log_results=True):
+        """As for Engine.get_final, once the children in flight are finished,
+        and logs the evaluation rate.
+        """
+        self.drain()
+        if log_results:
+            logger.info('steadystateengine: %s', self.get_throughput_string())
+        return geneticalgorithm.Engine.get_final(self, log_results)
@@ -0,0 +1,119 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+"""Module implementing a cheap model of gene scores, used to decide which
+new genes are worth scoring with the full gene test.
+
+RidgeSurrogate fits a ridge regression of score on the gene values and 
+their squares, over the most recent genes scored, so it can capture the 
+roughly quadratic response of cost to capacity. Fitting is a single
+linear solve, done lazily when a prediction is next needed.
+"""
+
+import numpy
+
+
+class RidgeSurrogate(object):
+    """Ridge regression of gene score on gene values and their squares,
+    over the most recent history_size genes added.
+    """
+
+    def __init__(self, gene_len, history_size=2000, alpha=1.0):
+        """Inputs:
+            gene_len: the length of every gene.
+            history_size: the number of most recent genes to fit to.
+            alpha: the ridge penalty, applied to the standardised features.
+        """
+        self.gene_len = gene_len
+        self.history_size = history_size
+        self.alpha = alpha
+        self.values = numpy.zeros((history_size, gene_len))
+        self.scores = numpy.zeros(history_size)
+        self.count = 0
+        self.next_row = 0
+        self.model = None
+
+
+    def add(self, values_list, scores):
+        """Add scored genes to the history, replacing the oldest if full.
+        Genes with a score that is not finite are left out.
+        """
+        for values, score in zip(values_list, scores):
+            if not numpy.isfinite(score):
+                continue
+            self.values[self.next_row] = values
+            self.scores[self.next_row] = score
+            self.next_row = (self.next_row + 1) % self.history_size
+            self.count = min(self.count + 1, self.history_size)
+            self.model = None
+
+
+    def get_count(self):
+        """Return the number of genes held to fit to.
+        """
+        return self.count
+
+
+    def make_features(self, values):
+        """Return the feature matrix for a (n, gene_len) array of values.
+        """
+        return numpy.hstack((values, values * values))
+
+
+    def fit(self):
+        """Fit the model to the genes held. Solves the smaller of the primal
+        and dual forms of the ridge problem.
+        """
+        features = self.make_features(self.values[:self.count])
+        scores = self.scores[:self.count]
+        feature_mean = features.mean(axis=0)
+        feature_std = features.std(axis=0)
+        feature_std[feature_std == 0] = 1.0
+        score_mean = scores.mean()
+        score_std = scores.std()
+        if score_std == 0:
+            score_std = 1.0
+
+        x = (features - feature_mean) / feature_std
+        y = (scores - score_mean) / score_std
+        samples, width = x.shape
+        if samples >= width:
+            weights = numpy.linalg.solve(numpy.dot(x.T, x) + self.alpha * numpy.eye(width),
+                numpy.dot(x.T, y))
+        else:
+            weights = numpy.dot(x.T, numpy.linalg.solve(
+                numpy.dot(x, x.T) + self.alpha * numpy.eye(samples), y))
+
+        self.model = (feature_mean, feature_std, weights, score_mean, score_std)
+
+
+    def predict(self, values_list):
+        """Return an array of the predicted scores of the genes in values_list.
+        """
+        if self.model is None:
+            self.fit()
+        feature_mean, feature_std, weights, score_mean, score_std = self.model
+        features = self.make_features(numpy.array(values_list, dtype=float))
+        x = (features - feature_mean) / feature_std
+        return numpy.dot(x, weights) * score_std + score_mean
@@ -0,0 +1,487 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+"""Module implementing a persistent pool of worker processes to score genes.
+
+Genes are sent to the workers in chunks, sized from the measured evaluation
+time so that each chunk takes roughly chunk_target_secs. Each worker has its
+own task queue, so the pool always knows which chunk each worker holds, and
+can re-send it if the worker dies or takes too long. Each worker also has its
+own result pipe, so a worker stopped part way through sending a result 
+leaves only its own pipe half-written, and the pool discards that pipe with
+the worker.
+
+Genes can be scored a set at a time with score(), or submitted and collected
+as they finish with submit() and poll().
+
+The workers are forked from the calling process, so the gene test callback,
+and the master it belongs to, are inherited rather than pickled. Multiprocessing
+as implemented here does not work on Windows.
+
+Given a seed, each worker seeds the random and numpy.random modules from a 
+seed derived from it and the worker's slot, so workers do not share the 
+random stream they were forked with. With seed_evaluations as well, both 
+modules are seeded before each gene is scored from the seed and the gene 
+values, so a gene test that draws random numbers gives the same score for a 
+gene however many workers there are and whichever scores it.
+"""
+
+from tools import mureilexception
+from algorithm import phasetimer
+
+import multiprocessing
+import numpy
+import collections
+import hashlib
+import logging
+import math
+import random
+import select
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+def derive_seed(seed, *keys):
+    """Return a seed for the random and numpy.random modules, derived from
+    seed and the integers or integer sequences in keys. The same inputs give
+    the same seed in every process.
+    """
+    digest = hashlib.md5(str(seed))
+    for key in keys:
+        digest.update(numpy.asarray(key, dtype=numpy.int64).tostring())
+    return int(digest.hexdigest()[:8], 16)
+
+
+def score_genes(gene_test, gene_test_batch, genes, seed=None):
+    """Score a list of genes, and return the list of scores. If gene_test_batch
+    is not None and the genes are all the same length, score them in one call
+    to gene_test_batch with a (len(genes), gene_len) array, otherwise call 
+    gene_test on each gene in turn.
+    
+    If seed is not None, the random and numpy.random modules are seeded from
+    seed and the gene values before each gene is scored, and restored after.
+    Each gene is then sent to gene_test, as a batch could not be seeded per gene.
+    """
+    if seed is not None:
+        random_state = random.getstate()
+        numpy_state = numpy.random.get_state()
+        try:
+            scores = []
+            for gene in genes:
+                gene_seed = derive_seed(seed, gene)
+                random.seed(gene_seed)
+                numpy.random.seed(gene_seed)
+                scores.append(gene_test(gene))
+        finally:
+            random.setstate(random_state)
+            numpy.random.set_state(numpy_state)
+        return scores
+
+    if (gene_test_batch is not None) and (len(genes) > 1):
+        if len(set([len(gene) for gene in genes])) == 1:
+            return list(gene_test_batch(numpy.array(genes)))
+
+    return [gene_test(gene) for gene in genes]
+
+
+def send_result(result_writer, result):
+    """Send result to the pool on the worker's own result pipe. A large result
+    blocks here until the pool reads it, and the pool may stop the worker
+    meanwhile if it has timed out, leaving the pipe half-written. The pool 
+    then closes that pipe and starts the new worker with a fresh one, so the
+    other workers' results are not affected.
+    """
+    result_writer.send(result)
+
+
+def worker_main(slot, gene_test, gene_test_batch, task_queue, result_writer,
+    worker_seed=None, evaluation_seed=None):
+    """Main loop of each worker process. Takes (task_id, genes) tasks off
+    task_queue until it receives None, and sends (slot, task_id, scores, elapsed)
+    on result_writer for each. If gene_test raises an exception, scores is None
+    and elapsed is replaced by the formatted traceback. If worker_seed is not
+    None, the random modules are seeded with it first. evaluation_seed is
+    passed to score_genes.
+    """
+    if worker_seed is not None:
+        random.seed(worker_seed)
+        numpy.random.seed(worker_seed)
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, genes = task
+        start = time.time()
+        try:
+            scores = score_genes(gene_test, gene_test_batch, genes, evaluation_seed)
+        except Exception:
+            send_result(result_writer, 
+                (slot, task_id, None, traceback.format_exc()))
+            continue
+        send_result(result_writer, (slot, task_id, scores, time.time() - start))
+
+
+class WorkerPool(object):
+    """A persistent pool of worker processes that score chunks of genes.
+    
+    To use, construct with the gene test callback and the pool settings,
+    call score() as often as required, then close() to stop the workers.
+    Alternatively, queue genes with submit() and collect their scores as
+    they arrive with poll(), to keep the workers busy without waiting for
+    a whole set of genes.
+    """
+
+    def __init__(self, gene_test, processes, timeout=0, timeout_policy='retry',
+        max_retries=2, chunk_target_secs=0.1, gene_test_batch=None, seed=None,
+        seed_evaluations=False, check_interval=0.5):
+        """Start the worker processes.
+
+        Inputs:
+            gene_test: function handle to calculate the score of a gene.
+            processes: the number of worker processes to start.
+            timeout: the time in seconds a worker may take to score one chunk
+                before timeout_policy is applied. 0 means no limit.
+            timeout_policy: one of:
+                'retry' - stop the worker, start a new one, and re-send the chunk,
+                    up to max_retries times before raising AlgorithmException.
+                'abort' - raise AlgorithmException.
+                'penalise' - stop the worker and start a new one. Re-send the chunk
+                    one gene at a time, and score any single gene that then
+                    times out as -inf, so it is culled.
+            max_retries: the number of times a chunk is re-sent after a worker 
+                dies or times out, before AlgorithmException is raised.
+            chunk_target_secs: the target time in seconds for a worker to score 
+                one chunk. Chunks are sized from the average time per gene measured
+                so far.
+            gene_test_batch: optional function handle to calculate the scores
+                of a matrix of genes, one per row. If given, each chunk is scored
+                in one call.
+            seed: if not None, each worker seeds the random modules from this and
+                its slot, and a worker restarted in the same slot gets a new seed.
+            seed_evaluations: if True, and seed is given, the random modules are 
+                seeded before each gene is scored, as for score_genes.
+            check_interval: the time in seconds between checks for workers that
+                have died or timed out, made while results are arriving as well
+                as while waiting for them.
+        """
+        self.gene_test = gene_test
+        self.gene_test_batch = gene_test_batch
+        self.processes = processes
+        self.timeout = timeout
+        self.timeout_policy = timeout_policy
+        self.max_retries = max_retries
+        self.chunk_target_secs = chunk_target_secs
+        self.check_interval = check_interval
+        self.last_check = time.time()
+        self.seed = seed
+        if seed_evaluations:
+            self.evaluation_seed = seed
+        else:
+            self.evaluation_seed = None
+        self.worker_starts = 0
+
+        self.workers = [None] * processes
+        self.next_task_id = 0
+        self.gene_secs = None
+        self.pending = collections.deque()
+        self.completed = []
+        self.outstanding = 0
+        self.timer = phasetimer.PhaseTimer()
+        self.busy_secs = [0.0] * processes
+        self.transfer_secs = 0.0
+        self.chunks_done = 0
+        
+        for slot in range(processes):
+            self.start_worker(slot)
+
+        logger.debug('WorkerPool started with %d processes', processes)
+
+
+    def start_worker(self, slot):
+        """Start a new worker process in the slot, with its own task queue
+        and result pipe. The result pipe of any worker already in the slot
+        is closed, so a result it left half-written is never read.
+        """
+        if self.workers[slot] is not None:
+            self.workers[slot]['reader'].close()
+        task_queue = multiprocessing.Queue()
+        result_reader, result_writer = multiprocessing.Pipe(False)
+        if self.seed is None:
+            worker_seed = None
+        else:
+            worker_seed = derive_seed(self.seed, slot, self.worker_starts)
+        self.worker_starts += 1
+        process = multiprocessing.Process(target=worker_main,
+            args=(slot, self.gene_test, self.gene_test_batch, task_queue, 
+                result_writer, worker_seed, self.evaluation_seed))
+        process.daemon = True
+        process.start()
+        # Only the worker holds the sending end, so the pipe reports the end
+        # of file if it exits part way through a result.
+        result_writer.close()
+        self.workers[slot] = {'process': process, 'queue': task_queue, 
+            'reader': result_reader, 'task': None}
+
+
+    def stop_worker(self, slot):
+        """Terminate the worker process in the slot, and start a new one.
+        """
+        self.workers[slot]['process'].terminate()
+        self.workers[slot]['process'].join()
+        self.start_worker(slot)
+
+
+    def close(self):
+        """Ask all of the workers to finish, and terminate any that do not.
+        """
+        for worker in self.workers:
+            worker['queue'].put(None)
+        for worker in self.workers:
+            worker['process'].join(1)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+            worker['reader'].close()
+        logger.debug('WorkerPool closed')
+
+
+    def get_chunk_size(self, count):
+        """Return the number of genes to send per chunk, for a call with
+        count genes. Until an evaluation time has been measured, send genes
+        one at a time. Otherwise aim for chunk_target_secs per chunk, but
+        keep at least two chunks per worker so the load stays balanced.
+        """
+        max_size = max(1, int(math.ceil(float(count) / (2 * self.processes))))
+        if self.gene_secs is None or self.gene_secs <= 0:
+            return 1
+        size = int(self.chunk_target_secs / self.gene_secs)
+        return min(max(size, 1), max_size)
+
+
+    def score(self, values_list):
+        """Score every gene in values_list, and return the list of scores
+        in the same order. Must not be called while genes sent with submit()
+        are still outstanding.
+        """
+        if self.outstanding > 0:
+            msg = ('WorkerPool score called with {:d} submitted genes outstanding'.format(
+                self.outstanding))
+            logger.critical(msg)
+            raise mureilexception.AlgorithmException(msg, {})
+
+        count = len(values_list)
+        scores = [None] * count
+        self.submit(range(count), values_list, self.get_chunk_size(count))
+
+        while self.outstanding > 0:
+            for index, score in self.poll():
+                scores[index] = score
+
+        return scores
+
+
+    def submit(self, keys, values_list, chunk_size=None):
+        """Queue the genes in values_list to be scored, in chunks of chunk_size,
+        or of the size from get_chunk_size if None. Each score is returned by
+        poll() paired with the matching entry of keys.
+        """
+        count = len(values_list)
+        if chunk_size is None:
+            chunk_size = self.get_chunk_size(count)
+        for start in range(0, count, chunk_size):
+            end = min(start + chunk_size, count)
+            self.add_task(list(keys[start:end]), list(values_list[start:end]))
+        self.outstanding += count
+
+
+    def poll(self, wait=0.5):
+        """Send queued chunks to idle workers, wait up to wait seconds for a
+        chunk to be scored, and return the list of (key, score) pairs for
+        every gene scored since the last call. Workers are checked every
+        check_interval seconds, so one that has died or hung is found even
+        while the others keep returning results.
+        """
+        start = time.time()
+        self.assign_tasks()
+        start = self.timer.add('dispatch', start)
+        readers = [worker['reader'] for worker in self.workers]
+        ready = select.select(readers, [], [], wait)[0]
+        start = self.timer.add('wait', start)
+        if len(ready) > 0:
+            slot = readers.index(ready[0])
+            try:
+                result = ready[0].recv()
+            except (EOFError, IOError):
+                # The worker exited part way through sending a result
+                self.worker_died(slot)
+            else:
+                self.collect_result(result)
+            start = self.timer.add('collect', start)
+        if start - self.last_check >= self.check_interval:
+            self.check_workers()
+
+        completed = self.completed
+        self.completed = []
+        return completed
+
+
+    def get_timing_string(self):
+        """Return a summary of where the time has gone since the pool was
+        started - in the master, sending chunks, waiting for results and
+        collecting them, and for each worker slot, the time spent scoring
+        genes and the time idle. The transfer time is the time each chunk 
+        took from being sent to its result being read, less the time spent 
+        scoring it, so is the cost of passing chunks and results between 
+        processes, plus any delay before the master read the result.
+        """
+        elapsed = max(self.timer.get_elapsed(), 1e-9)
+        workers = ', '.join(['{:d}: busy {:.3f}s ({:.1f}%), idle {:.3f}s'.format(
+            slot, busy, 100 * busy / elapsed, max(elapsed - busy, 0)) 
+            for slot, busy in enumerate(self.busy_secs)])
+        return ('master {:s}; workers {:s}; transfer {:.3f}s over {:d} chunks').format(
+            self.timer.get_string(), workers, self.transfer_secs, self.chunks_done)
+
+
+    def get_idle_count(self):
+        """Return the number of workers that will be left without a chunk
+        once the queued chunks are sent out.
+        """
+        idle = len([worker for worker in self.workers if worker['task'] is None])
+        return max(idle - len(self.pending), 0)
+
+
+    def add_task(self, keys, genes, tries=0):
+        """Queue a chunk of genes, identified by keys.
+        """
+        self.pending.append({'id': self.next_task_id, 'keys': keys, 'genes': genes,
+            'tries': tries, 'sent': None})
+        self.next_task_id += 1
+
+
+    def assign_tasks(self):
+        """Send pending chunks to idle workers.
+        """
+        for slot in range(self.processes):
+            if len(self.pending) == 0:
+                return
+            worker = self.workers[slot]
+            if worker['task'] is None:
+                if not worker['process'].is_alive():
+                    logger.warning('WorkerPool worker %d found stopped, restarting', slot)
+                    self.start_worker(slot)
+                    worker = self.workers[slot]
+                task = self.pending.popleft()
+                task['sent'] = time.time()
+                worker['task'] = task
+                worker['queue'].put((task['id'], task['genes']))
+
+
+    def collect_result(self, result):
+        """Store the scores from a worker's result, ignoring results
+        from chunks that have since been given to another worker.
+        """
+        slot, task_id, task_scores, elapsed = result
+        worker = self.workers[slot]
+        task = worker['task']
+        if task is None or not (task['id'] == task_id):
+            return
+
+        worker['task'] = None
+        if task_scores is None:
+            msg = 'gene_test raised an exception in a worker process:\n' + elapsed
+            logger.critical(msg)
+            raise mureilexception.AlgorithmException(msg, {})
+
+        self.completed += zip(task['keys'], task_scores)
+        self.outstanding -= len(task_scores)
+        self.busy_secs[slot] += elapsed
+        self.transfer_secs += max(time.time() - task['sent'] - elapsed, 0)
+        self.chunks_done += 1
+
+        this_secs = elapsed / len(task_scores)
+        if self.gene_secs is None:
+            self.gene_secs = this_secs
+        else:
+            self.gene_secs = 0.8 * self.gene_secs + 0.2 * this_secs
+
+
+    def check_workers(self):
+        """Look for workers that have died or timed out, and deal with
+        the chunks they hold.
+        """
+        now = time.time()
+        self.last_check = now
+        for slot in range(self.processes):
+            worker = self.workers[slot]
+            task = worker['task']
+            if task is None:
+                continue
+
+            if not worker['process'].is_alive():
+                self.worker_died(slot)
+            elif (self.timeout > 0) and (now - task['sent'] > self.timeout):
+                logger.warning('WorkerPool worker %d timed out after %.1f seconds on %d genes',
+                    slot, now - task['sent'], len(task['keys']))
+                worker['task'] = None
+                if self.timeout_policy == 'abort':
+                    msg = 'WorkerPool timed out scoring genes, and timeout_policy is abort'
+                    logger.critical(msg)
+                    raise mureilexception.AlgorithmException(msg, {})
+
+                self.stop_worker(slot)
+                if self.timeout_policy == 'penalise':
+                    if len(task['keys']) == 1:
+                        self.completed.append((task['keys'][0], float('-inf')))
+                        self.outstanding -= 1
+                    else:
+                        for key, gene in zip(task['keys'], task['genes']):
+                            self.add_task([key], [gene])
+                else:
+                    self.retry_task(task)
+
+
+    def worker_died(self, slot):
+        """Restart the worker in the slot, which has died, and re-send
+        any chunk it held.
+        """
+        logger.warning('WorkerPool worker %d died, restarting', slot)
+        task = self.workers[slot]['task']
+        self.workers[slot]['task'] = None
+        self.stop_worker(slot)
+        if task is not None:
+            self.retry_task(task)
+
+
+    def retry_task(self, task):
+        """Queue the chunk again, or raise AlgorithmException if it has 
+        been tried too often.
+        """
+        if task['tries'] >= self.max_retries:
+            msg = ('WorkerPool gave up on a chunk of {:d} genes after {:d} retries'.format(
+                len(task['keys']), task['tries']))
+            logger.critical(msg)
+            raise mureilexception.AlgorithmException(msg, {})
+        self.add_task(task['keys'], task['genes'], task['tries'] + 1)
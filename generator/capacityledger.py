@@ -0,0 +1,284 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+
+"""Module implementing an array-backed capacity ledger, an alternative to the
+dict of lists of (capacity, build, decommission) tuples that 
+TxMultiGeneratorMultiSite keeps in the state_handle.
+
+The ledger holds the installed capacity as a (sites x vintages) array, where
+a vintage is a (build_period, decommissioning_period) pair, with the count
+of entries in each cell, and per-site columns counting the current and 
+decommissioned entries. The capacity, new capacity and decommissioned 
+capacity of every site then each come from a single array reduction, rather 
+than a scan of the list for each site.
+
+A CapacityLedger holds the map of sites to rows and vintages to columns, 
+which is shared by all the state handles of a generator. The arrays 
+themselves are in the state handle, so each master calculate call has its 
+own. Sites and vintages not known when the ledger is made are added as they
+are first seen, and the arrays in a state handle are widened to match on 
+their next use.
+"""
+
+import numpy
+
+
+class CapacityLedger(object):
+    """The site and vintage index of an array-backed capacity ledger, and the
+    operations on the ledger arrays held in a state handle.
+    
+    The ledger arrays are a dict of:
+        capacity: (sites x vintages) float array of the installed capacity
+        entries: (sites x vintages) int array of the number of capacity
+            entries added to each cell
+        site_entries: int array of the number of current entries per site
+        site_history: int array of the number of decommissioned entries 
+            per site
+    """
+
+    def __init__(self, sites=[], vintages=[]):
+        """Initialise the ledger with a row for each site and a column for
+        each vintage.
+        
+        Inputs:
+            sites: a list of site indices
+            vintages: a list of (build_period, decommissioning_period) tuples
+        """
+        self.sites = []
+        self.site_rows = {}
+        self.vintages = []
+        self.vintage_cols = {}
+        for site in sites:
+            self.get_row(site)
+        for build, decomm in vintages:
+            self.get_col(build, decomm)
+        self.update_index()
+
+
+    def get_row(self, site):
+        """Return the row for site, adding one if the site is new.
+        """
+        try:
+            return self.site_rows[site]
+        except KeyError:
+            row = len(self.sites)
+            self.site_rows[site] = row
+            self.sites.append(site)
+            self.is_indexed = False
+            return row
+
+
+    def get_col(self, build, decomm):
+        """Return the column for the vintage built in period build and 
+        decommissioned at the end of period decomm, adding one if the 
+        vintage is new.
+        """
+        try:
+            return self.vintage_cols[(build, decomm)]
+        except KeyError:
+            col = len(self.vintages)
+            self.vintage_cols[(build, decomm)] = col
+            self.vintages.append((build, decomm))
+            self.is_indexed = False
+            return col
+
+
+    def update_index(self):
+        """Rebuild the site order, and the lists of columns built and 
+        decommissioned in each period, after new rows or columns are added.
+        """
+        self.site_array = numpy.array(self.sites, dtype=int)
+        self.site_order = numpy.argsort(self.site_array, kind='mergesort')
+        build_cols = {}
+        decomm_cols = {}
+        for col, (build, decomm) in enumerate(self.vintages):
+            build_cols.setdefault(build, []).append(col)
+            decomm_cols.setdefault(decomm, []).append(col)
+        self.build_cols = dict((period, numpy.array(cols, dtype=int))
+            for period, cols in build_cols.iteritems())
+        self.decomm_cols = dict((period, numpy.array(cols, dtype=int))
+            for period, cols in decomm_cols.iteritems())
+        self.no_cols = numpy.zeros(0, dtype=int)
+        self.shape = (len(self.sites), len(self.vintages))
+        self.is_indexed = True
+
+
+    def new_state(self):
+        """Return a set of empty ledger arrays.
+        """
+        if not self.is_indexed:
+            self.update_index()
+        return {
+            'capacity': numpy.zeros(self.shape),
+            'entries': numpy.zeros(self.shape, dtype=int),
+            'site_entries': numpy.zeros(self.shape[0], dtype=int),
+            'site_history': numpy.zeros(self.shape[0], dtype=int)
+        }
+
+
+    def make_state(self, capacity, history):
+        """Return a set of ledger arrays holding the capacity and history
+        given in the form used by TxMultiGeneratorMultiSite.
+        
+        Inputs:
+            capacity: a dict of site index to a list of (capacity, build, 
+                decomm) tuples of the installed capacity
+            history: as for capacity, of the decommissioned capacity
+                
+        Outputs:
+            ledger_state: a dict of the ledger arrays
+        """
+        rows = []
+        cols = []
+        caps = []
+        for site, site_caps in capacity.iteritems():
+            for cap, build, decomm in site_caps:
+                rows.append(self.get_row(site))
+                cols.append(self.get_col(build, decomm))
+                caps.append(cap)
+        for site in history:
+            self.get_row(site)
+
+        ledger_state = self.new_state()
+        self.add(ledger_state, rows, cols, caps)
+        for site, site_hist in history.iteritems():
+            ledger_state['site_history'][self.site_rows[site]] += len(site_hist)
+        return ledger_state
+
+
+    def copy_state(self, ledger_state):
+        """Return a copy of the ledger arrays, that can be updated without
+        changing ledger_state.
+        """
+        return dict((key, value.copy()) for key, value in ledger_state.iteritems())
+
+
+    def fit(self, ledger_state):
+        """Widen the ledger arrays, if any rows or columns have been added
+        since they were made.
+        """
+        if not self.is_indexed:
+            self.update_index()
+        capacity = ledger_state['capacity']
+        if capacity.shape == self.shape:
+            return None
+        old_rows, old_cols = capacity.shape
+        for key in ['capacity', 'entries']:
+            new_array = numpy.zeros(self.shape, dtype=ledger_state[key].dtype)
+            new_array[:old_rows, :old_cols] = ledger_state[key]
+            ledger_state[key] = new_array
+        for key in ['site_entries', 'site_history']:
+            new_array = numpy.zeros(self.shape[0], dtype=int)
+            new_array[:old_rows] = ledger_state[key]
+            ledger_state[key] = new_array
+        return None
+
+
+    def add(self, ledger_state, rows, cols, capacities):
+        """Add capacity entries to the ledger arrays.
+        
+        Inputs:
+            ledger_state: the ledger arrays, which are updated
+            rows: a list or array of rows, from get_row
+            cols: a list or array of columns, from get_col, or a single column
+                for all the entries
+            capacities: a list or array of the capacity of each entry
+        """
+        if len(rows) == 0:
+            return None
+        self.fit(ledger_state)
+        index = (numpy.asarray(rows, dtype=int), numpy.asarray(cols, dtype=int))
+        numpy.add.at(ledger_state['capacity'], index, capacities)
+        numpy.add.at(ledger_state['entries'], index, 1)
+        numpy.add.at(ledger_state['site_entries'], index[0], 1)
+        return None
+
+
+    def get_rows(self, ledger_state):
+        """Return the rows of the sites with capacity entries, in order of
+        site index.
+        """
+        self.fit(ledger_state)
+        order = self.site_order
+        return order[ledger_state['site_entries'][order] > 0]
+        
+
+    def get_site_indices(self, ledger_state):
+        """Return the sorted list of sites with capacity entries.
+        """
+        return self.site_array[self.get_rows(ledger_state)].tolist()
+
+
+    def get_capacity(self, ledger_state):
+        """Return the total capacity at each site in get_site_indices, as
+        a list.
+        """
+        rows = self.get_rows(ledger_state)
+        return ledger_state['capacity'][rows].sum(axis=1).tolist()
+
+
+    def get_new_capacity(self, ledger_state, period):
+        """Return the capacity built in period at each site.
+        
+        Outputs:
+            sites: an array of the sites, as in get_site_indices
+            new_capacity: an array of the capacity built in period at each site
+            new_site: a boolean array, true where all the capacity at the 
+                site was built in period, and the site has never had 
+                capacity decommissioned
+        """
+        rows = self.get_rows(ledger_state)
+        cols = self.build_cols.get(period, self.no_cols)
+        new_capacity = ledger_state['capacity'][:, cols].sum(axis=1)[rows]
+        new_entries = ledger_state['entries'][:, cols].sum(axis=1)[rows]
+        new_site = ((new_entries == ledger_state['site_entries'][rows]) &
+            (ledger_state['site_history'][rows] == 0))
+        return self.site_array[rows], new_capacity, new_site
+
+
+    def decommission(self, ledger_state, period):
+        """Remove the capacity that is decommissioned at the end of period,
+        and count it in the site history.
+        
+        Outputs:
+            sites: a list of the sites with capacity decommissioned, in order
+                of site index
+            decommissioned: an array of the capacity decommissioned at each 
+                site
+        """
+        self.fit(ledger_state)
+        cols = self.decomm_cols.get(period, self.no_cols)
+        if len(cols) == 0:
+            return [], numpy.zeros(0)
+        entries = ledger_state['entries'][:, cols].sum(axis=1)
+        order = self.site_order
+        rows = order[entries[order] > 0]
+        decommissioned = ledger_state['capacity'][:, cols].sum(axis=1)[rows]
+        ledger_state['capacity'][:, cols] = 0
+        ledger_state['entries'][:, cols] = 0
+        ledger_state['site_entries'][rows] -= entries[rows]
+        ledger_state['site_history'][rows] += entries[rows]
+        return self.site_array[rows].tolist(), decommissioned
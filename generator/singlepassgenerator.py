@@ -28,6 +28,44 @@
 """
 
 from tools import configurablebase
+import numpy
+
+
+def column_sums(values):
+    """Return the sum of each column of the 2-d array values. Each column is
+    summed as a contiguous row, which numpy sums in the same order as a 1-d
+    array, so the sums match those of calculate_cost_and_output exactly. A 
+    sum along axis 0 rounds differently, and scores would then depend on
+    how the genes were batched.
+    """
+    return numpy.ascontiguousarray(numpy.transpose(values)).sum(axis=1)
+
+
+def masked_column_sums(values, mask):
+    """Return, for each column of the 2-d boolean array mask, the sum of the
+    values selected by that column, as numpy.sum(values[mask_column]) would
+    give. values is either 1-d, for every column, or 2-d, with one column
+    of values for each column of mask.
+    """
+    if values.ndim == 1:
+        return numpy.array([numpy.sum(values[mask[:,j]]) 
+            for j in range(mask.shape[1])])
+    else:
+        return numpy.array([numpy.sum(values[:,j][mask[:,j]]) 
+            for j in range(mask.shape[1])])
+
+
+def column_dot(matrix, params):
+    """Return numpy.dot(matrix, params), computed one column of params at a
+    time, exactly as numpy.dot(matrix, column) is for a single candidate. 
+    A single matrix product for the whole set rounds differently.
+    """
+    columns = numpy.ascontiguousarray(numpy.transpose(params))
+    output = numpy.zeros((matrix.shape[0], columns.shape[0]))
+    for j in range(columns.shape[0]):
+        output[:,j] = numpy.dot(matrix, columns[j])
+    return output
+
 
 class SinglePassGeneratorBase(configurablebase.ConfigurableBase):
     """The base class for generic generators that calculate the
@@ -114,6 +152,37 @@ class SinglePassGeneratorBase(configurablebase.ConfigurableBase):
         return None
     
     
+    def calculate_cost_and_output_batch(self, params, rem_demand):
+        """Calculate the cost and output for a set of candidate params at once, 
+        with one candidate per column. This default calls calculate_cost_and_output
+        on each column in turn - generators that can handle the whole set as
+        array operations should override it. The results for each column must 
+        be exactly those of calculate_cost_and_output, so that a gene scores
+        the same however it is batched - column_sums, masked_column_sums and
+        column_dot do the reductions in the same order.
+        
+        This function is required to be thread-safe to allow multiprocessing.
+        
+        Inputs:
+            params: numpy.array - (param_count, n) array, with the params for
+                one candidate in each column.
+            rem_demand: numpy.array - (timeseries length, n) array, with the 
+                remaining demand for each candidate in each column.
+                
+        Outputs:
+            cost: numpy.array - length n, the total cost in $M for each candidate.
+            output: numpy.array - (timeseries length, n) array, with the power 
+                output time series for each candidate in each column.
+        """
+        count = rem_demand.shape[1]
+        cost = numpy.zeros(count)
+        output = numpy.zeros(rem_demand.shape)
+        for i in range(count):
+            cost[i], output[:,i] = self.calculate_cost_and_output(
+                params[:,i], rem_demand[:,i])
+        return cost, output
+    
+    
     def interpret_to_string(self):
         """Return a string that describes the generator type and the
         current capacity, following a call to calculate_cost_and_output
@@ -152,6 +152,22 @@ class VariableGeneratorBasic(singlepassgenerator.SinglePassGeneratorBase):
         return cost, output
     
     
+    def calculate_cost_and_output_batch(self, params, rem_demand):
+        """Implement calculate_cost_and_output_batch as defined in SinglePassGeneratorBase.
+        The output is the product of the capacity factor data and each column of 
+        the params, and the cost is calculated column-wise by calculate_cost_batch.
+        """
+        output = singlepassgenerator.column_dot(self.ts_cap_fac, params) * self.config['size']
+        return self.calculate_cost_batch(params), output
+        
+        
+    def calculate_cost_batch(self, params):
+        """Calculate the cost in $M of each column of params, as 
+        calculate_cost_and_output does for a single set.
+        """
+        return singlepassgenerator.column_sums(params) * self.config['size'] * self.config['capex']
+        
+    
     def interpret_to_string(self):
         """Return a string that describes the generator type and the
         current capacity, following a call to calculate_cost_and_output
@@ -212,6 +228,15 @@ class VariableGeneratorLinearInstall(VariableGeneratorBasic):
         return cost, output
 
 
+    def calculate_cost_batch(self, params):
+        """Calculate the cost in $M of each column of params, as 
+        calculate_cost_and_output does for a single set.
+        """
+        active = params > 0
+        return (singlepassgenerator.masked_column_sums(params, active) * self.config['capex'] *
+            self.config['size'] + self.config['install'] * numpy.sum(active, axis=0))
+
+
 class VariableGeneratorExpCost(VariableGeneratorBasic):
     """Override the VariableGeneratorBasic calculate method by calculating an
     exponential method capacity cost.
@@ -269,6 +294,15 @@ class VariableGeneratorExpCost(VariableGeneratorBasic):
             self.saved['capacity'] = params * self.config['size']
                 
         return cost, output
+
+
+    def calculate_cost_batch(self, params):
+        """Calculate the cost in $M of each column of params, as 
+        calculate_cost_and_output does for a single set.
+        """
+        unit_cost = self.config['size'] * self.config['capex']
+        cpt = (self.config['install'] - unit_cost) * numpy.exp(-0.1 * (params - 1)) + unit_cost
+        return singlepassgenerator.column_sums(numpy.where(params < 1, 0, params * cpt))
                 
 
 class VariableGeneratorSqrtCost(VariableGeneratorBasic):
@@ -323,6 +357,18 @@ class VariableGeneratorSqrtCost(VariableGeneratorBasic):
         return cost, output
 
 
+    def calculate_cost_batch(self, params):
+        """Calculate the cost in $M of each column of params, as 
+        calculate_cost_and_output does for a single set.
+        """
+        m_gen = (self.config['capex'] * self.config['max_count']) / numpy.sqrt(self.config['max_count'])
+        gen_add = self.config['install'] + (
+            self.config['size'] * self.config['capex']) - m_gen
+        # Clip before the sqrt so the masked-out values stay finite
+        site_cost = m_gen * numpy.sqrt(numpy.clip(params, 1, numpy.Inf)) + gen_add
+        return singlepassgenerator.column_sums(numpy.where(params < 1, 0, site_cost))
+
+
 class VariableGeneratorAsymptCost(VariableGeneratorBasic):
     """Override the VariableGeneratorBasic calculate method by using a
     method that has an asymptotic gradient for the capacity cost.
@@ -409,6 +455,33 @@ class VariableGeneratorAsymptCost(VariableGeneratorBasic):
         return cost, output
 
 
+    def calculate_cost_and_output_batch(self, params, rem_demand):
+        """Implement calculate_cost_and_output_batch as defined in SinglePassGeneratorBase,
+        with the params clipped at 0 for the output as in calculate_cost_and_output.
+        """
+        clipped = numpy.clip(params, 0, numpy.Inf)
+        output = singlepassgenerator.column_dot(self.ts_cap_fac, clipped) * self.config['size']
+        return self.calculate_cost_batch(params), output
+
+
+    def calculate_cost_batch(self, params):
+        """Calculate the cost in $M of each column of params, as 
+        calculate_cost_and_output does for a single set.
+        """
+        alpha = self.config['alpha']
+        a = self.config['capex'] * self.config['size']
+
+        # Clip before the log so the masked-out values stay finite
+        p = numpy.clip(params, 1, numpy.Inf)
+        root = numpy.sqrt(a + (alpha * p)**2)
+        site_cost = self.config['install'] + (a * (root + (numpy.sqrt(a) * numpy.log(p)) - 
+            (numpy.sqrt(a) * numpy.log(a + numpy.sqrt(a) * root))) / alpha)
+        cost = singlepassgenerator.column_sums(numpy.where(params < 1, 0, site_cost))
+
+        return cost + singlepassgenerator.masked_column_sums(
+            numpy.ravel(self.distances), params > 0)
+
+
 class IncrementalVariableGeneratorBasic(VariableGeneratorBasic):
     """This is a hack for the GE demo, in advance of a decent system for handling
     the incremental / multi-decade operation. The model expects twice as many
@@ -461,3 +534,15 @@ class IncrementalVariableGeneratorBasic(VariableGeneratorBasic):
             self.saved['capacity'] = params[:self.req_params] * self.config['size']
 
         return cost, output
+
+
+    def calculate_cost_and_output_batch(self, params, rem_demand):
+        """Implement calculate_cost_and_output_batch as defined in SinglePassGeneratorBase,
+        taking the total stock from the first half of each column of params and 
+        the incremental build from the second half.
+        """
+        output = singlepassgenerator.column_dot(self.ts_cap_fac, 
+            params[:self.req_params]) * self.config['size']
+        cost = singlepassgenerator.column_sums(
+            params[self.req_params:]) * self.config['size'] * self.config['capex']
+        return cost, output
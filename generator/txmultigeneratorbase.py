@@ -30,7 +30,7 @@ system, and which fit in with a transmission model and economic model.
 
 from tools import mureilexception
 from tools import configurablebase
-import copy
+import numpy
 
 class TxMultiGeneratorBase(configurablebase.ConfigurableMultiBase):
     """An base class for generic generators 
@@ -72,13 +72,43 @@ class TxMultiGeneratorBase(configurablebase.ConfigurableMultiBase):
 
     def get_startup_state_handle(self):
         """Return the starting state, in whatever form the model chooses, to be
-        passed in at each iteration by the master. The deepcopy ensures it is 
-        thread-safe as a separate copy is used for each master calculate call.
+        passed in at each iteration by the master. It is thread-safe as a 
+        separate copy, made by copy_state_handle, is used for each master 
+        calculate call.
         
         Outputs:
             startup_state_handle: a new copy of the starting state of this model
         """
-        return copy.deepcopy(self.startup_state)
+        return self.copy_state_handle(self.startup_state)
+    
+
+    def copy_state_handle(self, state_handle):
+        """Return a copy of state_handle, as passed to and updated by
+        calculate_time_period_simple, that can be updated in turn without
+        changing state_handle. Used by the master to save the state at the
+        end of a period and continue from it later.
+        
+        The copy is copy-on-write. The top-level dict, and the dicts in it,
+        such as the 'capacity' and 'history' maps of site to list, are copied,
+        but the lists themselves are shared with state_handle. Models must 
+        therefore never update a list in a state handle in place - to change 
+        the list for a site, build a new list and assign it to the site, as 
+        TxMultiGeneratorMultiSite does. This is much cheaper than a deepcopy 
+        of the whole state on every master calculate call.
+        
+        Inputs:
+            state_handle: as returned by get_startup_state_handle, possibly
+                updated since.
+            
+        Outputs:
+            state_handle: a new copy of state_handle
+        """
+        new_handle = {}
+        for key, value in state_handle.iteritems():
+            if isinstance(value, dict):
+                value = dict(value)
+            new_handle[key] = value
+        return new_handle
     
     
     def get_data_types(self):
@@ -337,6 +367,30 @@ class TxMultiGeneratorBase(configurablebase.ConfigurableMultiBase):
             ', falling through to TxMultiGeneratorBase which does not provide an implementation.')
         
         
+    def calculate_outputs_and_costs_aggregate(self, state_handle, supply_request):
+        """Calculate the supply, variable cost and carbon emissions as for
+        calculate_outputs_and_costs, but totalled over all the sites. This is used by 
+        calculate_time_period_simple when full results are not requested.
+        
+        This implementation sums the outputs of calculate_outputs_and_costs. Models
+        may override it to find the totals without making a timeseries for each site.
+        
+        Inputs:
+            state_handle: as for calculate_outputs_and_costs
+            supply_request: as for calculate_outputs_and_costs
+            
+        Outputs:
+            supply: a timeseries of the total output of all sites in MW.
+            variable_cost: the total variable cost in $M, for the timeseries length.
+            carbon_emissions: the total carbon emissions in tonnes of CO2, for the
+                timeseries length.
+        """
+        supply, variable_cost, carbon_emissions, other = (
+            self.calculate_outputs_and_costs(state_handle, supply_request))
+        return (numpy.sum(supply, axis=0), numpy.sum(variable_cost, axis=0),
+            numpy.sum(carbon_emissions, axis=0))
+        
+        
     def calculate_time_period_simple(self, state_handle, period, new_params, 
         supply_request, full_results=False):
         """Calculate, for this time period, the total supply of all sites in this model,
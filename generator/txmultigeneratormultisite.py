@@ -31,7 +31,7 @@ multi-site generators.
 from tools import mureilexception, mureilbuilder
 import copy
 import numpy
-from generator import txmultigeneratorbase
+from generator import txmultigeneratorbase, capacityledger
 
 import logging
 logger = logging.getLogger(__name__)
@@ -43,6 +43,12 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
     The 'capacity' term in state_handle is implemented as a dict with one item per site. 
     Each site item is a list of tuples containing (site_index,build_period,decommissioning_period),
     describing the set of installed capacity. 
+    
+    With array_ledger set, the state_handle instead holds the capacity in the
+    arrays of a capacityledger.CapacityLedger, as state_handle['ledger'].
+    Subclasses should then use get_capacity and get_site_indices rather than
+    reading the state_handle directly, and calculate_capital_cost_site is not
+    used, so must not be overridden.
     """
     
     def __init__(self):
@@ -54,6 +60,11 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
         # params_to_site maps the index in the params list to the site indices.
         self.params_to_site = []
         
+        # The capacity ledger, if array_ledger is set.
+        self.ledger = None
+        self.startup_ledger_state = None
+        self.ledger_params_to_site = None
+        
 
     def get_config_spec(self):
         """Return a list of tuples of format (name, conversion function, default),
@@ -92,6 +103,10 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
             decommissioning_cost: float, optional (default 0) - cost in $M per MW for 
                 decommissioning.
             lifetime_yrs: float, default 20 - the time in years that new capacity lasts
+            
+            array_ledger: boolean, default False - if True, keep the installed capacity
+                in an array-backed capacityledger.CapacityLedger rather than in lists 
+                of tuples. This is faster where there are many sites.
         """
         return txmultigeneratorbase.TxMultiGeneratorBase.get_config_spec(self) + [
             ('variable_cost_mult', float, 1.0),
@@ -110,7 +125,8 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
             ('size', float, 1.0),
             ('start_min_param', int, 1e20),
             ('start_max_param', int, 1e20),
-            ('timestep_hrs', float, None)
+            ('timestep_hrs', float, None),
+            ('array_ledger', mureilbuilder.string_to_bool, False)
             ]
 
 
@@ -142,6 +158,13 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
                 str(time_period_yrs))
             raise mureilexception.ConfigException(msg, {})
 
+        if self.config['array_ledger'] and (self.calculate_capital_cost_site.im_func is not
+            TxMultiGeneratorMultiSite.calculate_capital_cost_site.im_func):
+            msg = ('In section ' + self.config['section'] + ', array_ledger is set, but ' +
+                'the model overrides calculate_capital_cost_site, which the array ledger ' +
+                'does not use.')
+            raise mureilexception.ConfigException(msg, {})
+
         # Set the startup state and the params to site from the configuration strings.
         if self.config['startup_data_string'] is not None:
             self.set_startup_state(self.config['startup_data_string'])
@@ -150,6 +173,27 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
             self.params_to_site = self.config['params_to_site_data_string']
                 
 
+    def complete_configuration_post_expand(self):
+        """Complete the configuration after expanding the period configs.
+        
+        This implementation makes the capacity ledger if array_ledger is set, 
+        with a column for the capacity built in each run period. Rows for the 
+        sites are added as they are seen.
+        """
+        txmultigeneratorbase.TxMultiGeneratorBase.complete_configuration_post_expand(self)
+        
+        self.ledger = None
+        self.startup_ledger_state = None
+        self.ledger_params_to_site = None
+        if self.config['array_ledger']:
+            vintages = []
+            for period in self.run_periods:
+                curr_conf = self.period_configs[period]
+                vintages.append((period, int(curr_conf['lifetime_yrs'] - 
+                    curr_conf['time_period_yrs'] + period)))
+            self.ledger = capacityledger.CapacityLedger([], vintages)
+        
+
     def get_data_types(self):
         """Return a list of keys for each type of
         data required, for example ts_wind, ts_demand.
@@ -224,6 +268,7 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
         self.extra_periods.sort()
 
         # And insert each existing generator into the starting state.
+        self.startup_ledger_state = None
         cap_list = self.startup_state['capacity']
         hist_list = self.startup_state['history']
 
@@ -239,15 +284,11 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
                     ' adds startup capacity decommissioned at end of ' + decomm_date +
                     ' but the first run period is ' + self.run_periods[0] + 
                     ' so it has been removed from the startup state.')
-                if site_index not in hist_list:
-                    hist_list[site_index] = []
-                hist_list[site_index].append(new_entry)
+                hist_list[site_index] = hist_list.get(site_index, []) + [new_entry]
             else:
                 new_entry = (new_cap, period, decomm_date)
 
-                if site_index not in cap_list:
-                    cap_list[site_index] = []
-                cap_list[site_index].append(new_entry)
+                cap_list[site_index] = cap_list.get(site_index, []) + [new_entry]
 
 
     def get_param_count(self):
@@ -291,6 +332,46 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
         return start_mins, start_maxs
         
         
+    def get_param_rows(self):
+        """Return an array of the capacity ledger row for each param, as 
+        mapped by params_to_site.
+        """
+        if self.ledger_params_to_site is not self.params_to_site:
+            ledger = self.ledger
+            self.param_rows = numpy.array([ledger.get_row(int(site)) 
+                for site in self.params_to_site], dtype=int)
+            self.ledger_params_to_site = self.params_to_site
+        return self.param_rows
+        
+
+    def get_startup_state_handle(self):
+        """Implements get_startup_state_handle as defined in txmultigeneratorbase.
+        With array_ledger set, the state handle holds a copy of the ledger
+        arrays made from the startup state.
+        """
+        ledger = self.ledger
+        if ledger is None:
+            return txmultigeneratorbase.TxMultiGeneratorBase.get_startup_state_handle(self)
+
+        if self.startup_ledger_state is None:
+            self.startup_ledger_state = ledger.make_state(
+                self.startup_state['capacity'], self.startup_state['history'])
+        return {'curr_period': self.startup_state['curr_period'],
+            'ledger': ledger.copy_state(self.startup_ledger_state)}
+        
+
+    def copy_state_handle(self, state_handle):
+        """Implements copy_state_handle as defined in txmultigeneratorbase, 
+        copying the ledger arrays with array_ledger set.
+        """
+        if self.ledger is None:
+            return txmultigeneratorbase.TxMultiGeneratorBase.copy_state_handle(
+                self, state_handle)
+
+        return {'curr_period': state_handle['curr_period'],
+            'ledger': self.ledger.copy_state(state_handle['ledger'])}
+        
+        
     def update_state_new_period_list(self, state_handle, period, new_capacity):
         """Implements update_state_new_period_list as defined in txmultigeneratorbase,
         for the state_handle format for this multi-site implementation.
@@ -298,6 +379,16 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
 
         state_handle['curr_period'] = period
 
+        ledger = self.ledger
+        if ledger is not None:
+            rows = [ledger.get_row(int(site_index)) for site_index, new_cap, decomm_date
+                in new_capacity]
+            cols = [ledger.get_col(period, int(decomm_date)) for site_index, new_cap,
+                decomm_date in new_capacity]
+            ledger.add(state_handle['ledger'], rows, cols, 
+                [new_cap for site_index, new_cap, decomm_date in new_capacity])
+            return None
+
         cap_list = state_handle['capacity']        
 
         for site_index, new_cap, decomm_date in new_capacity:
@@ -305,10 +396,9 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
             
             new_entry = (new_cap, period, int(decomm_date))
 
-            if site_index not in cap_list:
-                cap_list[site_index] = []
-
-            cap_list[site_index].append(new_entry)
+            # The site lists are shared with other state handles, so are
+            # replaced rather than appended to - see copy_state_handle.
+            cap_list[site_index] = cap_list.get(site_index, []) + [new_entry]
 
         return None
 
@@ -324,18 +414,22 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
         curr_conf = self.period_configs[period]
         decomm_date = int(curr_conf['lifetime_yrs'] - curr_conf['time_period_yrs'] + period)
         
-        cap_list = state_handle['capacity']        
-
         new_cap = numpy.array(new_params).clip(0) * curr_conf['size']
 
+        ledger = self.ledger
+        if ledger is not None:
+            index = numpy.nonzero(new_cap)[0]
+            ledger.add(state_handle['ledger'], self.get_param_rows()[index],
+                ledger.get_col(period, decomm_date), new_cap[index])
+            return None
+
+        cap_list = state_handle['capacity']        
+
         for i in (numpy.nonzero(new_cap)[0]):
             site_index = self.params_to_site[i]
             new_entry = (new_cap[i], period, decomm_date)
 
-            if site_index not in cap_list:
-                cap_list[site_index] = []
-
-            cap_list[site_index].append(new_entry)
+            cap_list[site_index] = cap_list.get(site_index, []) + [new_entry]
 
         return None
  
@@ -345,6 +439,15 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
         for the state_handle format for this multi-site implementation.
         """
         period = state_handle['curr_period']
+        decomm_cost = self.period_configs[period]['decommissioning_cost']
+
+        if self.ledger is not None:
+            sites, decommissioned = self.ledger.decommission(
+                state_handle['ledger'], period)
+            cost = decommissioned * decomm_cost
+            return float(numpy.sum(cost)), zip(sites, decommissioned.tolist(), 
+                cost.tolist())
+
         cap_list = state_handle['capacity']
         hist_list = state_handle['history']
     
@@ -354,8 +457,6 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
         decommissioned = []
         fully_decommissioned = []
     
-        decomm_cost = self.period_configs[period]['decommissioning_cost']
-
         for site, site_caps in cap_list.iteritems():
             
             decomm = [tup for tup in site_caps if (tup[2] == period)]
@@ -368,10 +469,9 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
                 cost.append(this_cost)
                 total_cost += this_cost
 
-                # add the decommissioned capacity to the 'history' list
-                if not site in hist_list:
-                    hist_list[site] = []
-                hist_list[site] += decomm
+                # add the decommissioned capacity to the 'history' list,
+                # as a new list as it may be shared with other state handles
+                hist_list[site] = hist_list.get(site, []) + decomm
                 
                 # and rebuild the list of what's left
                 # note that the expression in here is the complement of that to compute
@@ -397,6 +497,19 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
         """
         
         period = state_handle['curr_period']
+
+        if self.ledger is not None:
+            sites, new_cap, new_site = self.ledger.get_new_capacity(
+                state_handle['ledger'], period)
+            built = new_cap > 0
+            new_cap = new_cap[built]
+            cost = new_cap * self.period_configs[period]['capital_cost']
+            install_cost = self.period_configs[period]['install_cost']
+            if install_cost > 0:
+                cost += new_site[built] * install_cost
+            return float(numpy.sum(cost)), zip(sites[built].tolist(), 
+                new_cap.tolist(), cost.tolist())
+
         cap_list = state_handle['capacity']
         hist_list = state_handle['history']
     
@@ -469,6 +582,9 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
         multi-site implementation.
         """
 
+        if self.ledger is not None:
+            return self.ledger.get_capacity(state_handle['ledger'])
+
         index_list = self.get_site_indices(state_handle)
         cap_list = state_handle['capacity']
         
@@ -485,6 +601,9 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
         multi-site implementation.
         """
         
+        if self.ledger is not None:
+            return self.ledger.get_site_indices(state_handle['ledger'])
+
         site_indices = state_handle['capacity'].keys()
         site_indices.sort()
         
@@ -503,18 +622,23 @@ class TxMultiGeneratorMultiSite(txmultigeneratorbase.TxMultiGeneratorBase):
         self.update_state_new_period_params(state_handle, period, new_params)
         site_indices = self.get_site_indices(state_handle)
         capital_cost, new_capacity = self.calculate_new_capacity_cost(state_handle)
-        supply_list, variable_cost_list, carbon_emissions_list, other_list = ( 
-            self.calculate_outputs_and_costs(state_handle, supply_request))
 
         if full_results:
+            supply_list, variable_cost_list, carbon_emissions_list, other_list = ( 
+                self.calculate_outputs_and_costs(state_handle, supply_request))
             capacity = self.get_capacity(state_handle)
 
-        # Compute the total supply
-        supply = numpy.sum(supply_list, axis=0)
+            # Compute the totals
+            supply = numpy.sum(supply_list, axis=0)
+            variable_cost = numpy.sum(variable_cost_list, axis=0)
+            carbon_emissions = numpy.sum(carbon_emissions_list, axis=0)
+        else:
+            # Only the totals are needed
+            supply, variable_cost, carbon_emissions = (
+                self.calculate_outputs_and_costs_aggregate(state_handle, supply_request))
         
         # Compute the total variable costs, including carbon cost, for the timeseries, scaled up
-        cost = ((numpy.sum(variable_cost_list, axis=0) + 
-            (numpy.sum(carbon_emissions_list, axis=0) * curr_config['carbon_price_m'])) * (
+        cost = ((variable_cost + (carbon_emissions * curr_config['carbon_price_m'])) * (
             curr_config['variable_cost_mult']))
                 
         # Do the decommissioning
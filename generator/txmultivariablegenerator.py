@@ -40,6 +40,10 @@ class TxMultiVariableGeneratorBase(txmultigeneratormultisite.TxMultiGeneratorMul
     interfacesflowmaster.InterfaceSemiScheduledDispatch):
     """A simple implementation of a variable generator, providing 
     per-unit capital costs.
+    
+    calculate_outputs_and_costs_aggregate finds the totals directly from the
+    data, unless a subclass overrides calculate_outputs, calculate_variable_costs
+    or calculate_outputs_and_costs, when it sums their results instead.
     """
 
     def get_details(self):
@@ -148,6 +152,16 @@ class TxMultiVariableGeneratorBase(txmultigeneratormultisite.TxMultiGeneratorMul
                     ' was requested by the model in section ' + self.config['section'] +
                     ' but the maximum index in the data array is ' + str(max_data), {})
 
+        # Keep the data transposed, so that the timeseries for each data index 
+        # is contiguous in memory, and an array of the data index for each site,
+        # -1 where the site is not mapped, so the outputs of all the sites can 
+        # be gathered at once.
+        self.site_data = numpy.ascontiguousarray(self.data.T, dtype=float)
+        max_site = max([int(site) for site in self.site_to_data] + [-1])
+        self.site_data_index = -numpy.ones(max_site + 1, dtype=int)
+        for site, data_index in self.site_to_data.iteritems():
+            self.site_data_index[int(site)] = int(data_index)
+
 
     def calculate_dispatch_offer(self, period, param=None):
         """Calculate the dispatch offer as the SRMC. This is the VOM for variable generators.
@@ -181,23 +195,31 @@ class TxMultiVariableGeneratorBase(txmultigeneratormultisite.TxMultiGeneratorMul
             site_indices: the list of sites with active capacity
             output: a set of timeseries, corresponding to site_indices
         """
-        cap_list = state_handle['capacity']
         site_indices = self.get_site_indices(state_handle)
-        num_sites = len(site_indices)
-        output = numpy.zeros((num_sites, ts_length))
-        
-        for i in range(num_sites):
-            site = site_indices[i]
-            total_cap = sum([tup[0] for tup in cap_list[site]])
-            data_index = self.site_to_data[site]
-            ### TODO - it may be expensive to have self.data this way -
-            ### would it help to transpose it when it's read in, so
-            ### the memory lines up better?
-            output[i,:] = self.data[:,data_index] * total_cap
+        if len(site_indices) == 0:
+            return site_indices, numpy.zeros((0, ts_length))
+
+        output = self.site_data[self.get_data_index(site_indices)]
+        output *= numpy.array(self.get_capacity(state_handle))[:, numpy.newaxis]
 
         return site_indices, output
         
         
+    def get_data_index(self, site_indices):
+        """Return an array of the index into the data for each site in the
+        sorted list site_indices, raising a MureilException if any site 
+        has no data.
+        """
+        data_index = None
+        if site_indices[-1] < len(self.site_data_index):
+            data_index = self.site_data_index[site_indices]
+        if (data_index is None) or (data_index.min() < 0):
+            raise mureilexception.MureilException('The model in section ' + 
+                self.config['section'] + ' has capacity at sites with no data: ' +
+                str([site for site in site_indices if site not in self.site_to_data]), {})
+        return data_index
+        
+        
     def calculate_variable_costs(self, state_handle, site_indices, schedule):
         """Calculate variable costs and carbon based on schedule.
         
@@ -213,8 +235,8 @@ class TxMultiVariableGeneratorBase(txmultigeneratormultisite.TxMultiGeneratorMul
         num_sites = len(site_indices)
         vble_cost = numpy.zeros(num_sites)
         carbon = numpy.zeros(num_sites)
-        for i in range(num_sites):
-            vble_cost[i] = numpy.sum(schedule[i,:]) * vom
+        if num_sites > 0:
+            vble_cost = numpy.sum(schedule, axis=1) * vom
         
         return vble_cost, carbon, {}
         
@@ -230,6 +252,51 @@ class TxMultiVariableGeneratorBase(txmultigeneratormultisite.TxMultiGeneratorMul
         return supply, vble_cost, carbon, other
         
 
+    def calculate_outputs_and_costs_aggregate(self, state_handle, supply_request):
+        """Implement calculate_outputs_and_costs_aggregate as defined in TxMultiGeneratorBase,
+        for the variable generators. The total supply is the product of the capacity
+        of each site and the data for the sites, so no timeseries is made for each site.
+        
+        The totals are summed in a different order from the full results, so match
+        them only to within rounding - a relative difference of at most 1e-12 in the
+        supply at each timestep and in the variable cost, as the outputs are not 
+        negative. A score from calc_cost without full results can then differ from
+        the cost reported with full results in the last few digits. Making each
+        site's timeseries in turn to sum them in the same order would take longer
+        than the full calculation.
+        
+        If a subclass overrides any of the methods this stands in for, the totals
+        are instead summed from calculate_outputs_and_costs by the base class, so
+        they match the full results exactly.
+        """
+        if not self.has_base_outputs():
+            return txmultigeneratormultisite.TxMultiGeneratorMultiSite.calculate_outputs_and_costs_aggregate(
+                self, state_handle, supply_request)
+
+        site_indices = self.get_site_indices(state_handle)
+        if len(site_indices) == 0:
+            return numpy.zeros(len(supply_request)), 0.0, 0.0
+
+        supply = numpy.dot(self.get_capacity(state_handle),
+            self.site_data[self.get_data_index(site_indices)])
+        vom = self.period_configs[state_handle['curr_period']]['vom'] * 1e-6
+        
+        return supply, numpy.sum(supply) * vom, 0.0
+        
+
+    def has_base_outputs(self):
+        """Return True if this model calculates its outputs and variable costs with
+        the implementations in TxMultiVariableGeneratorBase, which the direct
+        calculation in calculate_outputs_and_costs_aggregate relies on.
+        """
+        for name in ['calculate_outputs', 'calculate_variable_costs', 
+            'calculate_outputs_and_costs']:
+            if (getattr(self, name).im_func is not 
+                getattr(TxMultiVariableGeneratorBase, name).im_func):
+                return False
+        return True
+        
+
     def get_simple_desc_string(self, results, state_handle):
         """Implement get_simple_desc_string as defined in TxMultiGeneratorBase, for the
         variable generator.
@@ -120,7 +120,6 @@ class TxMultiBasicPumpedHydroOptimisable(txmultigeneratormultisite.TxMultiGenera
         for each site, and the carbon emissions.
         """
         
-        cap_list = state_handle['capacity']
         site_indices = self.get_site_indices(state_handle)
         num_sites = len(site_indices)
 
@@ -139,8 +138,7 @@ class TxMultiBasicPumpedHydroOptimisable(txmultigeneratormultisite.TxMultiGenera
         
         if num_sites > 0:
             j = 0
-            site = site_indices[j]
-            capacity = sum([tup[0] for tup in cap_list[site]])
+            capacity = self.get_capacity(state_handle)[j]
             supply[j,:] = self.compute_pumped_hydro_ts(supply_request, capacity)
 
         return supply, vble_cost, carbon, {}
@@ -147,6 +147,7 @@ class SimpleMureilMaster(mureilbase.MasterInterface, configurablebase.Configurab
         algorithm_config['start_values_min'] = start_values_min
         algorithm_config['start_values_max'] = start_values_max
         algorithm_config['gene_test_callback'] = self.gene_test
+        algorithm_config['gene_test_batch_callback'] = self.gene_test_batch
         self.algorithm = mureilbuilder.create_instance(full_config, self.global_config,
             self.config['algorithm'], mureilbase.ConfigurableInterface)
 
@@ -179,6 +180,8 @@ class SimpleMureilMaster(mureilbase.MasterInterface, configurablebase.Configurab
                 that, report on the simulation status.
             do_plots: Defaults to False. If True, output plots every output_frequency and at the end
                 of the run.
+            resume: Defaults to False. If True, continue the run from the algorithm's checkpoint
+                file, as configured in the algorithm section.
 
             optim_type: Defaults to 'missed_supply'. Either 'missed_supply' or 'match_demand'. 
                 'match_demand' is a legacy case that may not be maintained. 
@@ -192,7 +195,8 @@ class SimpleMureilMaster(mureilbase.MasterInterface, configurablebase.Configurab
             ('dispatch_order', mureilbuilder.make_string_list, None),
             ('optim_type', None, 'missed_supply'),
             ('do_plots', mureilbuilder.string_to_bool, False),
-            ('output_frequency', int, 500)
+            ('output_frequency', int, 500),
+            ('resume', mureilbuilder.string_to_bool, False)
             ]
 
 
@@ -207,12 +211,21 @@ class SimpleMureilMaster(mureilbase.MasterInterface, configurablebase.Configurab
     
         try:
             self.algorithm.prepare_run()
-            for i in range(self.config['iterations']):
+            start_iteration = 0
+            if self.config['resume']:
+                start_iteration = self.algorithm.load_checkpoint()
+            # The number of iterations done, which is less than iterations
+            # if the algorithm finishes early
+            final_iteration = start_iteration
+            for i in range(start_iteration, self.config['iterations']):
                 self.algorithm.do_iteration()
+                final_iteration = i + 1
                 if ((self.config['output_frequency'] > 0) and
                     ((i % self.config['output_frequency']) == 0)):
                     logger.info('Interim results at iteration %d', i)
-                    self.output_results()
+                    self.output_results(iteration=i)
+                if self.algorithm.is_finished():
+                    break
                     
         except mureilexception.AlgorithmException:
             # Insert here something special to do if debugging
@@ -222,12 +235,12 @@ class SimpleMureilMaster(mureilbase.MasterInterface, configurablebase.Configurab
     
         logger.critical('Run time: %.2f seconds', (time.time() - start_time))
 
-        results = self.output_results(final=True)
+        results = self.output_results(iteration=final_iteration, final=True)
         
         return results
     
     
-    def output_results(self, final=False):
+    def output_results(self, final=False, iteration=0):
     
         (best_gene, best_gene_data) = self.algorithm.get_final()
         
@@ -267,7 +280,7 @@ class SimpleMureilMaster(mureilbase.MasterInterface, configurablebase.Configurab
     
         if self.config['do_plots']:
             mureiloutput.plot_timeseries(results['output'], 
-                ts_demand, final)
+                ts_demand, final, plot_title=('At iteration ' + str(iteration)))
 
         output_file = self.config['output_file']
         mureiloutput.pickle_out(pickle_dict, output_file)
@@ -328,6 +341,58 @@ class SimpleMureilMaster(mureilbase.MasterInterface, configurablebase.Configurab
         return cost
 
 
+    def calc_cost_batch(self, gene_matrix):
+        """Calculate the total system cost for each gene in gene_matrix, one gene 
+        per row, as calc_cost does for a single gene. The remaining demand
+        is held as a (timeseries length, number of genes) array, and each 
+        generator is called once through calculate_cost_and_output_batch, 
+        so generators that implement that as array operations score the
+        whole set at once. Each cost is exactly that calc_cost gives for the
+        gene, as the sums over each column are done in the same order, so a 
+        score does not depend on how the genes are batched. As for calc_cost, 
+        this must be thread-safe.
+        """
+        
+        params = np.array(gene_matrix).T
+        count = params.shape[1]
+
+        if self.config['optim_type'] == 'match_demand':
+        
+            demand = np.array(self.data.get_timeseries('ts_demand'), dtype=float)
+            rem_demand = np.tile(demand.reshape(-1, 1), (1, count))
+
+            for gen_type in ['solar', 'wind']:
+                gen_ptr = self.gen_params[gen_type]
+                (this_cost, this_ts) = self.gen_list[gen_type].calculate_cost_and_output_batch(
+                    params[gen_ptr[0]:gen_ptr[1]], rem_demand)
+                rem_demand -= this_ts
+
+            cost = singlepassgenerator.column_sums(abs(rem_demand))/1000.0  #now in GW
+
+        elif self.config['optim_type'] == 'missed_supply':
+
+            # rem_demand is the running total, modified here
+            if 'demand' in self.dispatch_order:
+                rem_demand = np.zeros((self.data.get_ts_length(), count), dtype=float)
+            else:
+                demand = np.array(self.data.get_timeseries('ts_demand'), dtype=float)
+                rem_demand = np.tile(demand.reshape(-1, 1), (1, count))
+            
+            cost = np.zeros(count)
+
+            for gen_type in self.dispatch_order:
+                gen = self.gen_list[gen_type]
+                gen_ptr = self.gen_params[gen_type]
+
+                (this_cost, this_ts) = gen.calculate_cost_and_output_batch(
+                    params[gen_ptr[0]:gen_ptr[1]], rem_demand)
+                
+                cost += this_cost
+                rem_demand -= this_ts
+            
+        return cost
+
+
     def evaluate_results(self, params):
         """Collect a dict that includes all the calculated results from a
         run with params.
@@ -371,3 +436,11 @@ class SimpleMureilMaster(mureilbase.MasterInterface, configurablebase.Configurab
         """
         score = -1 * self.calc_cost(gene)
         return score
+
+
+    def gene_test_batch(self, gene_matrix):
+        """input: array of genes, one per row
+        output: list of floats
+        tests all of the genes together and returns their scores, in order
+        """
+        return (-1 * self.calc_cost_batch(gene_matrix)).tolist()
@@ -266,6 +266,8 @@ class TxMultiMasterFlow(mureilbase.MasterInterface, configurablebase.Configurabl
                 that, report on the simulation status.
             do_plots: Defaults to False. If True, output plots every output_frequency and at the end
                 of the run.
+            resume: Defaults to False. If True, continue the run from the algorithm's checkpoint
+                file, as configured in the algorithm section.
         """
         return [
             ('algorithm', None, 'Algorithm'),
@@ -280,7 +282,8 @@ class TxMultiMasterFlow(mureilbase.MasterInterface, configurablebase.Configurabl
             ('dispatch_fail_price', float, 1000000.0),
             ('do_plots', mureilbuilder.string_to_bool, False),
             ('output_frequency', int, 500),
-            ('run_periods', mureilbuilder.make_int_list, [2010])
+            ('run_periods', mureilbuilder.make_int_list, [2010]),
+            ('resume', mureilbuilder.string_to_bool, False)
             ]
 
 
@@ -295,12 +298,21 @@ class TxMultiMasterFlow(mureilbase.MasterInterface, configurablebase.Configurabl
     
         try:
             self.algorithm.prepare_run()
-            for i in range(self.config['iterations']):
+            start_iteration = 0
+            if self.config['resume']:
+                start_iteration = self.algorithm.load_checkpoint()
+            # The number of iterations done, which is less than iterations
+            # if the algorithm finishes early
+            final_iteration = start_iteration
+            for i in range(start_iteration, self.config['iterations']):
                 self.algorithm.do_iteration()
+                final_iteration = i + 1
                 if ((self.config['output_frequency'] > 0) and
                     ((i % self.config['output_frequency']) == 0)):
                     logger.info('Interim results at iteration %d', i)
                     self.output_results(iteration=i)
+                if self.algorithm.is_finished():
+                    break
                     
         except mureilexception.AlgorithmException:
             # Insert here something special to do if debugging
@@ -310,7 +322,7 @@ class TxMultiMasterFlow(mureilbase.MasterInterface, configurablebase.Configurabl
     
         logger.critical('Run time: %.2f seconds', (time.time() - start_time))
 
-        results = self.output_results(iteration=self.config['iterations'], final=True)
+        results = self.output_results(iteration=final_iteration, final=True)
         
         return results
     
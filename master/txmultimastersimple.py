@@ -33,6 +33,7 @@ from tools import mureilbuilder, mureilexception, mureiloutput, mureiltypes, glo
 from tools import mureilbase, configurablebase
 
 from generator import txmultigeneratorbase
+from algorithm import fitnesscache
 
 logger = logging.getLogger(__name__)
 
@@ -158,6 +159,14 @@ class TxMultiMasterSimple(mureilbase.MasterInterface, configurablebase.Configura
 
                 start_values_min = extra_data['start_gene']
                 start_values_max = extra_data['start_gene']
+
+        # The prefix cache is set up before the algorithm, so any worker
+        # processes it starts each have their own copy.
+        if self.config['prefix_cache_size'] > 0:
+            self.prefix_cache = fitnesscache.FitnessCache(self.config['prefix_cache_size'])
+        else:
+            self.prefix_cache = None
+        self.prefix_stats = {'evaluations': 0, 'periods_run': 0, 'periods_skipped': 0}
        
         # Instantiate the genetic algorithm
         mureilbuilder.check_section_exists(full_config, self.config['algorithm'])
@@ -166,6 +175,7 @@ class TxMultiMasterSimple(mureilbase.MasterInterface, configurablebase.Configura
         algorithm_config['start_values_min'] = start_values_min
         algorithm_config['start_values_max'] = start_values_max
         algorithm_config['gene_test_callback'] = self.gene_test
+        algorithm_config['gene_test_batch_callback'] = self.gene_test_batch
         self.algorithm = mureilbuilder.create_instance(full_config, self.global_config,
             self.config['algorithm'], mureilbase.ConfigurableInterface)
 
@@ -204,6 +214,16 @@ class TxMultiMasterSimple(mureilbase.MasterInterface, configurablebase.Configura
                 that, report on the simulation status.
             do_plots: Defaults to False. If True, output plots every output_frequency and at the end
                 of the run.
+            resume: Defaults to False. If True, continue the run from the algorithm's checkpoint
+                file, as configured in the algorithm section.
+            prefix_cache_size: Defaults to 0. If > 0, calc_cost keeps the generator and transmission
+                state handles and the cost so far at the end of each period but the last, for up to
+                this many distinct gene prefixes, where the prefix for a period is the params for it
+                and every earlier period. A gene that shares a prefix with one already evaluated,
+                such as a child that differs from its parent only in the later periods, is evaluated
+                from the end of the longest such prefix. Each worker process has its own cache.
+                Only for models whose state at the end of a period is held entirely in their
+                state handles.
         """
         return [
             ('algorithm', None, 'Algorithm'),
@@ -215,7 +235,9 @@ class TxMultiMasterSimple(mureilbase.MasterInterface, configurablebase.Configura
             ('dispatch_order', mureilbuilder.make_string_list, None),
             ('do_plots', mureilbuilder.string_to_bool, False),
             ('output_frequency', int, 500),
-            ('run_periods', mureilbuilder.make_int_list, [2010])
+            ('run_periods', mureilbuilder.make_int_list, [2010]),
+            ('resume', mureilbuilder.string_to_bool, False),
+            ('prefix_cache_size', int, 0)
             ]
 
 
@@ -230,12 +252,21 @@ class TxMultiMasterSimple(mureilbase.MasterInterface, configurablebase.Configura
     
         try:
             self.algorithm.prepare_run()
-            for i in range(self.config['iterations']):
+            start_iteration = 0
+            if self.config['resume']:
+                start_iteration = self.algorithm.load_checkpoint()
+            # The number of iterations done, which is less than iterations
+            # if the algorithm finishes early
+            final_iteration = start_iteration
+            for i in range(start_iteration, self.config['iterations']):
                 self.algorithm.do_iteration()
+                final_iteration = i + 1
                 if ((self.config['output_frequency'] > 0) and
                     ((i % self.config['output_frequency']) == 0)):
                     logger.info('Interim results at iteration %d', i)
                     self.output_results(iteration=i)
+                if self.algorithm.is_finished():
+                    break
                     
         except mureilexception.AlgorithmException:
             # Insert here something special to do if debugging
@@ -245,7 +276,7 @@ class TxMultiMasterSimple(mureilbase.MasterInterface, configurablebase.Configura
     
         logger.critical('Run time: %.2f seconds', (time.time() - start_time))
 
-        results = self.output_results(iteration=self.config['iterations'], final=True)
+        results = self.output_results(iteration=final_iteration, final=True)
         
         return results
     
@@ -325,6 +356,10 @@ class TxMultiMasterSimple(mureilbase.MasterInterface, configurablebase.Configura
         
 
     def finalise(self):
+        if (self.prefix_cache is not None) and (self.prefix_stats['evaluations'] > 0):
+            logger.debug('prefix cache in the master process: %d evaluations, ' + 
+                '%d periods run, %d skipped', self.prefix_stats['evaluations'],
+                self.prefix_stats['periods_run'], self.prefix_stats['periods_skipped'])
         self.algorithm.finalise()
 
             
@@ -334,27 +369,50 @@ class TxMultiMasterSimple(mureilbase.MasterInterface, configurablebase.Configura
         and so this calc_cost function (and all functions it calls) must be
         thread-safe. 
         This means that the function must not modify any of the 
-        internal data of the objects. 
+        internal data of the objects. The exception is the prefix cache, if
+        prefix_cache_size is set, which is only a record of results already
+        calculated, and is separate in each process.
         """
         
         temp = numpy.array(gene)
         params_set = temp.reshape(self.period_count, self.param_count)
 
         gen_state_handles = {}
-        for gen_type in self.dispatch_order:
-            gen_state_handles[gen_type] = (
-                self.gen_list[gen_type].get_startup_state_handle())        
-
-        if self.transmission is not None:
-            tx_state_handle = self.transmission.get_startup_state_handle()
-
+        tx_state_handle = None
         cost = 0
+        start_period = 0
+
+        prefix_keys = None
+        if (self.prefix_cache is not None) and not full_results:
+            prefix_keys = [self.prefix_cache.make_key(params_set[:i + 1])
+                for i in range(self.period_count - 1)]
+            for i in range(len(prefix_keys) - 1, -1, -1):
+                saved = self.prefix_cache.lookup(prefix_keys[i])
+                if saved is not None:
+                    saved_gen_state_handles, saved_tx_state_handle, cost = saved
+                    for gen_type in self.dispatch_order:
+                        gen_state_handles[gen_type] = self.gen_list[gen_type].copy_state_handle(
+                            saved_gen_state_handles[gen_type])
+                    tx_state_handle = copy.deepcopy(saved_tx_state_handle)
+                    start_period = i + 1
+                    break
+            self.prefix_stats['evaluations'] += 1
+            self.prefix_stats['periods_run'] += self.period_count - start_period
+            self.prefix_stats['periods_skipped'] += start_period
+
+        if start_period == 0:
+            for gen_type in self.dispatch_order:
+                gen_state_handles[gen_type] = (
+                    self.gen_list[gen_type].get_startup_state_handle())        
+
+            if self.transmission is not None:
+                tx_state_handle = self.transmission.get_startup_state_handle()
 
         if full_results:
             results = {'totals': {}, 'periods': {}, 'terminal': {}}
             total_carbon = 0.0
 
-        for i in range(len(self.run_periods)):
+        for i in range(start_period, len(self.run_periods)):
             period = self.run_periods[i]
             params = params_set[i]
 
@@ -403,6 +461,14 @@ class TxMultiMasterSimple(mureilbase.MasterInterface, configurablebase.Configura
             
             cost += period_cost
 
+            if (prefix_keys is not None) and (i < len(prefix_keys)):
+                saved_gen_state_handles = {}
+                for gen_type in self.dispatch_order:
+                    saved_gen_state_handles[gen_type] = self.gen_list[gen_type].copy_state_handle(
+                        gen_state_handles[gen_type])
+                self.prefix_cache.store(prefix_keys[i], (saved_gen_state_handles, 
+                    copy.deepcopy(tx_state_handle), cost))
+
         # calculate the terminal value at the end of the last period
         total_terminal_value = 0.0
 
@@ -452,3 +518,13 @@ class TxMultiMasterSimple(mureilbase.MasterInterface, configurablebase.Configura
         """
         score = -1 * self.calc_cost(gene)
         return score
+
+
+    def gene_test_batch(self, gene_matrix):
+        """input: array of genes, one per row
+        output: list of floats
+        tests each of the genes and returns their scores, in order. This
+        calls gene_test on each row in turn - subclasses able to score
+        the whole set at once can override it.
+        """
+        return [self.gene_test(gene) for gene in gene_matrix]
@@ -83,6 +83,16 @@ class LinearMissedSupply(singlepassgenerator.SinglePassGeneratorBase):
         return cost, output
 
 
+    def calculate_cost_and_output_batch(self, params, rem_demand):
+        """Implement calculate_cost_and_output_batch as defined in SinglePassGeneratorBase,
+        pricing the missed supply in each column of rem_demand.
+        """
+        output = rem_demand.clip(0)
+        cost = 1e-6 * singlepassgenerator.column_sums(output) * self.config['cost_per_mwh'] * self.config['timestep_hrs']
+        cost *= self.config['variable_cost_mult'] 
+        return cost, output
+
+
     def interpret_to_string(self):
         if self.saved:
             return 'Linear Missed-Supply, total {:.2f} MW-timestamps missed'.format(
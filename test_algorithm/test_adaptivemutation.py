@@ -0,0 +1,187 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of adaptivemutation
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_adaptivemutation.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import numpy
+import tempfile
+import shutil
+
+from tools import testutilities
+
+from algorithm import geneticalgorithm, adaptivemutation
+
+from test_geneticalgorithm import make_config, run_engine, run_resumed, quadratic_test
+
+
+def counting_quadratic_test(gene):
+    calls[0] += 1
+    return quadratic_test(gene)
+
+
+calls = [0]
+
+
+class TestAdaptiveMutation(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+        self.control = adaptivemutation.AdaptiveMutation(
+            {'base_mute': 0.1, 'local_mute': 0.05, 'gene_mute': 0.0}, 0.03,
+            min_scale=0.5, max_scale=2.0, step=1.5)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_update(self):
+        diverse = numpy.array([0.1, 0.2, 0.01])
+        # The first update has nothing to compare to
+        rates = self.control.update(0, diverse, -10)
+        self.assertAlmostEqual(rates['base_mute'], 0.1 / 1.5)
+        rates = self.control.update(1, diverse, -5)
+        self.assertAlmostEqual(rates['base_mute'], 0.1)
+        self.assertAlmostEqual(rates['local_mute'], 0.05)
+        self.assertEqual(rates['gene_mute'], 0)
+        # No improvement, down to the lower bound
+        for i in range(2, 6):
+            rates = self.control.update(i, diverse, -5)
+        self.assertAlmostEqual(rates['base_mute'], 0.05)
+        self.assertAlmostEqual(rates['local_mute'], 0.025)
+        # Low diversity raises the rates without an improvement, up to the 
+        # upper bound
+        for i in range(6, 12):
+            rates = self.control.update(i, numpy.array([0.01, 0.02, 0.2]), -5)
+        self.assertAlmostEqual(rates['base_mute'], 0.2)
+        self.assertEqual(rates['gene_mute'], 0)
+
+        trajectory = self.control.get_trajectory()
+        self.assertEqual(len(trajectory), 12)
+        self.assertEqual(trajectory[1][:3], (1, 0.1, True))
+        self.assertEqual(trajectory[2][:3], (2, 0.1, False))
+        self.assertTrue('1 improved' in self.control.get_summary_string())
+
+    def test_trajectory_size(self):
+        # Only the latest updates are kept, but the summary covers them all
+        control = adaptivemutation.AdaptiveMutation(
+            {'base_mute': 0.1, 'local_mute': 0.05, 'gene_mute': 0.0}, 0.03,
+            min_scale=0.5, max_scale=2.0, step=1.5, trajectory_size=5)
+        for i in range(20):
+            control.update(i, numpy.array([0.1]), -10 + (i % 2))
+        trajectory = control.get_trajectory()
+        self.assertEqual([entry[0] for entry in trajectory], range(15, 20))
+        summary = control.get_summary_string()
+        self.assertTrue(summary.startswith('20 updates, 10 improved'))
+        self.assertTrue('base_mute 0.1 (range 0.06667 to 0.1)' in summary)
+
+    def test_boost(self):
+        rates = self.control.boost()
+        self.assertAlmostEqual(rates['base_mute'], 0.2)
+        self.assertAlmostEqual(rates['local_mute'], 0.1)
+        self.assertEqual(rates['gene_mute'], 0)
+        self.assertEqual(self.control.get_summary_string(), 'no updates')
+
+
+class TestAdaptiveEngine(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def evaluations_to_reach(self, config, target, max_iterations):
+        engine = geneticalgorithm.Engine()
+        engine.set_config(config)
+        calls[0] = 0
+        engine.prepare_run()
+        try:
+            for i in range(max_iterations):
+                engine.do_iteration()
+                if engine.get_best_so_far()[-1] >= target:
+                    break
+        finally:
+            engine.finalise()
+        return calls[0], engine
+
+    def test_fewer_evaluations(self):
+        for array_pop in [False, True]:
+            totals = []
+            for adaptive in [False, True]:
+                total = 0
+                for seed in range(4):
+                    count, engine = self.evaluations_to_reach(make_config(
+                        array_pop=array_pop, seed=seed, adaptive_mutation=adaptive,
+                        gene_test_callback=counting_quadratic_test, cache_size=10000),
+                        -30, 500)
+                    total += count
+                totals.append(total)
+            self.assertTrue(totals[1] < totals[0])
+            # The population mutates at the adapted rates
+            trajectory = engine.mutation_control.get_trajectory()
+            self.assertEqual(len(trajectory), engine.iteration_count + 1)
+            self.assertEqual(engine.population.rates['base_mute'], trajectory[-1][3])
+            self.assertTrue(len(set([entry[3] for entry in trajectory])) > 1)
+
+    def test_reproducible(self):
+        for array_pop in [False, True]:
+            config = make_config(array_pop=array_pop, adaptive_mutation=True)
+            self.assertEqual(run_engine(config, 30), run_engine(config, 30))
+
+    def test_resume(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            straight = run_engine(make_config(adaptive_mutation=True), 20)
+            config = make_config(adaptive_mutation=True,
+                checkpoint_file=os.path.join(temp_dir, 'adaptive.pkl'),
+                checkpoint_frequency=5)
+            start, best_gene, best_gene_data = run_resumed(config, 20, 10)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(straight, (best_gene, best_gene_data))
+
+    def test_fixed(self):
+        # Without adaptive_mutation, the configured rates are used throughout
+        engine = geneticalgorithm.Engine()
+        engine.set_config(make_config())
+        self.assertTrue(engine.mutation_control is None)
+        engine.adapt_mutation()
+        self.assertEqual(engine.population.rates, 
+            {'base_mute': 0.05, 'local_mute': 0, 'gene_mute': 0.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
@@ -0,0 +1,151 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of differentialevolution
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_differentialevolution.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import numpy
+import tempfile
+import shutil
+
+from tools import mureilexception, testutilities
+
+from algorithm import differentialevolution
+
+from test_geneticalgorithm import make_config, run_engine, run_resumed, quadratic_test
+from test_geneticalgorithm import quadratic_test_batch, batch_calls
+
+
+def make_de_config(**kwargs):
+    config = make_config(model='algorithm.differentialevolution.DifferentialEvolutionEngine',
+        max_param_val=100, min_len=20, max_len=20)
+    config.update(kwargs)
+    return config
+
+
+def run_de(config, iterations):
+    return run_engine(config, iterations, differentialevolution.DifferentialEvolutionEngine)
+
+
+class TestDifferentialEvolution(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_run(self):
+        for strategy in ['rand1', 'best1', 'currenttobest1']:
+            best_gene, best_gene_data = run_de(make_de_config(de_strategy=strategy), 60)
+            self.assertEqual([data[2] for data in best_gene_data], range(60))
+            self.assertTrue(all(isinstance(val, int) for val in best_gene))
+            self.assertTrue(all(0 <= val <= 100 for val in best_gene))
+            scores = [data[1] for data in best_gene_data]
+            # A trial only replaces a gene that it scores at least as well as
+            self.assertEqual(scores, sorted(scores))
+            self.assertEqual(quadratic_test(best_gene), scores[-1])
+            self.assertTrue(scores[-1] > scores[0] / 10)
+
+    def test_better_than_ga(self):
+        # On a smooth problem, differential evolution gets closer than the 
+        # genetic algorithm in the same number of evaluations
+        ga_gene, ga_data = run_engine(make_de_config(
+            model='algorithm.geneticalgorithm.Engine'), 60)
+        de_gene, de_data = run_de(make_de_config(), 60)
+        self.assertTrue(quadratic_test(de_gene) > quadratic_test(ga_gene))
+
+    def test_start_values(self):
+        engine = differentialevolution.DifferentialEvolutionEngine()
+        engine.set_config(make_de_config(start_values_min=[10] * 20, 
+            start_values_max=[20] * 20))
+        values = engine.population.get_values()
+        self.assertTrue(numpy.all((values >= 10) & (values <= 20)))
+
+    def test_batch(self):
+        batch_calls[0] = 0
+        expected = run_de(make_de_config(), 10)
+        for processes in [0, 2]:
+            result = run_de(make_de_config(processes=processes, 
+                gene_test_batch_callback=quadratic_test_batch), 10)
+            self.assertEqual(result, expected)
+        # One batch call for the initial population and one per iteration
+        self.assertEqual(batch_calls[0], 11)
+
+    def test_resume(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            straight = run_de(make_de_config(), 12)
+            config = make_de_config(checkpoint_file=os.path.join(temp_dir, 'de.pkl'),
+                checkpoint_frequency=4)
+            start, best_gene, best_gene_data = run_resumed(config, 12, 8, 
+                differentialevolution.DifferentialEvolutionEngine)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(start, 8)
+        self.assertEqual(straight, (best_gene, best_gene_data))
+
+    def test_immigrants(self):
+        engine = differentialevolution.DifferentialEvolutionEngine()
+        engine.set_config(make_de_config())
+        engine.prepare_run()
+        try:
+            engine.do_iteration()
+            target = (numpy.arange(20) * 3).tolist()
+            engine.add_immigrants([target])
+            engine.do_iteration()
+            best_gene, best_gene_data = engine.get_final(log_results=False)
+        finally:
+            engine.finalise()
+        self.assertEqual(best_gene, target)
+
+    def test_unused_keys(self):
+        # The genetic algorithm's breeding and mutation settings need not be set
+        config = make_de_config()
+        for key in ['mort', 'nuke_power', 'base_mute', 'gene_mute']:
+            del config[key]
+        self.assertEqual(run_de(config, 5), run_de(make_de_config(), 5))
+
+    def test_config(self):
+        for config in [make_de_config(max_len=21), make_de_config(pop_size=3),
+            make_de_config(de_strategy='best2')]:
+            engine = differentialevolution.DifferentialEvolutionEngine()
+            self.assertRaises(mureilexception.ConfigException, engine.set_config, config)
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
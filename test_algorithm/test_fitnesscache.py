@@ -0,0 +1,80 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of fitnesscache
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_fitnesscache.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import numpy
+
+from tools import testutilities
+
+from algorithm import fitnesscache
+
+
+class TestFitnessCache(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_key(self):
+        cache = fitnesscache.FitnessCache(10)
+        self.assertEqual(cache.make_key([1, 2, 3]), 
+            cache.make_key(numpy.array([1, 2, 3])))
+        self.assertNotEqual(cache.make_key([1, 2, 3]), cache.make_key([1, 2, 4]))
+        
+    def test_lru(self):
+        cache = fitnesscache.FitnessCache(2)
+        key_a = cache.make_key([1])
+        key_b = cache.make_key([2])
+        key_c = cache.make_key([3])
+        cache.store(key_a, -1.0)
+        cache.store(key_b, -2.0)
+        # Use a, so b is now the least recently used
+        self.assertEqual(cache.lookup(key_a), -1.0)
+        cache.store(key_c, -3.0)
+        self.assertEqual(cache.lookup(key_b), None)
+        self.assertEqual(cache.lookup(key_a), -1.0)
+        self.assertEqual(cache.lookup(key_c), -3.0)
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(cache.misses, 1)
+        
+
+if __name__ == '__main__':
+    unittest.main()
+    
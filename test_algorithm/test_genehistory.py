@@ -0,0 +1,188 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of genehistory
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_genehistory.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+import pickle
+import unittest
+import numpy
+
+from tools import mureilexception, testutilities
+from algorithm import genehistory, geneticalgorithm
+from test_geneticalgorithm import make_config, run_engine
+
+
+def make_trajectory(count, gene_len, seed=1):
+    """Return a list of [values, score, iteration] where each gene
+    differs from the one before in a few values, as the best gene
+    of a GA run usually does.
+    """
+    rand = numpy.random.RandomState(seed)
+    values = rand.randint(0, 1000, gene_len)
+    data = []
+    for i in range(count):
+        changed = rand.randint(0, gene_len, 3)
+        values[changed] = rand.randint(0, 1000, 3)
+        data.append([values.tolist(), float(rand.normal()), i])
+    return data
+
+
+def fill(history, data):
+    for values, score, iteration in data:
+        history.append(values, score, iteration)
+    return history
+
+
+class TestBestGeneHistory(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_all(self):
+        data = make_trajectory(300, 20)
+        for delta_encode in [False, True]:
+            history = fill(genehistory.BestGeneHistory(20, 
+                delta_encode=delta_encode, keyframe_interval=16), data)
+            self.assertEqual(len(history), 300)
+            self.assertEqual(history.to_list(), data)
+            self.assertEqual(list(history), data)
+            for i in [0, 1, 15, 16, 17, 150, -1]:
+                self.assertEqual(history[i], data[i])
+            best = max(data, key=lambda entry: entry[1])
+            self.assertEqual(history.get_best(), best)
+
+    def test_to_list(self):
+        data = make_trajectory(50, 10)
+        history = fill(genehistory.BestGeneHistory(10, delta_encode=True), data)
+        loaded = pickle.loads(pickle.dumps(history, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(genehistory.to_list(loaded), data)
+        self.assertEqual(loaded, history)
+        self.assertEqual(genehistory.to_list(data), data)
+
+    def test_variable_length(self):
+        data = [[[1, 2, 3], 1.0, 0], [[1, 2], 2.0, 1], [[1, 2, 0, 4], 3.0, 2],
+            [[], 4.0, 3], [[5], 5.0, 4]]
+        for delta_encode in [False, True]:
+            history = fill(genehistory.BestGeneHistory(4, 
+                delta_encode=delta_encode, keyframe_interval=2), data)
+            self.assertEqual(history.to_list(), data)
+            self.assertRaises(mureilexception.AlgorithmException, 
+                history.append, [1] * 5, 6.0, 5)
+
+    def test_dtype(self):
+        data = [[[1, 2], 1.0, 0], [[1, 2 ** 40], 2.0, 1], [[-2 ** 40, 2], 3.0, 2]]
+        for delta_encode in [False, True]:
+            history = fill(genehistory.BestGeneHistory(2, delta_encode=delta_encode,
+                dtype=numpy.int16), data)
+            self.assertEqual(history.to_list(), data)
+
+    def test_improvements(self):
+        data = [[[i], score, i] for i, score in enumerate([-3, -1, -2, -1, 0, -5])]
+        for delta_encode in [False, True]:
+            history = fill(genehistory.BestGeneHistory(1, store_mode='improvements',
+                delta_encode=delta_encode), data)
+            self.assertEqual(history.to_list(), [data[0], data[1], data[4]])
+            self.assertEqual(history.get_best(), data[4])
+
+    def test_every(self):
+        data = make_trajectory(10, 5)
+        history = fill(genehistory.BestGeneHistory(5, store_mode='every', 
+            store_every=4), data)
+        self.assertEqual(history.to_list(), [data[0], data[4], data[8]])
+        # The best gene is kept even if it is not stored
+        best = max(data, key=lambda entry: entry[1])
+        self.assertEqual(history.get_best(), best)
+
+    def test_config(self):
+        self.assertRaises(mureilexception.ConfigException, 
+            genehistory.BestGeneHistory, 5, store_mode='some')
+        self.assertRaises(mureilexception.ConfigException, 
+            genehistory.BestGeneHistory, 5, store_mode='every', store_every=0)
+        engine = geneticalgorithm.Engine()
+        self.assertRaises(mureilexception.ConfigException, engine.set_config,
+            make_config(history_mode='some'))
+
+    def test_pickle(self):
+        data = make_trajectory(100, 250)
+        for delta_encode in [False, True]:
+            history = fill(genehistory.BestGeneHistory(250, 
+                delta_encode=delta_encode), data)
+            restored = pickle.loads(pickle.dumps(history, pickle.HIGHEST_PROTOCOL))
+            self.assertEqual(restored.to_list(), data)
+            # The restored history can still be added to
+            more = make_trajectory(5, 250, seed=2)
+            fill(restored, more)
+            self.assertEqual(restored.to_list(), data + more)
+
+    def test_size(self):
+        data = make_trajectory(1000, 250)
+        list_size = len(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+        sizes = []
+        for delta_encode in [False, True]:
+            history = fill(genehistory.BestGeneHistory(250, 
+                delta_encode=delta_encode, dtype=numpy.int16), data)
+            sizes.append(len(pickle.dumps(history, pickle.HIGHEST_PROTOCOL)))
+        print 'pickled size: list {:d}, arrays {:d}, delta {:d}'.format(
+            list_size, sizes[0], sizes[1])
+        self.assertTrue(sizes[0] < list_size)
+        self.assertTrue(sizes[1] < sizes[0] / 5)
+
+    def test_engine(self):
+        for array_pop in [False, True]:
+            best_gene, all_data = run_engine(make_config(array_pop=array_pop), 30)
+            all_data = genehistory.to_list(all_data)
+            for delta in [False, True]:
+                result = run_engine(make_config(array_pop=array_pop, 
+                    history_delta=delta), 30)
+                self.assertEqual(result, (best_gene, all_data))
+                
+                gene, data = run_engine(make_config(array_pop=array_pop, 
+                    history_mode='improvements', history_delta=delta), 30)
+                self.assertEqual(gene, best_gene)
+                self.assertEqual(data, [entry for i, entry in enumerate(all_data)
+                    if (i == 0) or (entry[1] > max([prev[1] for prev in all_data[:i]]))])
+
+                gene, data = run_engine(make_config(array_pop=array_pop, 
+                    history_mode='every', history_every=7, history_delta=delta), 30)
+                self.assertEqual(gene, best_gene)
+                self.assertEqual(data, all_data[::7])
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
@@ -0,0 +1,593 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of geneticalgorithm
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_geneticalgorithm.py
+   
+   To time the clone detection paths on a large population instead:
+   python test_geneticalgorithm.py benchmark
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import numpy
+import random
+import tempfile
+import shutil
+import time
+
+from tools import mureilexception, testutilities
+
+from algorithm import geneticalgorithm
+
+
+def quadratic_test(gene):
+    """Score a gene by its distance from a fixed target, so the
+    best possible score is 0.
+    """
+    target = numpy.arange(len(gene)) * 3
+    return -float(numpy.sum((numpy.array(gene) - target) ** 2))
+
+
+def quadratic_test_batch(gene_matrix):
+    """Score each row of gene_matrix as quadratic_test does, counting the calls.
+    """
+    batch_calls[0] += 1
+    target = numpy.arange(gene_matrix.shape[1]) * 3
+    return list(-numpy.sum((gene_matrix - target) ** 2, axis=1).astype(float))
+
+
+batch_calls = [0]
+
+
+def make_config(**kwargs):
+    config = {
+        'model': 'algorithm.geneticalgorithm.Engine',
+        'section': 'Algorithm',
+        'min_param_val': 0,
+        'max_param_val': 50,
+        'base_mute': 0.05,
+        'gene_mute': 0.0,
+        'pop_size': 30,
+        'mort': 0.5,
+        'nuke_power': 5,
+        'processes': 0,
+        'seed': 12345,
+        'min_len': 8,
+        'max_len': 8,
+        'gene_test_callback': quadratic_test
+    }
+    config.update(kwargs)
+    return config
+
+
+def run_engine(config, iterations, engine_class=geneticalgorithm.Engine):
+    engine = engine_class()
+    engine.set_config(config)
+    engine.prepare_run()
+    try:
+        for i in range(iterations):
+            engine.do_iteration()
+        best_gene, best_gene_data = engine.get_final(log_results=False)
+    finally:
+        engine.finalise()
+    return best_gene, best_gene_data
+
+
+class TestArrayPop(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_reproducible(self):
+        config = make_config(array_pop=True)
+        best_1, data_1 = run_engine(config, 40)
+        best_2, data_2 = run_engine(config, 40)
+        self.assertEqual(data_1, data_2)
+        self.assertEqual(best_1, best_2)
+
+    def test_contract(self):
+        best_gene, best_gene_data = run_engine(make_config(array_pop=True), 40)
+        self.assertEqual(len(best_gene_data), 40)
+        self.assertEqual(len(best_gene), 8)
+        self.assertTrue(all(isinstance(val, int) for val in best_gene))
+        for i in range(len(best_gene_data)):
+            values, score, iteration = best_gene_data[i]
+            self.assertEqual(iteration, i)
+            self.assertEqual(score, quadratic_test(values))
+        # The GA should improve on the first iteration's best gene
+        self.assertTrue(best_gene_data[-1][1] > best_gene_data[0][1])
+    
+    def test_start_values(self):
+        config = make_config(array_pop=True, start_values_min=[5] * 8,
+            start_values_max=[7] * 8)
+        engine = geneticalgorithm.Engine()
+        engine.set_config(config)
+        values = engine.get_population().get_values()
+        self.assertEqual(values.shape, (30, 8))
+        self.assertTrue(numpy.all(values >= 5) and numpy.all(values <= 7))
+
+    def test_variable_length(self):
+        engine = geneticalgorithm.Engine()
+        self.assertRaises(mureilexception.ConfigException,
+            engine.set_config, make_config(array_pop=True, max_len=9))
+    
+
+# The engine deep-copies its config, so the count is kept at module
+# level rather than on the test case.
+evaluations = [0]
+
+def counting_test(gene):
+    evaluations[0] += 1
+    return quadratic_test(gene)
+
+
+class TestMigration(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_top_and_replace(self):
+        for array_pop in [False, True]:
+            engine = geneticalgorithm.Engine()
+            engine.set_config(make_config(array_pop=array_pop, pop_size=10))
+            engine.prepare_run()
+            values = [list(gene) for gene in engine.population.get_values()]
+            scores = list(engine.population.get_scores())
+            order = sorted(range(10), key=lambda i: scores[i], reverse=True)
+            
+            self.assertEqual(engine.get_emigrants(3), [values[i] for i in order[:3]])
+
+            immigrants = [[50] * 8, [49] * 8]
+            engine.add_immigrants(immigrants)
+            new_values = [list(gene) for gene in engine.population.get_values()]
+            self.assertEqual([new_values[i] for i in order[-2:]], immigrants[::-1])
+            self.assertEqual(sorted(engine.population.get_dirty_indices()), 
+                sorted(order[-2:]))
+
+            # Unscored genes are not sent, and are replaced first
+            self.assertEqual(len(engine.get_emigrants(10)), 8)
+            engine.add_immigrants([[1] * 8])
+            new_values = [list(gene) for gene in engine.population.get_values()]
+            self.assertTrue([1] * 8 in [new_values[i] for i in order[-2:]])
+            engine.finalise()
+
+
+def run_resumed(config, iterations, resume_at, engine_class=geneticalgorithm.Engine):
+    """Run for resume_at iterations, writing a checkpoint at the end, then
+    continue to iterations with a new engine resumed from the checkpoint.
+    """
+    engine = engine_class()
+    engine.set_config(config)
+    engine.prepare_run()
+    try:
+        for i in range(resume_at):
+            engine.do_iteration()
+    finally:
+        engine.finalise()
+
+    engine = engine_class()
+    engine.set_config(config)
+    engine.prepare_run()
+    try:
+        start = engine.load_checkpoint()
+        for i in range(start, iterations):
+            engine.do_iteration()
+        best_gene, best_gene_data = engine.get_final(log_results=False)
+    finally:
+        engine.finalise()
+    return start, best_gene, best_gene_data
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+        self.temp_dir = tempfile.mkdtemp()
+        self.checkpoint_file = os.path.join(self.temp_dir, 'checkpoint.pkl')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        os.chdir(self.cwd)
+
+    def test_resume(self):
+        for array_pop in [False, True]:
+            straight = run_engine(make_config(array_pop=array_pop), 20)
+            config = make_config(array_pop=array_pop, checkpoint_file=self.checkpoint_file,
+                checkpoint_frequency=5)
+            start, best_gene, best_gene_data = run_resumed(config, 20, 10)
+            self.assertEqual(start, 10)
+            self.assertEqual(straight, (best_gene, best_gene_data))
+            self.assertEqual(os.listdir(self.temp_dir), ['checkpoint.pkl'])
+
+    def test_no_checkpoint(self):
+        engine = geneticalgorithm.Engine()
+        engine.set_config(make_config(checkpoint_file=self.checkpoint_file))
+        self.assertRaises(mureilexception.ConfigException, engine.load_checkpoint)
+
+    def test_mismatch(self):
+        engine = geneticalgorithm.Engine()
+        engine.set_config(make_config(checkpoint_file=self.checkpoint_file))
+        engine.save_checkpoint()
+        engine = geneticalgorithm.Engine()
+        engine.set_config(make_config(checkpoint_file=self.checkpoint_file, array_pop=True))
+        self.assertRaises(mureilexception.ConfigException, engine.load_checkpoint)
+
+
+def iterations_to_finish(config, max_iterations, engine_class=geneticalgorithm.Engine):
+    """Run until is_finished or max_iterations, and return the number of
+    iterations run.
+    """
+    engine = engine_class()
+    engine.set_config(config)
+    engine.prepare_run()
+    try:
+        for i in range(max_iterations):
+            engine.do_iteration()
+            if engine.is_finished():
+                break
+    finally:
+        engine.finalise()
+    return engine.iteration_count + 1
+
+
+class TestStopping(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_window(self):
+        for array_pop in [False, True]:
+            self.assertEqual(iterations_to_finish(make_config(array_pop=array_pop), 30), 30)
+            # Any improvement is within a huge tolerance
+            self.assertEqual(iterations_to_finish(make_config(array_pop=array_pop,
+                stop_window=5, stop_tolerance=1e9), 30), 6)
+
+    def test_window_history(self):
+        engine = geneticalgorithm.Engine()
+        engine.set_config(make_config(stop_window=3))
+        for score in [-10, -5, -7, -6, -5, -5]:
+            engine.iteration_count += 1
+            engine.record_best([1] * 8, score)
+        self.assertEqual(engine.get_best_so_far(), [-5, -5, -5, -5])
+        self.assertTrue(engine.is_finished())
+        engine.iteration_count += 1
+        engine.record_best([1] * 8, -4)
+        self.assertFalse(engine.is_finished())
+
+    def test_diversity(self):
+        for array_pop in [False, True]:
+            engine = geneticalgorithm.Engine()
+            engine.set_config(make_config(array_pop=array_pop))
+            diversity = engine.get_diversity()
+            self.assertTrue(0 < diversity < 1)
+            self.assertEqual(iterations_to_finish(make_config(array_pop=array_pop,
+                stop_diversity=diversity * 2), 30), 1)
+
+    def test_time(self):
+        self.assertEqual(iterations_to_finish(make_config(max_run_secs=1e-6), 30), 1)
+
+
+def legacy_find_clone(values_list, threshold):
+    """The list-scan clone detection that Pop.find_clone replaced, kept
+    as a reference for its results and speed.
+    """
+    field = []
+    for base in values_list[0]:
+        field.append([])
+    for values in values_list:
+        i = 0
+        for base in values:
+            if len(field[i]) == 0:
+                field[i].append([base,1])
+            else:
+                add = True
+                for tup in field[i]:
+                    if tup[0] == base:
+                        tup[1] += 1
+                        add = False
+                if add == True:
+                    field[i].append([base,1])
+            i += 1
+    matches = 0
+    final = []
+    for val_list in field:
+        for total in val_list:
+            if total[1] >= threshold:
+                matches += 1
+                final.append(total[0])
+    if matches == len(field):
+        return True, final
+    else:
+        return False, []
+
+
+def make_near_clones(rand, pop_size, gene_len, changed):
+    """Return a (pop_size, gene_len) array of copies of one gene, with
+    the proportion changed of the values replaced at random.
+    """
+    values = numpy.tile(rand.randint(0, 50, gene_len), (pop_size, 1))
+    mask = rand.random_sample(values.shape) < changed
+    values[mask] = rand.randint(0, 50, mask.sum())
+    return values
+
+
+def make_large_clones():
+    """Return the values array, the values list and a Pop for a population
+    of 500 near-clones of gene length 1000.
+    """
+    values = make_near_clones(numpy.random.RandomState(4), 500, 1000, 0.02)
+    values_list = values.tolist()
+    return values, values_list, make_pop(values_list, min_len=1000, max_len=1000)
+
+
+def benchmark_find_clone():
+    """Print the time each clone detection path takes on a large population.
+    """
+    values, values_list, pop = make_large_clones()
+
+    start = time.time()
+    legacy_find_clone(values_list, 450)
+    legacy_secs = time.time() - start
+    
+    start = time.time()
+    pop.find_clone(450)
+    pop_secs = time.time() - start
+
+    start = time.time()
+    geneticalgorithm.find_clone_columns(values, 450)
+    array_secs = time.time() - start
+
+    print 'find_clone, pop 500, gene length 1000: legacy %.4f s, Pop %.4f s, array %.4f s' % (
+        legacy_secs, pop_secs, array_secs)
+
+
+def make_pop(values_list, **kwargs):
+    """Return a Pop, configured as by make_config, holding values_list.
+    """
+    engine = geneticalgorithm.Engine()
+    engine.set_config(make_config(pop_size=len(values_list), **kwargs))
+    for gene, gene_values in zip(engine.population.genes, values_list):
+        gene.values = gene_values
+    return engine.population
+
+
+class TestFindClone(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def check_pops(self, values, threshold):
+        """Check both population types against the legacy scan.
+        """
+        values_list = values.tolist()
+        exp = legacy_find_clone(values_list, threshold)
+
+        pop = make_pop(values_list)
+        self.assertEqual(pop.find_clone(threshold), exp)
+        self.assertEqual(geneticalgorithm.find_clone_columns(values, threshold), exp)
+        return exp[0]
+
+    def test_same_as_legacy(self):
+        rand = numpy.random.RandomState(3)
+        found = []
+        for changed in [0.0, 0.01, 0.05, 0.1, 0.3]:
+            for pop_size in [10, 31]:
+                values = make_near_clones(rand, pop_size, 20, changed)
+                found.append(self.check_pops(values, pop_size * 0.9))
+        self.assertTrue(True in found)
+        self.assertTrue(False in found)
+
+    def test_variable_length(self):
+        values_list = [[4, 5, 6]] * 8 + [[4, 5], [4, 5, 6]]
+        pop = make_pop(values_list, min_len=2, max_len=3)
+        self.assertEqual(pop.find_clone(9), legacy_find_clone(values_list, 9))
+        self.assertEqual(pop.find_clone(9), (True, [4, 5, 6]))
+        pop.genes[1].values = [4, 5]
+        pop.genes[2].values = [4]
+        self.assertEqual(pop.find_clone(9), legacy_find_clone(
+            [gene.values for gene in pop.genes], 9))
+
+    def test_large_population(self):
+        # The population used by benchmark_find_clone
+        values, values_list, pop = make_large_clones()
+        exp = legacy_find_clone(values_list, 450)
+        self.assertEqual(pop.find_clone(450), exp)
+        self.assertEqual(geneticalgorithm.find_clone_columns(values, 450), exp)
+
+
+class TestPopScore(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_skip_unchanged(self):
+        for array_pop in [False, True]:
+            evaluations[0] = 0
+            engine = geneticalgorithm.Engine()
+            engine.set_config(make_config(array_pop=array_pop,
+                gene_test_callback=counting_test))
+            engine.prepare_run()
+            self.assertEqual(evaluations[0], 30)
+            engine.pop_score()
+            self.assertEqual(evaluations[0], 30)
+            engine.do_iteration()
+            self.assertTrue(evaluations[0] < 60)
+
+    def test_same_results(self):
+        for array_pop in [False, True]:
+            data = []
+            for rescore in [False, True]:
+                best_gene, best_gene_data = run_engine(make_config(
+                    array_pop=array_pop, rescore_unchanged=rescore), 20)
+                data.append(best_gene_data)
+            self.assertEqual(data[0], data[1])
+
+    def test_cache(self):
+        for array_pop in [False, True]:
+            data = []
+            for cache_size in [0, 100]:
+                evaluations[0] = 0
+                best_gene, best_gene_data = run_engine(make_config(
+                    array_pop=array_pop, cache_size=cache_size,
+                    gene_test_callback=counting_test), 20)
+                data.append((best_gene_data, evaluations[0]))
+            self.assertEqual(data[0][0], data[1][0])
+            self.assertTrue(data[1][1] < data[0][1])
+
+    def test_cache_penalised(self):
+        # A gene penalised for timing out once is scored again next time,
+        # not given the cached -inf
+        hang_marker[0] = os.path.join(tempfile.mkdtemp(), 'hung')
+        gene = [99] * 8
+        engine = geneticalgorithm.Engine()
+        engine.set_config(make_config(processes=2, cache_size=100, 
+            worker_timeout=0.5, timeout_policy='penalise', 
+            gene_test_callback=hang_once_test))
+        engine.prepare_run()
+        try:
+            self.assertEqual(engine.evaluate([gene]), [float('-inf')])
+            self.assertEqual(engine.evaluate([gene]), [quadratic_test(gene)])
+            hits = engine.cache.hits
+            self.assertEqual(engine.evaluate([gene]), [quadratic_test(gene)])
+            self.assertEqual(engine.cache.hits, hits + 1)
+        finally:
+            engine.finalise()
+            os.remove(hang_marker[0])
+            os.rmdir(os.path.dirname(hang_marker[0]))
+
+    def test_batch(self):
+        for array_pop in [False, True]:
+            for processes in [0, 2]:
+                data = []
+                for batch in ['', quadratic_test_batch]:
+                    batch_calls[0] = 0
+                    best_gene, best_gene_data = run_engine(make_config(
+                        array_pop=array_pop, processes=processes,
+                        gene_test_batch_callback=batch), 10)
+                    data.append(best_gene_data)
+                self.assertEqual(data[0], data[1])
+                if processes == 0:
+                    self.assertTrue(batch_calls[0] > 0)
+
+    def test_processes(self):
+        for array_pop in [False, True]:
+            data = []
+            for processes in [0, 2]:
+                best_gene, best_gene_data = run_engine(make_config(
+                    array_pop=array_pop, processes=processes), 10)
+                data.append(best_gene_data)
+            self.assertEqual(data[0], data[1])
+
+    def test_seed_evaluations(self):
+        # A gene test that draws random numbers gives the same results
+        # whatever the number of processes
+        data = []
+        for processes in [0, 1, 3]:
+            data.append(run_engine(make_config(processes=processes, seed_evaluations=True,
+                gene_test_callback=noisy_test, cache_size=100), 10))
+        self.assertEqual(data[0], data[1])
+        self.assertEqual(data[0], data[2])
+    
+
+class TestTiming(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_phases(self):
+        for processes in [0, 2]:
+            engine = geneticalgorithm.Engine()
+            engine.set_config(make_config(processes=processes, timing_summary=True))
+            engine.prepare_run()
+            try:
+                for i in range(5):
+                    engine.do_iteration()
+                timing = engine.get_timing_string()
+                pool_busy = None
+                if processes > 0:
+                    pool_busy = sum(engine.pool.busy_secs)
+                    self.assertEqual(len(engine.pool.busy_secs), 2)
+                    self.assertTrue(engine.pool.chunks_done > 0)
+                engine.get_final()
+            finally:
+                engine.finalise()
+            for phase in ['mutate', 'score', 'record', 'lemming', 'breed', 
+                'decloner', 'checkpoint']:
+                self.assertEqual(engine.timer.get_calls(phase), 5)
+                self.assertTrue(phase + ' ' in timing)
+            self.assertTrue(engine.timer.get_calls('gene_test') >= 6)
+            self.assertTrue(engine.timer.get_secs('gene_test') <= 
+                engine.timer.get_elapsed())
+            if processes > 0:
+                self.assertTrue('; pool master' in timing)
+                self.assertTrue('1: busy' in timing)
+                self.assertTrue(pool_busy > 0)
+            else:
+                self.assertFalse('pool' in timing)
+    
+    
+def noisy_test(gene):
+    return quadratic_test(gene) + random.random() + numpy.random.random_sample()
+
+
+def hang_once_test(gene):
+    # Hang the first time a gene of 99s is seen, using a marker file
+    # shared by the workers
+    if gene[0] == 99 and not os.path.exists(hang_marker[0]):
+        open(hang_marker[0], 'w').close()
+        time.sleep(5)
+    return quadratic_test(gene)
+
+
+hang_marker = [None]
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['benchmark']:
+        benchmark_find_clone()
+    else:
+        unittest.main()
+    
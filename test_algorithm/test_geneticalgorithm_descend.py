@@ -0,0 +1,116 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of geneticalgorithm_descend
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_geneticalgorithm_descend.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import random
+
+from tools import testutilities
+
+from algorithm import geneticalgorithm_descend
+
+from test_geneticalgorithm import make_config, run_engine, quadratic_test
+
+
+def make_descend_config(**kwargs):
+    config = make_config(model='algorithm.geneticalgorithm_descend.Engine',
+        descend_mute=0.2, descend_iterations=10)
+    config.update(kwargs)
+    return config
+
+
+class CountingEvaluate(object):
+    """Score genes with quadratic_test, recording the size of each call.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, values_list):
+        self.calls.append(len(values_list))
+        return [quadratic_test(values) for values in values_list]
+
+
+class TestDescend(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def make_pop(self, **kwargs):
+        engine = geneticalgorithm_descend.Engine()
+        engine.set_config(make_descend_config(**kwargs))
+        return engine.population
+
+    def test_descend(self):
+        pop = self.make_pop(descend_mute=1.0)
+        before = [quadratic_test(gene.values) for gene in pop.genes]
+        evaluate = CountingEvaluate()
+        used = pop.descend(evaluate)
+        # The whole population is scored in each round, within the budget
+        self.assertEqual(len(evaluate.calls), 5)
+        self.assertEqual(used, sum(evaluate.calls))
+        self.assertTrue(used <= 10 * 30)
+        for gene, score in zip(pop.genes, before):
+            self.assertEqual(gene.score, quadratic_test(gene.values))
+            self.assertTrue(gene.score >= score)
+            self.assertTrue(all(0 <= val <= 50 for val in gene.values))
+        self.assertTrue(sum([gene.score for gene in pop.genes]) > sum(before))
+
+    def test_budget(self):
+        pop = self.make_pop(descend_mute=1.0, descend_budget=100)
+        evaluate = CountingEvaluate()
+        self.assertEqual(pop.descend(evaluate), 90)
+        self.assertEqual(evaluate.calls, [30, 60])
+        pop = self.make_pop(descend_mute=1.0, descend_budget=20)
+        self.assertEqual(pop.descend(CountingEvaluate()), 0)
+
+    def test_processes(self):
+        # The descent probes are scored in the worker pool, with the same results
+        data = []
+        for processes in [0, 2]:
+            data.append(run_engine(make_descend_config(processes=processes), 8,
+                geneticalgorithm_descend.Engine))
+        self.assertEqual(data[0], data[1])
+        best_gene, best_gene_data = data[0]
+        self.assertTrue(best_gene_data[-1][1] > best_gene_data[0][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
@@ -0,0 +1,163 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of islandengine
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_islandengine.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import tempfile
+import shutil
+
+from tools import mureilexception, testutilities
+
+from algorithm import islandengine
+
+from test_geneticalgorithm import make_config, run_engine, run_resumed, quadratic_test
+from test_geneticalgorithm import iterations_to_finish
+
+
+def make_island_config(**kwargs):
+    config = make_config(model='algorithm.islandengine.IslandEngine', pop_size=20,
+        islands=3, migration_interval=3, migration_size=2)
+    config.update(kwargs)
+    return config
+
+
+class TestIslandEngine(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_run(self):
+        for array_pop in [False, True]:
+            best_gene, best_gene_data = run_engine(make_island_config(
+                array_pop=array_pop), 12, islandengine.IslandEngine)
+            self.assertEqual(len(best_gene_data), 12)
+            self.assertEqual([data[2] for data in best_gene_data], range(12))
+            for data in best_gene_data:
+                self.assertEqual(data[1], quadratic_test(data[0]))
+            self.assertTrue(max([data[1] for data in best_gene_data]) <= 
+                quadratic_test(best_gene))
+
+    def test_seeds(self):
+        engine = islandengine.IslandEngine()
+        engine.set_config(make_island_config(islands=4))
+        self.assertEqual(len(set(engine.seeds)), 4)
+        values = [engine.island_engines[i].population.get_values() for i in range(4)]
+        self.assertNotEqual(values[0], values[1])
+
+    def test_reproducible(self):
+        data = []
+        for i in range(2):
+            best_gene, best_gene_data = run_engine(make_island_config(), 10, 
+                islandengine.IslandEngine)
+            data.append(best_gene_data)
+        self.assertEqual(data[0], data[1])
+
+    def test_local(self):
+        # Islands run in this process, as on Windows, give the same results
+        best_gene, process_data = run_engine(make_island_config(), 10, 
+            islandengine.IslandEngine)
+        process_island = islandengine.ProcessIsland
+        islandengine.ProcessIsland = islandengine.LocalIsland
+        try:
+            best_gene, local_data = run_engine(make_island_config(), 10, 
+                islandengine.IslandEngine)
+        finally:
+            islandengine.ProcessIsland = process_island
+        self.assertEqual(process_data, local_data)
+
+    def test_resume(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            straight = run_engine(make_island_config(), 12, islandengine.IslandEngine)
+            config = make_island_config(checkpoint_file=os.path.join(temp_dir, 'islands.pkl'),
+                checkpoint_frequency=4)
+            start, best_gene, best_gene_data = run_resumed(config, 12, 8, 
+                islandengine.IslandEngine)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(start, 8)
+        self.assertEqual(straight, (best_gene, best_gene_data))
+
+    def test_stopping(self):
+        self.assertEqual(iterations_to_finish(make_island_config(stop_diversity=1.0), 
+            30, islandengine.IslandEngine), 1)
+        self.assertEqual(iterations_to_finish(make_island_config(stop_window=4,
+            stop_tolerance=1e9), 30, islandengine.IslandEngine), 5)
+
+    def test_processes(self):
+        # processes is not passed on to the islands, which run as daemons
+        # and cannot start worker pools of their own
+        engine = islandengine.IslandEngine()
+        engine.set_config(make_island_config(processes=2))
+        for island_engine in engine.island_engines:
+            self.assertEqual(island_engine.config['processes'], 0)
+        self.assertEqual(run_engine(make_island_config(processes=2, islands=2), 6,
+            islandengine.IslandEngine), run_engine(make_island_config(islands=2), 6,
+            islandengine.IslandEngine))
+
+    def test_timing(self):
+        engine = islandengine.IslandEngine()
+        engine.set_config(make_island_config(timing_summary=True))
+        engine.prepare_run()
+        try:
+            for i in range(6):
+                engine.do_iteration()
+            timing = engine.get_timing_string()
+            engine.get_final()
+        finally:
+            engine.finalise()
+        for phase in ['iterate', 'record', 'checkpoint']:
+            self.assertEqual(engine.timer.get_calls(phase), 6)
+        self.assertEqual(engine.timer.get_calls('migrate'), 2)
+        own, islands = timing.split('; islands ')
+        self.assertTrue('migrate ' in own)
+        # The islands' phases are merged, with a call for each island
+        self.assertTrue('mutate ' in islands)
+        self.assertTrue('/18 calls' in islands)
+
+    def test_config(self):
+        engine = islandengine.IslandEngine()
+        self.assertRaises(mureilexception.ConfigException, engine.set_config,
+            make_island_config(migration_size=20))
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
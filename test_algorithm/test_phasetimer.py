@@ -0,0 +1,97 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of phasetimer
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_phasetimer.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import time
+
+from tools import testutilities
+
+from algorithm import phasetimer
+
+
+class TestPhaseTimer(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_add(self):
+        timer = phasetimer.PhaseTimer()
+        start = time.time()
+        for i in range(3):
+            time.sleep(0.01)
+            start = timer.add('sleep', start)
+            start = timer.add('none', start)
+        self.assertEqual(timer.get_calls('sleep'), 3)
+        self.assertEqual(timer.get_calls('none'), 3)
+        self.assertEqual(timer.get_calls('other'), 0)
+        self.assertTrue(timer.get_secs('sleep') >= 0.03)
+        self.assertTrue(timer.get_secs('none') < timer.get_secs('sleep'))
+        self.assertEqual(timer.get_secs('other'), 0)
+        self.assertTrue(timer.get_elapsed() >= timer.get_secs('sleep'))
+
+    def test_string(self):
+        timer = phasetimer.PhaseTimer()
+        start = time.time()
+        start = timer.add('second', timer.add('first', start))
+        string = timer.get_string()
+        self.assertTrue(string.index('first 0.') < string.index('second 0.'))
+        self.assertTrue('1 calls' in string)
+
+    def test_merge(self):
+        timers = [phasetimer.PhaseTimer() for i in range(2)]
+        for timer in timers:
+            start = time.time()
+            time.sleep(0.01)
+            timer.add('sleep', start)
+        timers[1].add('other', time.time())
+        merged = phasetimer.PhaseTimer()
+        for timer in timers:
+            merged.merge(timer.get_totals())
+        self.assertEqual(merged.get_calls('sleep'), 2)
+        self.assertEqual(merged.get_calls('other'), 1)
+        self.assertEqual(merged.get_secs('sleep'), 
+            timers[0].get_secs('sleep') + timers[1].get_secs('sleep'))
+        self.assertTrue(merged.get_elapsed() >= merged.get_secs('sleep'))
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
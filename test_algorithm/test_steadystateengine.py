@@ -0,0 +1,156 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of steadystateengine
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_steadystateengine.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import tempfile
+import shutil
+import time
+
+from tools import testutilities
+
+from algorithm import steadystateengine
+
+from test_geneticalgorithm import make_config, run_engine, run_resumed, quadratic_test
+
+
+def uneven_test(gene):
+    """Score as quadratic_test, taking up to 10 times as long for some genes
+    as for others.
+    """
+    time.sleep(0.0005 * (1 + gene[0] % 10))
+    return quadratic_test(gene)
+
+
+def make_steady_config(**kwargs):
+    config = make_config(model='algorithm.steadystateengine.SteadyStateEngine')
+    config.update(kwargs)
+    return config
+
+
+class TestSteadyStateEngine(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_run(self):
+        for array_pop in [False, True]:
+            for processes in [0, 2]:
+                best_gene, best_gene_data = run_engine(make_steady_config(
+                    array_pop=array_pop, processes=processes), 15,
+                    steadystateengine.SteadyStateEngine)
+                self.assertEqual([data[2] for data in best_gene_data], range(15))
+                for data in best_gene_data:
+                    self.assertEqual(data[1], quadratic_test(data[0]))
+                # The best gene is never replaced, so the best score never falls
+                scores = [data[1] for data in best_gene_data]
+                self.assertEqual(scores, sorted(scores))
+                self.assertTrue(scores[-1] > scores[0])
+                self.assertEqual(quadratic_test(best_gene), scores[-1])
+
+    def test_counts(self):
+        engine = steadystateengine.SteadyStateEngine()
+        engine.set_config(make_steady_config(processes=2, cache_size=1000))
+        engine.prepare_run()
+        try:
+            for i in range(5):
+                engine.do_iteration()
+            engine.get_final(log_results=False)
+        finally:
+            engine.finalise()
+        self.assertEqual(len(engine.in_flight), 0)
+        self.assertTrue(engine.children_done >= 5 * 30)
+        self.assertTrue(0 < engine.children_inserted < engine.children_done)
+        # The initial population and every child not found in the cache
+        self.assertTrue(30 < engine.evaluations <= 30 + engine.children_done)
+        self.assertTrue(engine.get_throughput() > 0)
+
+    def test_reproducible(self):
+        # Without multiprocessing, runs are reproducible from the seed
+        for array_pop in [False, True]:
+            data = []
+            for i in range(2):
+                data.append(run_engine(make_steady_config(array_pop=array_pop), 10,
+                    steadystateengine.SteadyStateEngine))
+            self.assertEqual(data[0], data[1])
+
+    def test_no_mort(self):
+        # mort is not used, so need not be set
+        config = make_steady_config()
+        del config['mort']
+        self.assertEqual(run_engine(config, 5, steadystateengine.SteadyStateEngine),
+            run_engine(make_steady_config(), 5, steadystateengine.SteadyStateEngine))
+
+    def test_resume(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            for array_pop in [False, True]:
+                straight = run_engine(make_steady_config(array_pop=array_pop), 12,
+                    steadystateengine.SteadyStateEngine)
+                config = make_steady_config(array_pop=array_pop,
+                    checkpoint_file=os.path.join(temp_dir, 'steady.pkl'),
+                    checkpoint_frequency=4)
+                start, best_gene, best_gene_data = run_resumed(config, 12, 8, 
+                    steadystateengine.SteadyStateEngine)
+                self.assertEqual(start, 8)
+                self.assertEqual(straight, (best_gene, best_gene_data))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_uneven(self):
+        # Workers are kept busy where gene scoring times vary. With 3 workers,
+        # the rate is at most about 3 / 0.00275 = 1090 evaluations/second.
+        engine = steadystateengine.SteadyStateEngine()
+        engine.set_config(make_steady_config(processes=3, 
+            gene_test_callback=uneven_test, chunk_target_secs=0.001))
+        engine.prepare_run()
+        try:
+            for i in range(10):
+                engine.do_iteration()
+            engine.get_final(log_results=False)
+        finally:
+            engine.finalise()
+        print 'evaluations/second: {:.0f}'.format(engine.get_throughput())
+        self.assertTrue(engine.get_throughput() > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
@@ -0,0 +1,215 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of surrogate
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_surrogate.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import numpy
+import tempfile
+import shutil
+
+from tools import mureilexception, testutilities
+
+from algorithm import geneticalgorithm, surrogate
+
+from test_geneticalgorithm import make_config, run_engine, run_resumed, quadratic_test
+
+
+def counting_quadratic_test(gene):
+    calls[0] += 1
+    return quadratic_test(gene)
+
+
+calls = [0]
+
+
+def logging_quadratic_test(gene):
+    events.append(('scored', tuple(gene)))
+    return quadratic_test(gene)
+
+
+events = []
+
+
+class TestRidgeSurrogate(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+        self.rand = numpy.random.RandomState(3)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_quadratic(self):
+        # A quadratic score is fitted closely, in both the primal and dual forms
+        for samples in [100, 10]:
+            model = surrogate.RidgeSurrogate(8, alpha=1e-6)
+            values = self.rand.randint(0, 50, (samples, 8))
+            model.add(values, [quadratic_test(row) for row in values])
+            self.assertEqual(model.get_count(), samples)
+            test_values = self.rand.randint(0, 50, (20, 8))
+            exp = numpy.array([quadratic_test(row) for row in test_values])
+            predicted = model.predict(test_values)
+            if samples > 16:
+                self.assertTrue(numpy.allclose(predicted, exp, rtol=1e-4))
+            else:
+                correlation = numpy.corrcoef(predicted, exp)[0, 1]
+                self.assertTrue(correlation > 0.5)
+
+    def test_history(self):
+        model = surrogate.RidgeSurrogate(2, history_size=5)
+        model.add([[1, 1], [2, 2]], [1.0, float('-inf')])
+        self.assertEqual(model.get_count(), 1)
+        model.add([[i, i] for i in range(10)], range(10))
+        self.assertEqual(model.get_count(), 5)
+        self.assertEqual(sorted(model.scores.tolist()), [5, 6, 7, 8, 9])
+
+
+class TestScreening(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def run_counted(self, config, iterations):
+        calls[0] = 0
+        result = run_engine(config, iterations)
+        return calls[0], result
+
+    def test_saves_evaluations(self):
+        for array_pop in [False, True]:
+            plain_calls, plain = self.run_counted(make_config(array_pop=array_pop,
+                gene_test_callback=counting_quadratic_test), 60)
+            engine = geneticalgorithm.Engine()
+            engine.set_config(make_config(array_pop=array_pop, 
+                gene_test_callback=counting_quadratic_test, surrogate_fraction=0.3))
+            calls[0] = 0
+            engine.prepare_run()
+            try:
+                for i in range(60):
+                    engine.do_iteration()
+                best_gene, best_gene_data = engine.get_final(log_results=False)
+            finally:
+                engine.finalise()
+            self.assertTrue(calls[0] < 0.7 * plain_calls)
+            stats = engine.surrogate_stats
+            self.assertTrue(stats['estimated'] > 0)
+            self.assertEqual(stats['screened'], stats['scored'] + stats['estimated'])
+            # Every recorded best gene has its true score
+            for values, score, iteration in best_gene_data:
+                self.assertEqual(score, quadratic_test(values))
+            self.assertTrue(quadratic_test(best_gene) >= best_gene_data[-1][1])
+            # and is not much worse than without the surrogate
+            self.assertTrue(best_gene_data[-1][1] >= plain[1][-1][1] * 2)
+
+    def test_evaluations_saved(self):
+        # Only genes given a predicted score, and never sent to gene_test
+        # while they wait for a score, are counted as saved. A gene culled 
+        # and later bred again is a new gene, as it would be scored again 
+        # without the surrogate.
+        for array_pop in [False, True]:
+            engine = geneticalgorithm.Engine()
+            engine.set_config(make_config(array_pop=array_pop, 
+                gene_test_callback=logging_quadratic_test, surrogate_fraction=0.3))
+            del events[:]
+            engine.prepare_run()
+            population = engine.population
+            set_estimates = population.set_estimates
+            get_dirty_indices = population.get_dirty_indices
+            def log_estimates(scores, indices):
+                values = population.get_values()
+                events.extend([('estimated', tuple(values[i])) for i in indices])
+                set_estimates(scores, indices)
+            def log_waiting():
+                indices = get_dirty_indices()
+                values = population.get_values()
+                events.append(('waiting', set([tuple(values[i]) for i in indices])))
+                return indices
+            population.set_estimates = log_estimates
+            population.get_dirty_indices = log_waiting
+            try:
+                for i in range(60):
+                    engine.do_iteration()
+            finally:
+                engine.finalise()
+            saved = set()
+            saved_count = 0
+            for event, values in events:
+                if event == 'waiting':
+                    saved &= values
+                elif event == 'scored' and values in saved:
+                    saved.remove(values)
+                    saved_count -= 1
+                elif event == 'estimated' and values not in saved:
+                    saved.add(values)
+                    saved_count += 1
+            stats = engine.surrogate_stats
+            self.assertEqual(stats['saved'], saved_count)
+            self.assertTrue(0 < stats['saved'] < stats['estimated'])
+            self.assertTrue(('{:d} evaluations saved'.format(stats['saved'])) in
+                engine.get_surrogate_string())
+
+    def test_refresh(self):
+        # With a refresh every iteration, the surrogate is never used
+        for array_pop in [False, True]:
+            plain = run_engine(make_config(array_pop=array_pop), 20)
+            refreshed = run_engine(make_config(array_pop=array_pop, 
+                surrogate_fraction=0.3, surrogate_refresh=1), 20)
+            self.assertEqual(plain, refreshed)
+
+    def test_resume(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            straight = run_engine(make_config(surrogate_fraction=0.3), 20)
+            config = make_config(surrogate_fraction=0.3, 
+                checkpoint_file=os.path.join(temp_dir, 'surrogate.pkl'),
+                checkpoint_frequency=5)
+            start, best_gene, best_gene_data = run_resumed(config, 20, 10)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(straight, (best_gene, best_gene_data))
+
+    def test_config(self):
+        for config in [make_config(surrogate_fraction=1.0),
+            make_config(surrogate_fraction=0.5, min_len=4)]:
+            engine = geneticalgorithm.Engine()
+            self.assertRaises(mureilexception.ConfigException, engine.set_config, config)
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
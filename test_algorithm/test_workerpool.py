@@ -0,0 +1,252 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of workerpool
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_workerpool.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import time
+import tempfile
+import random
+import numpy
+
+from tools import testutilities, mureilexception
+
+from algorithm import workerpool
+
+
+def sum_test(gene):
+    return sum(gene)
+
+
+def crash_test(gene):
+    # Kill the worker the first time gene [13] is seen, using a marker
+    # file so the restarted worker scores it normally.
+    if gene[0] == 13 and not os.path.exists(crash_marker[0]):
+        open(crash_marker[0], 'w').close()
+        os._exit(1)
+    return sum(gene)
+
+
+def slow_test(gene):
+    if gene[0] == 7:
+        time.sleep(5)
+    return sum(gene)
+
+
+def hang_test(gene):
+    if gene[0] == 7:
+        time.sleep(30)
+    time.sleep(0.1)
+    return sum(gene)
+
+
+def large_result_test(gene):
+    # A result much larger than the pipe buffer, which the worker sends
+    # only as fast as the pool reads it
+    time.sleep(0.1)
+    return 'x' * 1000000 + str(sum(gene))
+
+
+def random_test(gene):
+    return sum(gene) + random.random() + numpy.random.random_sample()
+
+
+def error_test(gene):
+    if gene[0] == 3:
+        raise ValueError('bad gene')
+    return sum(gene)
+
+
+crash_marker = [None]
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+        self.genes = [[i, 2 * i, 1] for i in range(40)]
+        self.exp = [sum(gene) for gene in self.genes]
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_score(self):
+        pool = workerpool.WorkerPool(sum_test, 3)
+        try:
+            # The first call is sent a gene at a time, later calls in chunks
+            self.assertListEqual(pool.score(self.genes), self.exp)
+            self.assertListEqual(pool.score(self.genes), self.exp)
+            self.assertTrue(pool.get_chunk_size(len(self.genes)) > 1)
+        finally:
+            pool.close()
+
+    def test_submit(self):
+        pool = workerpool.WorkerPool(sum_test, 3)
+        try:
+            keys = ['gene' + str(i) for i in range(len(self.genes))]
+            pool.submit(keys[:10], self.genes[:10], 3)
+            self.assertRaises(mureilexception.AlgorithmException, 
+                pool.score, self.genes)
+            pool.submit(keys[10:], self.genes[10:])
+            scores = {}
+            while len(scores) < len(self.genes):
+                scores.update(pool.poll())
+            self.assertEqual(pool.get_idle_count(), 3)
+            self.assertEqual(scores, dict(zip(keys, self.exp)))
+            self.assertListEqual(pool.score(self.genes), self.exp)
+        finally:
+            pool.close()
+
+    def test_worker_seeds(self):
+        # Workers forked from one process do not repeat each other's draws
+        pool = workerpool.WorkerPool(random_test, 3, seed=1)
+        try:
+            scores = pool.score([[0]] * 30)
+        finally:
+            pool.close()
+        self.assertEqual(len(set(scores)), 30)
+
+    def test_seed_evaluations(self):
+        # The random draws for each gene depend only on the seed and the gene
+        exp = workerpool.score_genes(random_test, None, self.genes, 1)
+        state = random.getstate()
+        self.assertListEqual(workerpool.score_genes(random_test, None, self.genes, 1), exp)
+        self.assertEqual(random.getstate(), state)
+        self.assertNotEqual(workerpool.score_genes(random_test, None, self.genes, 2), exp)
+        for processes in [1, 3]:
+            pool = workerpool.WorkerPool(random_test, processes, seed=1,
+                seed_evaluations=True, chunk_target_secs=1e-6)
+            try:
+                self.assertListEqual(pool.score(self.genes), exp)
+                self.assertListEqual(pool.score(self.genes[::-1]), exp[::-1])
+            finally:
+                pool.close()
+
+    def test_timing(self):
+        pool = workerpool.WorkerPool(sum_test, 2)
+        try:
+            pool.score(self.genes)
+            pool.score(self.genes)
+        finally:
+            pool.close()
+        self.assertEqual(len(pool.busy_secs), 2)
+        self.assertTrue(sum(pool.busy_secs) > 0)
+        self.assertTrue(pool.chunks_done >= 2)
+        self.assertTrue(pool.transfer_secs >= 0)
+        self.assertTrue(pool.timer.get_calls('dispatch') >= pool.timer.get_calls('collect'))
+        self.assertEqual(pool.timer.get_calls('collect'), pool.chunks_done)
+        timing = pool.get_timing_string()
+        self.assertTrue('0: busy' in timing and '1: busy' in timing)
+
+    def test_crash(self):
+        crash_marker[0] = os.path.join(tempfile.mkdtemp(), 'crashed')
+        pool = workerpool.WorkerPool(crash_test, 2)
+        try:
+            self.assertListEqual(pool.score(self.genes), self.exp)
+            self.assertTrue(os.path.exists(crash_marker[0]))
+        finally:
+            pool.close()
+            os.remove(crash_marker[0])
+            os.rmdir(os.path.dirname(crash_marker[0]))
+
+    def test_penalise(self):
+        pool = workerpool.WorkerPool(slow_test, 2, timeout=0.5, 
+            timeout_policy='penalise')
+        try:
+            scores = pool.score(self.genes)
+        finally:
+            pool.close()
+        self.exp[7] = float('-inf')
+        self.assertListEqual(scores, self.exp)
+
+    def test_hang_while_busy(self):
+        # The hung worker is found while the other keeps returning results,
+        # not only once they have all arrived
+        pool = workerpool.WorkerPool(hang_test, 2, timeout=0.5, 
+            timeout_policy='penalise')
+        try:
+            pool.submit(range(len(self.genes)), self.genes, 1)
+            order = []
+            while len(order) < len(self.genes):
+                order += [key for key, score in pool.poll()]
+        finally:
+            pool.close()
+        self.assertEqual(sorted(order), range(len(self.genes)))
+        # Found within about a second, with about 4 seconds of genes to go
+        # on the other worker
+        self.assertTrue(order.index(7) < len(self.genes) - 10)
+
+    def test_timeout_while_sending(self):
+        # The worker is stopped for timing out part way through sending its
+        # result, as the pool is not reading. Its half-sent result must not
+        # hang the pool or be read as the result of the re-sent chunk.
+        pool = workerpool.WorkerPool(large_result_test, 2, timeout=0.5)
+        try:
+            pool.submit([0, 1], self.genes[:2], 1)
+            self.assertEqual(pool.poll(0), [])
+            time.sleep(1)
+            self.assertTrue(all([worker['process'].is_alive() 
+                for worker in pool.workers]))
+            pool.check_workers()
+            scores = []
+            while len(scores) < 2:
+                scores += pool.poll()
+        finally:
+            pool.close()
+        self.assertEqual(sorted(scores), [(0, 'x' * 1000000 + str(self.exp[0])),
+            (1, 'x' * 1000000 + str(self.exp[1]))])
+
+    def test_abort(self):
+        pool = workerpool.WorkerPool(slow_test, 2, timeout=0.5, 
+            timeout_policy='abort')
+        try:
+            self.assertRaises(mureilexception.AlgorithmException, 
+                pool.score, self.genes)
+        finally:
+            pool.close()
+
+    def test_error(self):
+        pool = workerpool.WorkerPool(error_test, 2)
+        try:
+            self.assertRaises(mureilexception.AlgorithmException, 
+                pool.score, self.genes)
+        finally:
+            pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
@@ -0,0 +1,130 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of singlepassvariablegenerator
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_singlepassvariablegenerator.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import numpy
+
+from tools import testutilities
+
+from generator import singlepassvariablegenerator
+from missed_supply import missedsupply
+from thermal import instantthermal
+
+
+class TestCostAndOutputBatch(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+        rand = numpy.random.RandomState(1)
+        # Enough sites and timesteps that the order of each sum matters
+        self.ts_cap_fac = rand.rand(500, 12)
+        self.distances = rand.rand(12) * 10
+        self.rem_demand = rand.rand(500, 6) * 1000
+        self.params = rand.randint(-2, 20, (12, 6))
+        self.params[:,0] = 0
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def check_batch(self, gen, params):
+        """Check that calculate_cost_and_output_batch gives exactly the results
+        of a call to calculate_cost_and_output on each column, so a gene scores
+        the same however it is batched.
+        """
+        cost, output = gen.calculate_cost_and_output_batch(params, self.rem_demand)
+        for i in range(params.shape[1]):
+            exp_cost, exp_output = gen.calculate_cost_and_output(
+                numpy.array(params[:,i]), numpy.array(self.rem_demand[:,i]))
+            self.assertEqual(cost[i], exp_cost)
+            self.assertListEqual(output[:,i].tolist(), exp_output.tolist())
+
+    def test_variable(self):
+        config = {
+            'model': 'singlepassvariablegenerator',
+            'section': 'Wind',
+            'capex': 3.0,
+            'size': 2.5,
+            'type': 'Wind',
+            'data_type': 'ts_wind',
+            'install': 100.0,
+            'max_count': 50.0,
+            'alpha': 0.5
+        }
+        data = {'ts_wind': self.ts_cap_fac, 'ts_wind_distances': self.distances}
+
+        for gen_class in [singlepassvariablegenerator.VariableGeneratorBasic, 
+            singlepassvariablegenerator.VariableGeneratorLinearInstall,
+            singlepassvariablegenerator.VariableGeneratorExpCost,
+            singlepassvariablegenerator.VariableGeneratorSqrtCost,
+            singlepassvariablegenerator.VariableGeneratorAsymptCost]:
+            gen = gen_class()
+            gen_config = dict([(key, value) for (key, value) in config.iteritems() 
+                if key in [tup[0] for tup in gen.get_config_spec()] + ['model', 'section']])
+            gen.set_config(gen_config)
+            gen.set_data(data)
+            self.check_batch(gen, self.params)
+
+        gen = singlepassvariablegenerator.IncrementalVariableGeneratorBasic()
+        gen.set_config(dict([(key, config[key]) for key in 
+            ['model', 'section', 'capex', 'size', 'type', 'data_type']]))
+        gen.set_data(data)
+        gen.get_param_count()
+        self.check_batch(gen, numpy.vstack((self.params, self.params // 2)))
+
+    def test_missed_and_thermal(self):
+        gen = missedsupply.LinearMissedSupply()
+        gen.set_config({'model': 'missedsupply', 'section': 'Missed', 
+            'cost_per_mwh': 12000, 'timestep_hrs': 0.5, 'variable_cost_mult': 20})
+        self.check_batch(gen, numpy.zeros((0, 6)))
+
+        gen = instantthermal.InstantMaxThermal()
+        gen.set_config({'model': 'instantthermal', 'section': 'Fossil', 
+            'capex': 1.5, 'fuel_price_mwh': 10, 'carbon_price': 25,
+            'carbon_intensity': 1.0, 'timestep_hrs': 0.5, 'variable_cost_mult': 20})
+        self.check_batch(gen, numpy.zeros((0, 6)))
+
+        # Uses the base class default, which loops over each column
+        gen = missedsupply.TimestepReliabilityMissedSupply()
+        gen.set_config({'model': 'missedsupply', 'section': 'Missed', 
+            'cost_per_mwh': 12000, 'timestep_hrs': 0.5, 'variable_cost_mult': 20})
+        self.check_batch(gen, numpy.zeros((0, 6)))
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
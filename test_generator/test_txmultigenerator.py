@@ -263,6 +263,16 @@ class TestUpdateStateNewPeriod(unittest.TestCase):
         #pp.pprint(state_handle)
         self.assertTrue((exp_state_handle == state_handle))
 
+        # Updating a copy of the state leaves the original as it was
+        copy_handle = tmg.copy_state_handle(state_handle)
+        tmg.update_state_new_period_list(copy_handle, 2030, [(22, 500, 2040)])
+        tmg.calculate_update_decommission(copy_handle)
+        self.assertTrue((exp_state_handle == state_handle))
+        self.assertEqual(copy_handle['capacity'][22], [(100, 1990, 2020), 
+            (1000, 2010, 2020), (4400, 2020, 2040), (500, 2030, 2040)])
+        self.assertEqual(copy_handle['history'][22], [(200, 2000, 2030)])
+        self.assertTrue(22 not in state_handle['history'])
+
         # and check that get_startup_state still returns a clean one
         startup_state = tmg.get_startup_state_handle()
 
@@ -312,6 +322,7 @@ class TestUpdateStateNewPeriod(unittest.TestCase):
             'params_to_site_data_string': [],
             'start_min_param': 1e20,
             'start_max_param': 1e20,
+            'array_ledger': False,
             'capital_cost': 5.0,
             'decommissioning_cost': 0.1}
         exp_pc[2010] = {'size': 20.0, 
@@ -328,6 +339,7 @@ class TestUpdateStateNewPeriod(unittest.TestCase):
             'params_to_site_data_string': [],
             'start_min_param': 1e20,
             'start_max_param': 1e20,
+            'array_ledger': False,
             'lifetime_yrs': 10,
             'model': 'txmultigenerator',
             'section': 'Generator',
@@ -346,6 +358,7 @@ class TestUpdateStateNewPeriod(unittest.TestCase):
             'params_to_site_data_string': [],
             'start_min_param': 1e20,
             'start_max_param': 1e20,
+            'array_ledger': False,
             'carbon_price_m': 0.0,
             'model': 'txmultigenerator',
             'section': 'Generator',
@@ -412,6 +425,81 @@ class TestUpdateStateNewPeriod(unittest.TestCase):
             'In section Generator, lifetime_yrs = 8.0 which is required to be a multiple of time_period_yrs of 10.0')
             
 
+class TestArrayLedger(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def make_generator(self, array_ledger):
+        config = {}
+        config['size'] = {2010: 10, 2030: 30}
+        config['capital_cost'] = {2010: 6, 2020: 7}
+        config['install_cost'] = 50
+        config['decommissioning_cost'] = {2010: 0.2}
+        config['time_period_yrs'] = 10
+        config['lifetime_yrs'] = {2010: 10, 2020: 20}
+        config['model'] = 'txmultigenerator'
+        config['section'] = 'Generator'
+        config['timestep_hrs'] = 1.0
+        config['params_to_site_data_string'] = '33 22 44 55 11'
+        config['startup_data_string'] = ('[[22, 100, 1990, 2020], [22, 200, 2000, 2030], ' +
+            '[11, 300, 2000, 2010], [44, 400, 1990, 2010], [44, 1000, 1990, 2020]]')
+        config['array_ledger'] = str(array_ledger)
+
+        tmg = txmultigeneratormultisite.TxMultiGeneratorMultiSite()
+        tmg.set_config(config, run_periods=[2010, 2020, 2030, 2040])
+        return tmg
+
+    def run_periods(self, tmg, state_handle, params):
+        results = []
+        for period, new_params in zip([2010, 2020, 2030, 2040], params):
+            tmg.update_state_new_period_params(state_handle, period, new_params)
+            if period == 2020:
+                # a new site, and a lifetime not in the config
+                tmg.update_state_new_period_list(state_handle, period,
+                    [(99, 500, 2040), (22, 0, 2030)])
+            total_cost, new_cap = tmg.calculate_new_capacity_cost(state_handle)
+            results.append((tmg.get_site_indices(state_handle),
+                tmg.get_capacity(state_handle), total_cost, sorted(new_cap)))
+            total_cost, decomm = tmg.calculate_update_decommission(state_handle)
+            results.append((tmg.get_site_indices(state_handle), total_cost,
+                sorted(decomm)))
+        return results
+
+    def test_matches_list(self):
+        params = [[0, 10, 0, 5, 0], [3, 0, 0, 0, 7], [0, 1, 2, 0, 4], [1, 1, 1, 1, 1]]
+        list_tmg = self.make_generator(False)
+        array_tmg = self.make_generator(True)
+        self.assertTrue(list_tmg.ledger is None)
+        
+        exp_results = self.run_periods(list_tmg, 
+            list_tmg.get_startup_state_handle(), params)
+        state_handle = array_tmg.get_startup_state_handle()
+        saved_handle = array_tmg.copy_state_handle(state_handle)
+        results = self.run_periods(array_tmg, state_handle, params)
+        self.assertEqual(exp_results, results)
+
+        # The copy, and the startup state, are as they were
+        self.assertEqual(array_tmg.get_site_indices(saved_handle), [11, 22, 44])
+        self.assertEqual(array_tmg.get_capacity(saved_handle), [300, 300, 1400])
+        results = self.run_periods(array_tmg, array_tmg.get_startup_state_handle(), 
+            params)
+        self.assertEqual(exp_results, results)
+
+    def test_overridden_capital_cost(self):
+        class OwnCapitalCost(txmultigeneratormultisite.TxMultiGeneratorMultiSite):
+            def calculate_capital_cost_site(self, site_data, period, site):
+                return 0, 0
+        
+        tmg = OwnCapitalCost()
+        config = {'model': 'txmultigenerator', 'section': 'Generator', 
+            'time_period_yrs': 10, 'timestep_hrs': 1.0, 'array_ledger': 'True'}
+        self.assertRaises(mureilexception.ConfigException, tmg.set_config, config,
+            run_periods=[2010, 2020])
+        config['array_ledger'] = 'False'
+        tmg.set_config(config, run_periods=[2010, 2020])
 
 
 if __name__ == '__main__':
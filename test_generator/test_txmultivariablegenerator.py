@@ -0,0 +1,169 @@
+#
+#
+# Copyright (C) University of Melbourne 2013
+#
+#
+#
+#Permission is hereby granted, free of charge, to any person obtaining a copy
+#of this software and associated documentation files (the "Software"), to deal
+#in the Software without restriction, including without limitation the rights
+#to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#copies of the Software, and to permit persons to whom the Software is
+#furnished to do so, subject to the following conditions:
+#
+#The above copyright notice and this permission notice shall be included in all
+#copies or substantial portions of the Software.
+#
+#THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#SOFTWARE.
+#
+#
+"""Test of TxMultiVariableGeneratorBase
+
+   Using the Python unittest library: 
+   http://docs.python.org/2/library/unittest.html#
+   
+   To run it, at a command line:
+   python test_txmultivariablegenerator.py
+"""
+
+import sys
+sys.path.append('..')
+
+import os
+
+import unittest
+import numpy
+
+from tools import mureilexception, testutilities
+
+from generator import txmultivariablegenerator
+
+
+class DoubleCostGenerator(txmultivariablegenerator.TxMultiVariableGeneratorBase):
+    def calculate_variable_costs(self, state_handle, site_indices, schedule):
+        vble_cost, carbon, other = (
+            txmultivariablegenerator.TxMultiVariableGeneratorBase.calculate_variable_costs(
+            self, state_handle, site_indices, schedule))
+        return vble_cost * 2, carbon + 1, other
+
+
+class TestCalculateOutputs(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+        self.data = numpy.random.RandomState(5).rand(24, 4)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def make_generator(self, array_ledger=False, startup='[[55, 100, 2000, 2030]]',
+        gen_class=txmultivariablegenerator.TxMultiVariableGeneratorBase):
+        tvg = gen_class()
+        tvg.set_config({'model': 'txmultivariablegenerator', 'section': 'Wind',
+            'time_period_yrs': 10, 'timestep_hrs': 1.0, 'vom': 3, 
+            'data_name': 'ts_wind', 'data_map_name': 'ts_wind_map',
+            'data_ts_length': 24, 'startup_data_string': startup,
+            'array_ledger': str(array_ledger)}, run_periods=[2010, 2020])
+        tvg.set_data({'ts_wind': self.data, 
+            'ts_wind_map': numpy.array([[22, 3], [33, 0], [44, 2], [55, 1]])})
+        return tvg
+
+    def test_outputs(self):
+        for array_ledger in [False, True]:
+            tvg = self.make_generator(array_ledger)
+            state_handle = tvg.get_startup_state_handle()
+            tvg.update_state_new_period_params(state_handle, 2010, [2, 0, 5, 1])
+            site_indices, output = tvg.calculate_outputs(state_handle, 24)
+            self.assertEqual(site_indices, [22, 44, 55])
+            exp_output = numpy.array([self.data[:, 3] * 2, self.data[:, 2] * 5,
+                self.data[:, 1] * 101])
+            self.assertTrue(numpy.array_equal(output, exp_output))
+
+            vble_cost, carbon, other = tvg.calculate_variable_costs(state_handle,
+                site_indices, output)
+            exp_vble_cost = [numpy.sum(exp_output[i]) * 3e-6 for i in range(3)]
+            self.assertTrue(numpy.allclose(vble_cost, exp_vble_cost, rtol=1e-12))
+            self.assertTrue(numpy.array_equal(carbon, numpy.zeros(3)))
+            
+    def test_aggregate(self):
+        # The totals, and calculate_time_period_simple without full results,
+        # match the per-site calculation to within the relative tolerance 
+        # documented in calculate_outputs_and_costs_aggregate
+        rtol = 1e-12
+        for array_ledger in [False, True]:
+            tvg = self.make_generator(array_ledger)
+            full_handle = tvg.get_startup_state_handle()
+            handle = tvg.get_startup_state_handle()
+            supply_request = numpy.ones(24)
+            
+            sites, cost, supply, results = tvg.calculate_time_period_simple(
+                full_handle, 2010, [2, 0, 5, 1], supply_request, full_results=True)
+            self.assertEqual(tvg.calculate_time_period_simple(handle, 2010, 
+                [2, 0, 5, 1], supply_request)[0], sites)
+            
+            exp_supply, exp_vble_cost, exp_carbon, other = (
+                tvg.calculate_outputs_and_costs(handle, supply_request))
+            supply, vble_cost, carbon = tvg.calculate_outputs_and_costs_aggregate(
+                handle, supply_request)
+            self.assertTrue(numpy.allclose(supply, numpy.sum(exp_supply, axis=0), 
+                rtol=rtol, atol=0))
+            self.assertTrue(numpy.allclose(vble_cost, numpy.sum(exp_vble_cost), 
+                rtol=rtol, atol=0))
+            self.assertEqual(carbon, 0)
+
+            sites, cost, supply = tvg.calculate_time_period_simple(handle, 2020, 
+                [0, 3, 0, 0], supply_request)
+            exp_sites, exp_cost, exp_supply, results = tvg.calculate_time_period_simple(
+                full_handle, 2020, [0, 3, 0, 0], supply_request, full_results=True)
+            self.assertEqual(sites, exp_sites)
+            self.assertTrue(numpy.allclose(cost, exp_cost, rtol=rtol, atol=0))
+            self.assertTrue(numpy.allclose(supply, exp_supply, rtol=rtol, atol=0))
+
+    def test_aggregate_overridden(self):
+        # A subclass that overrides the variable costs gets the same totals
+        # without full results as with them
+        tvg = self.make_generator(gen_class=DoubleCostGenerator)
+        self.assertFalse(tvg.has_base_outputs())
+        self.assertTrue(self.make_generator().has_base_outputs())
+        handle = tvg.get_startup_state_handle()
+        tvg.update_state_new_period_params(handle, 2010, [2, 0, 5, 1])
+        supply_request = numpy.ones(24)
+        exp_supply, exp_vble_cost, exp_carbon, other = (
+            tvg.calculate_outputs_and_costs(handle, supply_request))
+        supply, vble_cost, carbon = tvg.calculate_outputs_and_costs_aggregate(
+            handle, supply_request)
+        self.assertTrue(numpy.array_equal(supply, numpy.sum(exp_supply, axis=0)))
+        self.assertEqual(vble_cost, numpy.sum(exp_vble_cost))
+        self.assertEqual(carbon, 3)
+
+    def test_no_sites(self):
+        tvg = self.make_generator(startup='None')
+        state_handle = tvg.get_startup_state_handle()
+        tvg.update_state_new_period_params(state_handle, 2010, [0, 0, 0, 0])
+        site_indices, output = tvg.calculate_outputs(state_handle, 24)
+        self.assertEqual(site_indices, [])
+        self.assertEqual(output.shape, (0, 24))
+        vble_cost, carbon, other = tvg.calculate_variable_costs(state_handle,
+            site_indices, output)
+        self.assertEqual(len(vble_cost), 0)
+        supply, vble_cost, carbon = tvg.calculate_outputs_and_costs_aggregate(
+            state_handle, numpy.ones(24))
+        self.assertTrue(numpy.array_equal(supply, numpy.zeros(24)))
+
+    def test_site_with_no_data(self):
+        tvg = self.make_generator()
+        for site in [66, 11]:
+            state_handle = tvg.get_startup_state_handle()
+            tvg.update_state_new_period_list(state_handle, 2010, [(site, 10, 2020)])
+            self.assertRaises(mureilexception.MureilException, 
+                tvg.calculate_outputs, state_handle, 24)
+
+
+if __name__ == '__main__':
+    unittest.main()
+    
@@ -42,12 +42,24 @@ import os
 test_dir = os.path.dirname(os.path.realpath(__file__)) 
 
 import unittest
-from test_regression.single_test import single_test
+from test_regression.single_test import single_test, batch_test, history_test, stop_test
 
 class RegressionTest(unittest.TestCase):
     def test(self):
         self.assertTrue(single_test(
             test_dir, config, pickle))
+
+    def test_batch_scores(self):
+        self.assertTrue(batch_test(
+            test_dir, config))
+
+    def test_compact_history(self):
+        self.assertTrue(history_test(
+            test_dir, config))
+
+    def test_early_stop(self):
+        self.assertTrue(stop_test(
+            test_dir, config, 3))
       
 if __name__ == '__main__':
     unittest.main()
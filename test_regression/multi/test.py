@@ -33,6 +33,8 @@ code.
 #################################
 
 config = 'asst5_config_multi.txt'
+prefix_config = 'asst5_config_multi_prefix.txt'
+ledger_config = 'asst5_config_multi_ledger.txt'
 pickle = 'asst5.pkl'
 
 import sys
@@ -42,12 +44,33 @@ import os
 test_dir = os.path.dirname(os.path.realpath(__file__)) 
 
 import unittest
-from test_regression.single_test import single_test
+from test_regression.single_test import single_test, batch_test, history_test, stop_test
 
 class RegressionTest(unittest.TestCase):
     def test(self):
         self.assertTrue(single_test(
             test_dir, config, pickle))
+
+    def test_prefix_cache(self):
+        self.assertTrue(single_test(
+            test_dir, prefix_config, pickle))
+
+    def test_array_ledger(self):
+        self.assertTrue(single_test(
+            test_dir, ledger_config, pickle))
+
+    def test_batch_scores(self):
+        for config_name in [config, prefix_config, ledger_config]:
+            self.assertTrue(batch_test(
+                test_dir, config_name))
+
+    def test_compact_history(self):
+        self.assertTrue(history_test(
+            test_dir, config))
+
+    def test_early_stop(self):
+        self.assertTrue(stop_test(
+            test_dir, config, 3))
       
 if __name__ == '__main__':
     unittest.main()
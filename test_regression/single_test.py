@@ -30,6 +30,15 @@ both of the 'best_gene_data' structures out to the
 file diff.txt. The run log is at test.log.
 This is written to be called from the test.py files
 in the subdirectories.
+
+batch_test checks that the master scores genes 
+exactly the same one at a time and in a batch.
+
+history_test checks that an interim output holds
+the compact best gene history, not the expanded list.
+
+stop_test checks the iteration passed to the final
+output when the algorithm finishes early.
 """
 
 import sys
@@ -38,6 +47,9 @@ import os
 import runmureil
 import pickle
 import pprint
+import numpy
+from tools import mureilbuilder
+from algorithm import genehistory
 
 def single_test(file_dir, config_name, pickle_name):
 
@@ -71,14 +83,14 @@ def single_test(file_dir, config_name, pickle_name):
         new_result = pickle.load(open(new_pickle_file, 'rb'))
 
         if 'best_gene_data' in exp_result:
-            exp_bgd = exp_result['best_gene_data']
+            exp_bgd = genehistory.to_list(exp_result['best_gene_data'])
         else:
-            exp_bgd = exp_result['opt_data']
+            exp_bgd = genehistory.to_list(exp_result['opt_data'])
 
         if 'best_gene_data' in new_result:
-            new_bgd = new_result['best_gene_data']
+            new_bgd = genehistory.to_list(new_result['best_gene_data'])
         else:
-            new_bgd = new_result['opt_data']
+            new_bgd = genehistory.to_list(new_result['opt_data'])
 
         # round the total cost to simplify regression comparisions
         # where internal rounding is an issue
@@ -106,4 +118,99 @@ def single_test(file_dir, config_name, pickle_name):
     os.chdir(cwd)
     
     return match
+
+
+def batch_test(file_dir, config_name):
+    """Score the initial population of the configured
+    algorithm through gene_test_batch and through
+    gene_test, and return True if every score is
+    exactly equal. The engines may score a gene either
+    way, depending on the chunk size and processes.
+    """
+    cwd = os.getcwd()
+    os.chdir(file_dir)
+
+    try:
+        master = mureilbuilder.build_master(['-f', config_name])
+        try:
+            genes = master.algorithm.population.get_values()
+            batch_scores = list(master.gene_test_batch(numpy.array(genes)))
+            scores = [master.gene_test(gene) for gene in genes]
+        finally:
+            master.finalise()
+    finally:
+        os.chdir(cwd)
+
+    return batch_scores == scores
+
+
+def history_test(file_dir, config_name):
+    """Run one iteration of the configured algorithm,
+    write the interim output, and return True if the
+    best gene history saved in it is the compact
+    genehistory.BestGeneHistory, holding the one entry.
+    """
+    cwd = os.getcwd()
+    os.chdir(file_dir)
+
+    new_pickle_file = 'test_history.pkl'
+    if os.path.isfile(new_pickle_file):
+        os.remove(new_pickle_file)
+
+    try:
+        master = mureilbuilder.build_master(['-f', config_name,
+            '--output_file', new_pickle_file])
+        try:
+            master.algorithm.prepare_run()
+            master.algorithm.do_iteration()
+            master.output_results()
+        finally:
+            master.finalise()
+
+        new_result = pickle.load(open(new_pickle_file, 'rb'))
+        os.remove(new_pickle_file)
+    finally:
+        os.chdir(cwd)
+
+    if 'best_gene_data' in new_result:
+        new_bgd = new_result['best_gene_data']
+    else:
+        new_bgd = new_result['opt_data']
+
+    return (isinstance(new_bgd, genehistory.BestGeneHistory) and
+        len(genehistory.to_list(new_bgd)) == 1)
+
+
+def stop_test(file_dir, config_name, iterations):
+    """Run the configured master with the algorithm
+    finishing after the given number of iterations, and
+    return True if the final output is given that
+    iteration, not the configured iterations.
+    """
+    cwd = os.getcwd()
+    os.chdir(file_dir)
+
+    outputs = []
+    def record_output(final=False, iteration=0):
+        outputs.append((final, iteration))
+
+    try:
+        master = mureilbuilder.build_master(['-f', config_name])
+        try:
+            algorithm = master.algorithm
+            do_iteration = algorithm.do_iteration
+            done = []
+            def count_iteration():
+                do_iteration()
+                done.append(1)
+            algorithm.do_iteration = count_iteration
+            algorithm.is_finished = lambda: len(done) >= iterations
+            master.output_results = record_output
+            master.run()
+        finally:
+            master.finalise()
+    finally:
+        os.chdir(cwd)
+
+    return outputs[-1] == (True, iterations)
     
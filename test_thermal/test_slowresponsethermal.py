@@ -46,6 +46,21 @@ from tools import testutilities
 
 import thermal.slowresponsethermal
 
+
+def check_batch(test_case, gen, params):
+    """Check that calculate_cost_and_output_batch gives exactly the results
+    of calculate_cost_and_output on each column of params.
+    """
+    rand = np.random.RandomState(5)
+    rem_demand = np.cumsum(rand.normal(0, 200, (500, params.shape[1])), axis=0)
+    cost, output = gen.calculate_cost_and_output_batch(params, rem_demand)
+    for i in range(params.shape[1]):
+        exp_cost, exp_output = gen.calculate_cost_and_output(params[:,i], 
+            rem_demand[:,i])
+        test_case.assertEqual(cost[i], exp_cost)
+        test_case.assertListEqual(output[:,i].tolist(), exp_output.tolist())
+
+
 class TestSlowResponseThermal(unittest.TestCase):
     def setUp(self):
         testutilities.unittest_path_setup(self, __file__)
@@ -120,6 +135,13 @@ class TestSlowResponseThermal(unittest.TestCase):
 
         self.assertListEqual(out_ts.tolist(), exp_ts.tolist())
         self.assertEqual(out_cost, exp_cost)
+
+    def test_batch(self):
+        self.thermal.set_config({'capex': 3.0, 'fuel_price_mwh': 10, 
+            'carbon_price': 5, 'carbon_intensity': 0.9, 'timestep_hrs': 0.5,
+            'variable_cost_mult': 7.0, 'ramp_time_mins': 240, 'type': 'BlackCoal'})
+        self.thermal.set_data({'ts_demand': np.ones(500) * 10000})
+        check_batch(self, self.thermal, np.array([range(12)], dtype=float))
     
 
 class TestSlowResponseThermalFixed(unittest.TestCase):
@@ -194,6 +216,14 @@ class TestSlowResponseThermalFixed(unittest.TestCase):
 
         self.assertListEqual(out_ts.tolist(), exp_ts.tolist())
         self.assertEqual(out_cost, exp_cost)
+
+    def test_batch(self):
+        self.thermal.set_config({'capex': 3.0, 'fuel_price_mwh': 10, 
+            'carbon_price': 5, 'carbon_intensity': 0.9, 'timestep_hrs': 0.5,
+            'variable_cost_mult': 7.0, 'ramp_time_mins': 240, 'type': 'BlackCoal',
+            'fixed_capacity': 1200})
+        self.thermal.set_data({'ts_demand': np.ones(500) * 10000})
+        check_batch(self, self.thermal, np.zeros((0, 12)))
     
 
 if __name__ == '__main__':
@@ -121,51 +121,51 @@ class TestSlowResponseThermal(unittest.TestCase):
 
     def test_1(self):
         print "Beta_test1.csv"
-        self.do_csv_test("beta_test1.csv")        
+        self.do_csv_test("Beta_test1.csv")        
 
     def test_2(self):
         print "Beta_test2.csv"
-        self.do_csv_test("beta_test2.csv")        
+        self.do_csv_test("Beta_test2.csv")        
 
     def test_3(self):
         print "Beta_test3.csv"
-        self.do_csv_test("beta_test3.csv")        
+        self.do_csv_test("Beta_test3.csv")        
 
     def test_4(self):
         print "Beta_test4.csv"
-        self.do_csv_test("beta_test4.csv")        
+        self.do_csv_test("Beta_test4.csv")        
 
     def test_5(self):
         print "Beta_test5.csv"
-        self.do_csv_test("beta_test5.csv")              
+        self.do_csv_test("Beta_test5.csv")              
 
     def test_6(self):
         print "Beta_test6.csv"
-        self.do_csv_test("beta_test6.csv")
+        self.do_csv_test("Beta_test6.csv")
 
     def test_7(self):
         print "Beta_test7.csv"
-        self.do_csv_test("beta_test7.csv") 
+        self.do_csv_test("Beta_test7.csv") 
 
     def test_8(self):
         print "Beta_test8.csv"
-        self.do_csv_test("beta_test8.csv") 
+        self.do_csv_test("Beta_test8.csv") 
 
     def test_9(self):
         print "Beta_test9.csv"
-        self.do_csv_test("beta_test9.csv")
+        self.do_csv_test("Beta_test9.csv")
 
     def test_10(self):
         print "Beta_test10.csv"
-        self.do_csv_test("beta_test10.csv")
+        self.do_csv_test("Beta_test10.csv")
 
     def test_11(self):
         print "Beta_test11.csv"
-        self.do_csv_test("beta_test11.csv")
+        self.do_csv_test("Beta_test11.csv")
 
     def test_12(self):
         print "Beta_test12.csv"
-        self.do_csv_test("beta_test12.csv")
+        self.do_csv_test("Beta_test12.csv")
 
 class TestSlowResponseThermalFixed(unittest.TestCase):
     def setUp(self):
@@ -231,6 +231,33 @@ class TestSlowResponseThermalFixed(unittest.TestCase):
 
         self.assertListEqual(out_ts.tolist(), exp_ts.tolist())
         self.assertEqual(out_cost, exp_cost)
+
+
+class TestFirstOrderLag(unittest.TestCase):
+    def loop_lag(self, target, exponent, initial):
+        output = np.zeros(len(target))
+        prev = initial
+        for i in range(len(target)):
+            output[i] = prev + (target[i] - prev) * exponent
+            prev = output[i]
+        return output
+
+    def test_matches_loop(self):
+        rng = np.random.RandomState(5)
+        for exponent in [1e-4, 0.01, 0.3, 0.9, 0.999999]:
+            for length in [1, 2, 17, 3000]:
+                target = rng.rand(length) * 1000
+                exp_out = self.loop_lag(target, exponent, 150.0)
+                out = thermal.slowresponsethermal_beta.first_order_lag(
+                    target, exponent, 150.0)
+                self.assertTrue(np.allclose(out, exp_out, rtol=1e-12, atol=1e-9))
+
+    def test_limits(self):
+        target = np.array([10.0, 20.0, 30.0])
+        lag = thermal.slowresponsethermal_beta.first_order_lag
+        self.assertListEqual(lag(target, 1.0).tolist(), target.tolist())
+        self.assertListEqual(lag(target, 0.0, 5.0).tolist(), [5.0, 5.0, 5.0])
+        self.assertEqual(len(lag(np.array([]), 0.5)), 0)
     
         
 if __name__ == '__main__':
@@ -189,6 +189,63 @@ class TestSlowResponseThermalFixed(unittest.TestCase):
         self.assertEqual(out_cost, exp_cost)
     
 
+def loop_dispatch(supply_request, capacity, max_inc):
+    """The ramp-limited dispatch, one timestep at a time.
+    """
+    supply = np.zeros(len(supply_request))
+    therm_out = 0
+    for i in range(len(supply_request)):
+        des_inc = supply_request[i] - therm_out
+        if abs(des_inc) <= max_inc:
+            therm_out = therm_out + des_inc 
+        else:
+            therm_out = therm_out + max_inc * cmp(des_inc,0)
+        if therm_out > capacity:
+            therm_out = capacity
+        if therm_out < 0:
+            therm_out = 0
+        supply[i] = therm_out
+    return supply
+
+
+class TestRampDispatch(unittest.TestCase):
+    def setUp(self):
+        testutilities.unittest_path_setup(self, __file__)
+        rand = np.random.RandomState(7)
+        # Requests with smooth stretches, steps, stretches above capacity
+        # and below zero, and a few exact repeats.
+        self.requests = []
+        for i in range(20):
+            request = np.cumsum(rand.normal(0, rand.choice([5, 50, 300]), 500)) + (
+                rand.uniform(-500, 1500))
+            request[rand.randint(0, 500, 20)] += rand.normal(0, 1000, 20)
+            repeats = rand.randint(1, 500, 50)
+            request[repeats] = request[repeats - 1]
+            self.requests.append(request)
+        self.capacities = rand.uniform(0, 1000, 20)
+        self.capacities[0] = 0
+        self.max_incs = self.capacities * rand.choice([0.05, 0.25, 1.0, 5.0], 20)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_single(self):
+        for request, capacity, max_inc in zip(self.requests, self.capacities,
+            self.max_incs):
+            exp_supply = loop_dispatch(request, capacity, max_inc)
+            supply = thermal.txmultislowthermal.ramp_dispatch(request, capacity, max_inc)
+            self.assertListEqual(supply.tolist(), exp_supply.tolist())
+        self.assertEqual(len(thermal.txmultislowthermal.ramp_dispatch([], 100, 10)), 0)
+
+    def test_batch(self):
+        supply = thermal.txmultislowthermal.ramp_dispatch_batch(
+            np.array(self.requests), self.capacities, self.max_incs)
+        for i in range(len(self.requests)):
+            exp_supply = loop_dispatch(self.requests[i], self.capacities[i], 
+                self.max_incs[i])
+            self.assertListEqual(supply[i].tolist(), exp_supply.tolist())
+
+
 if __name__ == '__main__':
     unittest.main()
     
@@ -87,6 +87,19 @@ class InstantMaxThermal(singlepassgenerator.SinglePassGeneratorBase):
         return cost, output
         
 
+    def calculate_cost_and_output_batch(self, params, rem_demand):
+        """Implement calculate_cost_and_output_batch as defined in SinglePassGeneratorBase,
+        sizing the capacity separately for each column of rem_demand.
+        """
+        output = rem_demand.clip(0)
+        max_cap = numpy.max(output, axis=0)
+        variable_cost = singlepassgenerator.column_sums(output) * self.config['timestep_hrs'] * (
+            self.config['fuel_price_mwh'] + (
+            self.config['carbon_price'] * self.config['carbon_intensity'])) / float(1e6)
+        cost = variable_cost * self.config['variable_cost_mult'] + self.config['capex'] * max_cap
+        return cost, output
+
+
     def interpret_to_string(self):
         if self.saved:
             return 'Instant Fossil Thermal, max capacity (MW) {:.2f}'.format(
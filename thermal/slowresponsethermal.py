@@ -25,6 +25,7 @@
 #
 
 from generator import singlepassgenerator
+from thermal import txmultislowthermal
 from tools import mureiltypes
 
 import numpy
@@ -156,6 +157,24 @@ class SlowResponseThermal(singlepassgenerator.SinglePassGeneratorBase):
             self.saved['output'] = numpy.copy(output)
  
         return cost, output
+
+
+    def calculate_cost_and_output_batch(self, params, rem_demand):
+        """Implement calculate_cost_and_output_batch as defined in SinglePassGeneratorBase,
+        ramping every candidate together through each timestep with
+        txmultislowthermal.ramp_dispatch_batch.
+        """
+        capacity = params[0] * self.config['size']
+        max_grad = capacity/(self.config['ramp_time_mins']/60)
+        max_inc = max_grad * self.config['timestep_hrs']
+        output = txmultislowthermal.ramp_dispatch_batch(
+            numpy.transpose(rem_demand), capacity, max_inc).T
+
+        variable_cost = singlepassgenerator.column_sums(output) * self.config['timestep_hrs'] * (
+            self.config['fuel_price_mwh'] + (
+            self.config['carbon_price'] * self.config['carbon_intensity'])) / 1e6
+        cost = variable_cost * self.config['variable_cost_mult'] + self.config['capex'] * capacity
+        return cost, output
          
  
     def interpret_to_string(self):
@@ -179,6 +198,16 @@ class SlowResponseThermalFixed(SlowResponseThermal):
         return SlowResponseThermal.calculate_cost_and_output(self, 
             [self.config['fixed_capacity'] / self.config['size']], rem_demand, save_result)
 
+
+    def calculate_cost_and_output_batch(self, params, rem_demand):
+        """Return the cost and output for each candidate from the optimisable
+        slow response thermal, with capacity parameter set to fixed capacity.
+        """
+        fixed = numpy.zeros((1, rem_demand.shape[1]))
+        fixed.fill(self.config['fixed_capacity'] / self.config['size'])
+        return SlowResponseThermal.calculate_cost_and_output_batch(self, 
+            fixed, rem_demand)
+
     
     def get_config_spec(self):
         """Return a list of tuples of format (name, conversion function, default),
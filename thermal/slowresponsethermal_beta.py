@@ -31,6 +31,55 @@ import numpy
 import copy
 import math
 
+
+def first_order_lag(target, exponent, initial=0.0):
+    """Return the output of a first-order lag following target, where at each 
+    timestep the output moves the fraction exponent of the way from its previous
+    value to the target:
+        output[i] = output[i-1] + (target[i] - output[i-1]) * exponent
+    with the output before the first timestep equal to initial.
+    
+    This is a linear filter, computed in closed form over blocks of timesteps,
+    as the sum of the target weighted by powers of (1 - exponent). The blocks 
+    are short enough that the weights stay within a factor of 1e6 of each other,
+    so the results match the timestep recursion to rounding. scipy.signal.lfilter
+    computes the same filter, but the only scipy import, in the descent engine,
+    has been removed, and scipy is kept out of the dependencies on purpose.
+    
+    Inputs:
+        target: a timeseries of the target output
+        exponent: the fraction of the difference to move in each timestep, 
+            between 0 and 1.
+        initial: the output before the first timestep, default 0.
+        
+    Outputs:
+        output: a timeseries of the output
+    """
+    target = numpy.asarray(target, dtype=float)
+    ts_length = len(target)
+    decay = 1.0 - exponent
+    if (ts_length == 0) or (decay <= 0):
+        return target.copy()
+    if decay >= 1:
+        return numpy.ones(ts_length) * initial
+        
+    block = int(min(ts_length, max(1, 1 + math.log(1e6) / -math.log(decay))))
+    powers = decay ** numpy.arange(block)
+    inverse_powers = 1.0 / powers
+    
+    output = numpy.zeros(ts_length)
+    state = initial
+    for start in range(0, ts_length, block):
+        end = min(start + block, ts_length)
+        length = end - start
+        output[start:end] = powers[:length] * (
+            numpy.cumsum(target[start:end] * inverse_powers[:length]) * exponent + 
+            state * decay)
+        state = output[end - 1]
+        
+    return output
+
+
 class SlowResponseThermal(singlepassgenerator.SinglePassGeneratorBase):
     """A slow-response thermal generator that looks at the timeseries to
     determine when to turn on. Optimisable capacity.
@@ -119,11 +168,9 @@ class SlowResponseThermal(singlepassgenerator.SinglePassGeneratorBase):
         # assumes initial thermal output is zero, can be changed at init_therm_out
         # assumes maximum input demand signal is max capacity (see clip_demand)
 
-        output = numpy.zeros(len(rem_demand)+1)
+        output = numpy.zeros(len(rem_demand))
         init_therm_out = 0 # initial thermal output assumed zero
-        output[0] = init_therm_out     
-        ts_demand = self.ts_demand
-        avail_demand = copy.deepcopy(rem_demand)
+        output[0:1] = init_therm_out     
         max_eff = self.config['eta_max']
         time_step = self.config['timestep_mins']/60
         time_const_hrs = self.config['time_const_mins']/60
@@ -137,17 +184,13 @@ class SlowResponseThermal(singlepassgenerator.SinglePassGeneratorBase):
             eta_ss = numpy.ones(len(rem_demand))* max_eff * numpy.sqrt(clip_demand/capacity)
             exponent = -1*math.expm1(-1*time_step/time_const_hrs) # precalculate exponent       
 
-            for i in numpy.delete(range(len(clip_demand)), [0]):
-                output[i] = output[i-1]+(clip_demand[i] - output[i-1])* exponent
-
-                if eta_ss[i] > 0:
-                    # print 'eta_ss:', eta_ss[i]
-                    fuel_flow_rate[i] = clip_demand[i]/(self.config['lwr_heat_val']*eta_ss[i])
-                                                
-            #fuel_flow_rate = numpy.where(eta_ss>0, clip_demand/(self.config['lwr_heat_val']*eta_ss), 0) #kg/s
-        
+            # The output lags the clipped demand, from the initial output at the first timestep
+            output[1:] = first_order_lag(clip_demand[1:], exponent, init_therm_out)
 
-        output = numpy.delete(output, len(output)-1) 
+            # and fuel is burnt where the efficiency is positive, also from the second timestep
+            burning = eta_ss > 0
+            burning[0:1] = False
+            fuel_flow_rate[burning] = clip_demand[burning]/(self.config['lwr_heat_val']*eta_ss[burning]) #kg/s
 
         fuel_kg = fuel_flow_rate * time_step * 60 * 60 # kg
         fuel_cost_mil = (numpy.sum(fuel_kg)/1000 * self.config['fuel_price_tonne'])/1e6
@@ -176,7 +176,6 @@ class TxMultiInstantOptimisableThermal(txmultigeneratormultisite.TxMultiGenerato
         for each site, and the carbon emissions.
         """
         
-        cap_list = state_handle['capacity']
         site_indices = self.get_site_indices(state_handle)
         num_sites = len(site_indices)
 
@@ -189,9 +188,7 @@ class TxMultiInstantOptimisableThermal(txmultigeneratormultisite.TxMultiGenerato
         ### This model only handles a single site
         if num_sites > 0:
             i = 0
-            site = site_indices[i]
-            capacity = [tup[0] for tup in cap_list[site]]
-            max_cap = numpy.sum(capacity)
+            max_cap = self.get_capacity(state_handle)[i]
             supply[i,:] = supply_request.clip(0, max_cap)
         
         vble_cost, carbon, other = self.calculate_variable_costs(
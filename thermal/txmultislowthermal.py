@@ -33,6 +33,116 @@ import copy
 import numpy
 
 
+def ramp_dispatch(supply_request, capacity, max_inc):
+    """Calculate the output of a ramp-limited generator following supply_request.
+    Starting from zero, at each timestep the output moves towards the request
+    by at most max_inc, and is then limited to between zero and capacity.
+    
+    Stretches where the output exactly follows the request, or stays at capacity
+    or at zero, are filled in as a whole, and the remaining timesteps are stepped
+    through one at a time. The result is identical to stepping through every 
+    timestep.
+    
+    Inputs:
+        supply_request: a timeseries of the requested supply in MW
+        capacity: the capacity in MW
+        max_inc: the maximum change in output in one timestep, in MW
+        
+    Outputs:
+        supply: a timeseries of the output in MW
+    """
+    request = numpy.asarray(supply_request, dtype=float)
+    ts_length = len(request)
+    supply = numpy.zeros(ts_length)
+    if ts_length == 0:
+        return supply
+        
+    # follow_breaks lists the timesteps where the output would not be exactly
+    # the request, given that it was exactly the request in the timestep before.
+    step = request[1:] - request[:-1]
+    follows = ((numpy.abs(step) <= max_inc) & ((request[:-1] + step) == request[1:]) &
+        (request[1:] <= capacity) & (request[1:] >= 0))
+    follow_breaks = numpy.flatnonzero(~follows) + 1
+    full_breaks = numpy.flatnonzero(request < capacity)
+    zero_breaks = numpy.flatnonzero(request > 0)
+    request_list = request.tolist()
+
+    therm_out = 0 # initial thermal output assumed zero
+    i = 0
+    while i < ts_length:
+        des_inc = request_list[i] - therm_out # desired increase to meet rem_demand if no ramp limit
+        if abs(des_inc) <= max_inc: # if the inc/dec in demand is less than max ramp
+            therm_out = therm_out + des_inc 
+        else: # the inc/dec in demand is greater than max ramp
+            therm_out = therm_out + max_inc * cmp(des_inc, 0)
+
+        if therm_out > capacity: # if calc ramped output greater than capacity 
+            therm_out = capacity # limit to max capacity
+        if therm_out < 0: # if calc ramped output less than zero
+            therm_out = 0 # limit to zero
+
+        supply[i] = therm_out
+        i += 1
+        if i == ts_length:
+            break
+            
+        # Then fill in any stretch that follows from this output
+        if therm_out == request_list[i - 1]:
+            breaks = follow_breaks
+        elif (therm_out == capacity) and (request_list[i] >= capacity):
+            breaks = full_breaks
+        elif (therm_out == 0) and (request_list[i] <= 0):
+            breaks = zero_breaks
+        else:
+            continue
+        
+        index = numpy.searchsorted(breaks, i)
+        if index < len(breaks):
+            end = breaks[index]
+        else:
+            end = ts_length
+        if end > i:
+            if breaks is follow_breaks:
+                supply[i:end] = request[i:end]
+                therm_out = request_list[end - 1]
+            else:
+                supply[i:end] = therm_out
+            i = end
+            
+    return supply
+    
+    
+def ramp_dispatch_batch(supply_request, capacity, max_inc):
+    """Calculate the outputs of a set of ramp-limited generators, as for 
+    ramp_dispatch, stepping through the timesteps with all the generators
+    at once. This suits evaluating many candidate capacities together, as
+    slowresponsethermal.SlowResponseThermal.calculate_cost_and_output_batch does.
+    
+    Inputs:
+        supply_request: an array of timeseries, one row per generator
+        capacity: an array of the capacity of each generator
+        max_inc: an array of the maximum change in output of each generator
+        
+    Outputs:
+        supply: an array of timeseries of the outputs, one row per generator
+    """
+    request = numpy.ascontiguousarray(numpy.transpose(supply_request), dtype=float)
+    capacity = numpy.asarray(capacity, dtype=float)
+    max_inc = numpy.asarray(max_inc, dtype=float)
+    supply = numpy.zeros(request.shape)
+    therm_out = numpy.zeros(request.shape[1])
+    
+    for i in range(request.shape[0]):
+        des_inc = request[i] - therm_out
+        therm_out = numpy.where(numpy.abs(des_inc) <= max_inc, therm_out + des_inc,
+            therm_out + max_inc * numpy.sign(des_inc))
+        numpy.minimum(therm_out, capacity, out=therm_out)
+        numpy.maximum(therm_out, 0, out=therm_out)
+        supply[i] = therm_out
+        
+    return supply.T
+
+
 class TxMultiSlowOptimisableThermal(txmultigeneratormultisite.TxMultiGeneratorMultiSite):
     """A simple implementation of an instant-output thermal generator, such
     as a peaking gas turbine, which requires an optimisation parameter. This
@@ -112,7 +222,6 @@ class TxMultiSlowOptimisableThermal(txmultigeneratormultisite.TxMultiGeneratorMu
         for each site, and the carbon emissions.
         """
         
-        cap_list = state_handle['capacity']
         site_indices = self.get_site_indices(state_handle)
         num_sites = len(site_indices)
 
@@ -131,28 +240,14 @@ class TxMultiSlowOptimisableThermal(txmultigeneratormultisite.TxMultiGeneratorMu
         
         if num_sites > 0:
             j = 0
-            site = site_indices[j]
-            capacity = sum([tup[0] for tup in cap_list[site]])
+            capacity = self.get_capacity(state_handle)[j]
             ramp_time_mins = this_conf['ramp_time_mins']
  
-            therm_out = 0 # initial thermal output assumed zero
             max_grad = capacity/(ramp_time_mins/60) # max response gradient
            
             max_inc = max_grad * this_conf['timestep_hrs'] # max inc/dec based on ramp
  
-            for i in range(len(supply_request)):
-                des_inc = supply_request[i] - therm_out # desired increase to meet rem_demand if no ramp limit
-                if abs(des_inc) <= max_inc: # if the inc/dec in demand is less than max ramp
-                    therm_out =  therm_out + des_inc 
-                else:  # the inc/dec in demand is greater than max ramp
-                    therm_out = therm_out + max_inc * cmp(des_inc,0)
-
-                if therm_out > capacity: # if calc ramped output greater than capacity 
-                    therm_out = capacity # limit to max capacity
-                if therm_out < 0: # if calc ramped output less than zero
-                    therm_out = 0 # limit to  zero
-
-                supply[j,i] = therm_out
+            supply[j,:] = ramp_dispatch(supply_request, capacity, max_inc)
 
             total_supply = numpy.sum(supply[j,:])
             vble_cost[j] = numpy.sum(supply[j,:]) * this_conf['timestep_hrs'] * (
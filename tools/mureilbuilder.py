@@ -134,6 +134,7 @@ def read_flags(flags, alt_args_list=None):
         --processes number: Number of processes to spawn for parallel processing
         --output_file filename: Name of file to write output to
         --do_plots {True|False}: Draw pretty pictures when done
+        --resume {True|False}: Continue from the algorithm's checkpoint file
         --run_periods periods: Set the periods to run in a multi-period sim. Surround
              the list of periods in double-quotes e.g. --run_periods "2010 2020".
     
@@ -161,6 +162,7 @@ def read_flags(flags, alt_args_list=None):
                      'processes': ('algorithm', 'processes'),
                      'output_file' : ('Master', 'output_file'),
                      'do_plots' : ('Master', 'do_plots'),
+                     'resume' : ('Master', 'resume'),
                      'run_periods': ('Master', 'run_periods')}
                  
     parser = argparse.ArgumentParser()